@@ -0,0 +1,201 @@
+"""Microbenchmarks of the simulation hot paths on synthetic data. No credentials or cached data needed.
+
+Every case is timed for each symbol count and/or position count and reported in ns per operation.
+Results can be saved as JSON and compared against a previous run, ie before and after a commit:
+
+    python benchmarks/bench_core.py --output before.json
+    python benchmarks/bench_core.py --output after.json --compare before.json
+"""
+if __name__ == "__main__":
+    import os
+    import sys
+    currentdir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.dirname(currentdir))
+
+from datetime import date, datetime
+from time import perf_counter
+from timeit import repeat
+import argparse
+import json
+import platform
+import subprocess
+
+import numpy as np
+
+from pybt import Market
+from pybt.commons import Money
+from pybt.datapack.synthetic import symbol_names, synthetic_calendar, synthetic_datapack, trading_days
+
+SYMBOL_COUNTS = [10, 100, 500]
+POSITION_COUNTS = [10, 100, 1000]
+DAYS = trading_days(date(2021, 1, 4), 3)
+
+MONEY_CASES = {
+    "init_float": "Money(123.456)",
+    "add_money": "a + b",
+    "mul_float": "a * 1.37",
+    "le": "a <= b",
+}
+
+
+def make_market(n_symbols: int, days: list[date] = DAYS, seed: int = 0) -> Market:
+    symbols = symbol_names(n_symbols)
+    market = Market(asset_context=symbols)
+    market.load_calendar_data("calendar", data=synthetic_calendar(days))
+    market.load_price_data(synthetic_datapack(symbols, days, drop=0.1, seed=seed))
+    return market
+
+
+def open_positions(market: Market, n_positions: int):
+    """Registers a portfolio holding n_positions long/short positions spread over the universe. Wide take
+    profit/stop loss so the exit checks run without closing anything"""
+    portfolio = market.register_portfolio(1000 * n_positions)
+    for i in range(n_positions):
+        symbol = market.assets[i % len(market.assets)]
+        if i % 2 == 0:
+            portfolio.open_position_by_value(symbol, 1000, take_profit=("percent", 10), stop_loss=("percent", 0.1))
+        else:
+            portfolio.open_position_by_value(symbol, -1000)
+    return portfolio
+
+
+def best_of(statement: str, env: dict, number: int, repeats: int) -> float:
+    """Best time of statement in ns per run"""
+    return min(repeat(statement, globals=env, number=number, repeat=repeats)) / number * 1e9
+
+
+def bench_money(repeats: int) -> dict[str, float]:
+    env = {"Money": Money, "a": Money(123.45), "b": Money(150.25)}
+    return {name: best_of(statement, env, 100_000, repeats) for name, statement in MONEY_CASES.items()}
+
+
+def bench_current_price(repeats: int) -> dict[int, float]:
+    results = {}
+    for n_symbols in SYMBOL_COUNTS:
+        market = make_market(n_symbols)
+        market.tick_counter = 100
+        env = {"market": market, "symbol": market.assets[-1]}
+        results[n_symbols] = best_of("market.get_current_price(symbol)", env, 100_000, repeats)
+    return results
+
+
+def bench_position_update(repeats: int) -> dict[int, float]:
+    """ns per position of Position.update"""
+    market = make_market(max(SYMBOL_COUNTS))
+    results = {}
+    for n_positions in POSITION_COUNTS:
+        portfolio = open_positions(market, n_positions)
+        env = {"positions": list(portfolio.open_positions)}
+        results[n_positions] = best_of("for x in positions: x.update()", env, 20, repeats) / n_positions
+    return results
+
+
+def bench_portfolio_update(repeats: int) -> dict[int, float]:
+    """ns per Portfolio.update (a tick) at every position count"""
+    market = make_market(max(SYMBOL_COUNTS))
+    market.tick_counter = 100
+    results = {}
+    for n_positions in POSITION_COUNTS:
+        portfolio = open_positions(market, n_positions)
+        results[n_positions] = best_of("portfolio.update()", {"portfolio": portfolio}, 200, repeats)
+    return results
+
+
+def bench_day_load(repeats: int) -> dict[int, float]:
+    """ns per day of building the day price block (datapack read + gap filling)"""
+    results = {}
+    for n_symbols in SYMBOL_COUNTS:
+        market = make_market(n_symbols)
+        results[n_symbols] = best_of("market.get_today_prices()", {"market": market}, 5, repeats)
+    return results
+
+
+def bench_stepping(repeats: int) -> dict[int, float]:
+    """ns per tick of walking the calendar with next_tick, day changes included"""
+    results = {}
+    for n_symbols in SYMBOL_COUNTS:
+        best = None
+        for _ in range(repeats):
+            market = make_market(n_symbols)
+            ticks = 0
+            start = perf_counter()
+            while market.next_tick():
+                ticks += 1
+            elapsed = (perf_counter() - start) / ticks * 1e9
+            best = elapsed if best is None else min(best, elapsed)
+        results[n_symbols] = best
+    return results
+
+
+CASES = {
+    "money": bench_money,
+    "get_current_price": bench_current_price,
+    "position_update": bench_position_update,
+    "portfolio_update": bench_portfolio_update,
+    "day_load": bench_day_load,
+    "stepping": bench_stepping,
+}
+
+
+def run(cases: list[str] = None, repeats: int = 5) -> dict:
+    """Runs the benchmark cases
+
+    Args:
+        cases (list[str], optional): names of CASES to run. Defaults to None (all).
+        repeats (int, optional): timings per measurement, the best is kept. Defaults to 5.
+
+    Returns:
+        dict: {"meta": run information, "results": {case: {parameter: ns}}}
+    """
+    results = {}
+    for name in cases if cases is not None else CASES:
+        results[name] = {str(key): value for key, value in CASES[name](repeats).items()}
+    return {"meta": _metadata(), "results": results}
+
+
+def compare(current: dict, baseline: dict) -> dict[str, dict[str, float]]:
+    """Ratio current / baseline of every measurement present in both, above 1 is slower"""
+    ratios = {}
+    for name, row in current["results"].items():
+        base = baseline["results"].get(name, {})
+        ratios[name] = {key: value / base[key] for key, value in row.items() if base.get(key)}
+    return ratios
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "unit": "ns",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="cases to run, all by default")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare against")
+    args = parser.parse_args()
+
+    report = run(args.cases, args.repeats)
+    ratios = None
+    if args.compare:
+        with open(args.compare) as f:
+            ratios = compare(report, json.load(f))
+
+    for name, row in report["results"].items():
+        for key, value in row.items():
+            change = f"  x{ratios[name][key]:.2f}" if ratios and key in ratios.get(name, {}) else ""
+            print(f"{name:18s} {key:>10s} {value:12.1f} ns{change}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,105 @@
+"""Microbenchmark of pybt.commons.Money against the Decimal based implementation it replaced.
+
+Run with: python benchmarks/bench_money.py
+"""
+if __name__ == "__main__":
+    import os
+    import sys
+    currentdir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.dirname(currentdir))
+
+from decimal import Decimal, ROUND_HALF_UP
+from timeit import repeat
+from pybt.commons import Money, MoneyAccumulator
+
+
+class LegacyMoney:
+    # Hot paths of the previous Money implementation, kept for comparison
+    __slots__ = ('cents',)
+
+    def __init__(self, value):
+        if isinstance(value, float):
+            self.cents = int(Decimal(str(value)).quantize(Decimal('1.11'), rounding=ROUND_HALF_UP) * 100)
+        elif isinstance(value, int):
+            self.cents = value * 100
+        else:
+            self.cents = value.cents
+
+    @classmethod
+    def from_cents(cls, value):
+        _ = LegacyMoney(0)
+        if type(value) == int:
+            _.cents = value
+        elif type(value) == float:
+            _.cents = int(round(value))
+        return _
+
+    def __add__(self, other):
+        if isinstance(other, LegacyMoney):
+            return LegacyMoney.from_cents(self.cents + other.cents)
+        elif isinstance(other, int):
+            return self + LegacyMoney(other)
+
+    def __mul__(self, other):
+        return LegacyMoney.from_cents(self.cents * other)
+
+    def __eq__(self, other):
+        if type(other) == LegacyMoney:
+            return self.cents == other.cents
+        return self.cents / 100 == other
+
+    def __lt__(self, other):
+        if type(other) == LegacyMoney:
+            return self.cents < other.cents
+        return self.cents / 100 < other
+
+    def __le__(self, other):
+        return self < other or self == other
+
+    def __iadd__(self, other):
+        if not isinstance(other, (int, float, LegacyMoney)):
+            return NotImplemented
+        if isinstance(other, LegacyMoney):
+            self.cents += other.cents
+        if isinstance(other, float):
+            self.cents = self.cents + int(round(other * 100))
+        if isinstance(other, int):
+            self.cents = self.cents + other * 100
+        return self
+
+
+CASES = {
+    "init_float": "cls(123.456)",
+    "init_float_tie": "cls(171.545)",
+    "init_int": "cls(0)",
+    "add_money": "a + b",
+    "add_int": "a + 1",
+    "mul_float": "a * 1.37",
+    "le": "a <= b",
+    "le_float": "a <= 150.25",
+    "sum_loop": "t = cls(0)\nfor x in values: t += x",
+}
+
+
+def run(number: int = 100_000, repeats: int = 5) -> dict[str, dict[str, float]]:
+    results = {}
+    for name, statement in CASES.items():
+        row = {}
+        for label, cls in (("legacy", LegacyMoney), ("current", Money)):
+            env = {"cls": cls, "a": cls(123.45), "b": cls(150.25), "values": [cls(float(i) / 7) for i in range(100)]}
+            loops = number if name != "sum_loop" else number // 100
+            best = min(repeat(statement, globals=env, number=loops, repeat=repeats))
+            row[label] = best / loops * 1e9
+        results[name] = row
+
+    env = {"acc": MoneyAccumulator(), "values": [Money(float(i) / 7) for i in range(100)]}
+    best = min(repeat("acc.reset()\nfor x in values: acc.add(x)", globals=env, number=number // 100, repeat=repeats))
+    results["sum_loop"]["accumulator"] = best / (number // 100) * 1e9
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, row in run().items():
+        timings = " ".join(f"{label}: {value:9.1f} ns" for label, value in row.items())
+        print(f"{name:12s} {timings}  speedup: {row['legacy'] / row['current']:.1f}x")
@@ -0,0 +1,112 @@
+"""Scaling benchmark of a full simulation on synthetic numpy-memmap caches of growing universe and date range.
+
+Every configuration runs in its own process: it writes the cache with write_synthetic_cache, then runs a
+minute simulation over it with a portfolio holding positions in part of the universe. Reports throughput
+in ticks x symbols per second and the peak resident memory of the run.
+
+Run with: python benchmarks/bench_scale.py --symbols 100 1000 5000 --days 5 21 --output scale.json
+"""
+if __name__ == "__main__":
+    import os
+    import sys
+    currentdir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.dirname(currentdir))
+
+from datetime import date, datetime
+from multiprocessing import get_context
+from time import perf_counter
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import tempfile
+import warnings
+
+from pybt import Market
+from pybt.datapack import PriceDataPack
+from pybt.datapack.memmap import MemmapStore
+from pybt.datapack.synthetic import market_calendar, write_synthetic_cache
+
+START = date(2019, 1, 2)
+POSITIONS = 100
+
+
+def run_case(n_symbols: int, n_days: int, cache_dir: str, seed: int = 0) -> dict:
+    """Writes and simulates one configuration. Meant to run in a fresh process so ru_maxrss is its own peak"""
+    os.chdir(cache_dir)
+    name = f"scale_{n_symbols}x{n_days}"
+    calendar = market_calendar(START, n_days)
+
+    start = perf_counter()
+    datapack = write_synthetic_cache(name, calendar, n_symbols, seed=seed, overwrite=True)
+    write_time = perf_counter() - start
+    rows = len(MemmapStore(datapack.meta.file_path))
+    baseline = _peak_rss()
+
+    start = perf_counter()
+    market = Market(asset_context=datapack.symbols)
+    market.load_calendar_data("file", path=os.path.join(PriceDataPack.cache_path, name + ".calendar.npz"))
+    market.load_price_data(datapack)
+    portfolio = market.register_portfolio(1000 * POSITIONS)
+    for symbol in datapack.symbols[:POSITIONS]:
+        portfolio.open_position_by_value(symbol, 1000)
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")     # Positions in delisted symbols end early
+        market.run_simulation()
+    run_time = perf_counter() - start
+
+    return {
+        "symbols": n_symbols,
+        "days": n_days,
+        "rows": rows,
+        "ticks": market.total_tick,
+        "write_seconds": write_time,
+        "write_rows_per_second": rows / write_time,
+        "run_seconds": run_time,
+        "tick_symbols_per_second": market.total_tick * n_symbols / run_time,
+        "peak_rss_mb": _peak_rss(),
+        "write_peak_rss_mb": baseline,
+    }
+
+
+def run(symbol_counts: list[int], day_counts: list[int], cache_dir: str = None) -> dict:
+    """Runs every (symbols, days) configuration, each in a fresh process
+
+    Returns:
+        dict: {"meta": run information, "results": list of run_case results}
+    """
+    results = []
+    with tempfile.TemporaryDirectory() if cache_dir is None else contextlib.nullcontext(cache_dir) as directory:
+        for n_symbols, n_days in itertools.product(symbol_counts, day_counts):
+            with get_context("fork").Pool(1, maxtasksperchild=1) as pool:
+                results.append(pool.apply(run_case, (n_symbols, n_days, directory)))
+    meta = {"time": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "machine": platform.machine()}
+    return {"meta": meta, "results": results}
+
+
+def _peak_rss() -> float:
+    """Peak resident memory of this process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="+", type=int, default=[100, 1000])
+    parser.add_argument("--days", nargs="+", type=int, default=[5, 21])
+    parser.add_argument("--cache-dir", help="keep the generated caches in this directory instead of a temporary one")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.symbols, args.days, args.cache_dir)
+    for x in report["results"]:
+        print(f"{x['symbols']:6d} symbols {x['days']:5d} days {x['ticks']:8d} ticks  "
+              f"write {x['write_rows_per_second'] / 1e6:6.2f} M rows/s  "
+              f"run {x['tick_symbols_per_second'] / 1e6:7.2f} M tick-symbols/s  peak {x['peak_rss_mb']:8.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
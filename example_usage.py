@@ -2,6 +2,7 @@ from pybt.indicators import SMAIndicator
 from pybt.datapack import PriceDataPack
 from pybt import Scorer, Optimizer, Market
 from datetime import datetime
+import numpy as np
 import os
 
 # Alpaca API Information
@@ -25,32 +26,30 @@ class MAScorer(Scorer):
 
     def __init__(self):
         super().__init__()
-        self.indicators = []
-        for symbol in self.market.active_symbols[:10]:
-            self.indicators.append(SMAIndicator(symbol, 30))
+        # The market computes the moving average of every asset once per day
+        self.market.register_indicator("sma30", SMAIndicator, 30)
+        self.symbols = self.market.active_symbols[:10]
 
     def execute(self):
         '''
         Do some arbitary calculation on stock metrics and return scores of all possible stock in the market
         '''
         data = {}
+        prices = self.market.get_current_prices()
+        averages = self.market.get_indicator("sma30")
 
-        for indicator in self.indicators:
-            cur_price = self.market.get_current_price(indicator.symbol)
-            if cur_price is None:
-                print("ERROR")
-                continue
-            average = indicator.update(cur_price)
-            if average is None:
+        for symbol in self.symbols:
+            idx = self.market.symbol_index[symbol]
+            cur_price, average = prices[idx], averages[idx]
+            if np.isnan(cur_price) or np.isnan(average):
                 continue
 
-            price_delta = cur_price - average
-            price_change = price_delta / average
+            price_change = (cur_price - average) / average
 
             if price_change > 0.01:
-                data[indicator.symbol] = -1
+                data[symbol] = -1
             elif price_change < -0.01:
-                data[indicator.symbol] = 1
+                data[symbol] = 1
 
         return data
 
@@ -1,8 +1,11 @@
 from pybt.indicators import BaseIndicator as Indicator
 from pybt.position import Position
+from pybt.ledger import TradeLedger
 from pybt.portfolio import Portfolio
 from pybt.market import Market
 from pybt.optimizer import BaseOptimizer as Optimizer
+from pybt.optimizer import ParameterSweep
+from pybt.parallel import DateShardedBacktest, SymbolPartitionedBacktest
 from pybt.scorer import BaseScorer as Scorer
 from pybt.datapack import CalendarData, Calendar
 from pybt.datapack import PriceDataPack
@@ -1 +1 @@
-from pybt.commons.money import Money
+from pybt.commons.money import Money, MoneyArray, MoneyAccumulator
@@ -1,35 +1,49 @@
-import inspect
 from functools import wraps
 from time import perf_counter
 import sys
+import warnings
 
 
-def get_caller(frame_stack):
-    """Return caller of the frame_stack, frame_stack should be called by inspect.stack()[1][0]
+def create_with_context(cls, **context):
+    """Creates an instance of cls with the context attributes set before its __init__ runs.
+
+    Lets user subclasses of Scorer/Optimizer use self.market/self.portfolio inside their own
+    __init__ without having to pass them on to super().__init__()
 
     Args:
-        frame_stack : inspect.stack()[1][0]
+        cls : class to instantiate. Its __init__ must be callable without arguments
+        **context : attributes to set on the instance
 
     Returns:
-        Class: class instance of the caller
+        instance of cls
     """
-    args, _, _, value_dict = inspect.getargvalues(frame_stack)
-    # Check that the first paramater of the frame function is self
-    if len(args) and args[0] == "self":
-        # get self instance
-        instance = value_dict.get("self", None)
-        # return the class instance that called
-        return instance
-    return None
+    instance = cls.__new__(cls)
+    for key, value in context.items():
+        setattr(instance, key, value)
+    instance.__init__()
+    return instance
 
 
-def set_object_by_caller(caller_type):
-    stacks = inspect.stack()
-    for stack in stacks:
-        caller = get_caller(stack[0])
-        if isinstance(caller, caller_type):
-            return caller
+def find_context(cls, message: str):
+    """Deprecated fallback for code that does not pass its Market/Portfolio context explicitly.
 
+    Warns with message, then walks up the call stack from the caller of the function using it and
+    returns the closest self that is an instance of cls, like the stack inspection used before.
+
+    Args:
+        cls : class of the context to look for
+        message (str): DeprecationWarning message
+
+    Returns:
+        instance of cls or None when no caller is one
+    """
+    warnings.warn(message, DeprecationWarning, stacklevel=3)
+    frame = sys._getframe(2)
+    while frame is not None:
+        instance = frame.f_locals.get("self")
+        if isinstance(instance, cls):
+            return instance
+        frame = frame.f_back
     return None
 
 
@@ -1,37 +1,59 @@
 from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
 
 
 class Money:
+    """Amount of money held as an int of cents.
+
+    Money(int) for small whole amounts returns a shared instance. += and -= update a Money in place
+    except for those shared instances, which are never mutated and return a new object instead.
+    """
     __slots__ = ('cents',)
 
-    def __init__(self, value):
+    def __new__(cls, value):
         # if not isinstance(value, (int, float, Money, str)):
         #     raise TypeError(f"Value passed to Money object must be of type float, int or Money. Got type {type(value)}")
-
-        if isinstance(value, float):
-            decimalized = Decimal(str(value)).quantize(Decimal('1.11'), rounding=ROUND_HALF_UP) * 100
-            self.cents = int(decimalized)
-        elif isinstance(value, int):
+        value_type = type(value)
+        if value_type is int and cls is Money:
+            cached = _SMALL_MONEY.get(value, None)
+            if cached is not None:
+                return cached
+
+        self = object.__new__(cls)
+        if value_type is float:
+            self.cents = _float_to_cents_scalar(value)
+        elif value_type is int:
             self.cents = value * 100
+        elif isinstance(value, Money):
+            self.cents = value.cents
+        elif isinstance(value, float):
+            self.cents = _float_to_cents_scalar(float(value))
+        elif isinstance(value, int):
+            self.cents = int(value) * 100
         elif isinstance(value, str):
             float(value)
-            decimalized = Decimal(value).quantize(Decimal('1.11'), rounding=ROUND_HALF_UP) * 100
-            self.cents = int(decimalized)
+            self.cents = _decimal_str_to_cents(value)
         else:
             self.cents = value.cents
 
-    @ classmethod
+        return self
+
+    @classmethod
     def from_cents(cls, value):
-        _ = Money(0)
-        if type(value) == int:
+        _ = object.__new__(cls)
+        value_type = type(value)
+        if value_type is int:
             _.cents = value
-        elif type(value) == float:
+        elif value_type is float:
             _.cents = int(round(value))
         else:
             raise TypeError(f"Cannot create {type(cls).__name__} from cents if cents not of type int or float")
 
         return _
 
+    def __reduce__(self):
+        return (Money.from_cents, (self.cents,))
+
     def __repr__(self):
         return f"{type(self).__name__}({self.cents / 100.0:.2f})"
 
@@ -39,10 +61,12 @@ class Money:
         return f"{self.cents / 100.0:.2f}"
 
     def __add__(self, other):
-        if isinstance(other, Money):
+        if type(other) is Money:
+            return Money.from_cents(self.cents + other.cents)
+        elif isinstance(other, Money):
             return Money.from_cents(self.cents + other.cents)
         elif isinstance(other, int):
-            return self + Money(other)
+            return Money.from_cents(self.cents + other * 100)
         else:
             raise TypeError(f"Cannot add Money object with type {type(other)}")
 
@@ -76,99 +100,349 @@ class Money:
             return self.cents / other.cents
 
     def __eq__(self, other):
-        if type(other) == Money:
-            if self.cents == other.cents:
-                return True
-            else:
-                return False
-        elif type(other) in [int, float]:
-            if self.cents / 100 == other:
-                return True
-            else:
-                return False
+        other_type = type(other)
+        if other_type is Money:
+            return self.cents == other.cents
+        elif other_type is int or other_type is float:
+            return self.cents / 100 == other
         else:
             raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
 
     def __ne__(self, other):
-        if type(other) == Money:
-            if self.cents != other.cents:
-                return True
-            else:
-                return False
-        elif type(other) in [int, float]:
-            if self.cents / 100 != other:
-                return True
-            else:
-                return False
+        other_type = type(other)
+        if other_type is Money:
+            return self.cents != other.cents
+        elif other_type is int or other_type is float:
+            return self.cents / 100 != other
         else:
             raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
 
     def __lt__(self, other):
-        if type(other) == Money:
-            if self.cents < other.cents:
-                return True
-            else:
-                return False
-        elif type(other) in [int, float]:
-            if self.cents / 100 < other:
-                return True
-            else:
-                return False
+        other_type = type(other)
+        if other_type is Money:
+            return self.cents < other.cents
+        elif other_type is int or other_type is float:
+            return self.cents / 100 < other
         else:
             raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
 
     def __le__(self, other):
-        return self < other or self == other
+        other_type = type(other)
+        if other_type is Money:
+            return self.cents <= other.cents
+        elif other_type is int or other_type is float:
+            return self.cents / 100 <= other
+        else:
+            raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
 
     def __gt__(self, other):
-        if type(other) == Money:
-            if self.cents > other.cents:
-                return True
-            else:
-                return False
-        elif type(other) in [int, float]:
-            if self.cents / 100 > other:
-                return True
-            else:
-                return False
+        other_type = type(other)
+        if other_type is Money:
+            return self.cents > other.cents
+        elif other_type is int or other_type is float:
+            return self.cents / 100 > other
         else:
             raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
 
     def __ge__(self, other):
-        return self > other or self == other
+        other_type = type(other)
+        if other_type is Money:
+            return self.cents >= other.cents
+        elif other_type is int or other_type is float:
+            return self.cents / 100 >= other
+        else:
+            raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
 
     def __iadd__(self, other):
-        if not isinstance(other, (int, float, Money)):
+        if type(other) is Money:
+            cents = other.cents
+        elif isinstance(other, Money):
+            cents = other.cents
+        elif isinstance(other, float):
+            cents = int(round(other * 100))
+        elif isinstance(other, int):
+            cents = other * 100
+        else:
             return NotImplemented
 
-        if isinstance(other, Money):
-            self.cents += other.cents
+        if id(self) in _SHARED_IDS:
+            return Money.from_cents(self.cents + cents)
+        self.cents += cents
+        return self
 
-        if isinstance(other, float):
-            self.cents = self.cents + int(round(other * 100))
+    def __isub__(self, other):
+        if type(other) is Money:
+            cents = other.cents
+        elif isinstance(other, Money):
+            cents = other.cents
+        elif isinstance(other, float):
+            cents = int(round(other * 100))
+        elif isinstance(other, int):
+            cents = other * 100
+        else:
+            return NotImplemented
 
-        if isinstance(other, int):
-            self.cents = self.cents + other * 100
+        if id(self) in _SHARED_IDS:
+            return Money.from_cents(self.cents - cents)
+        self.cents -= cents
+        return self
 
+    def abs(self):
+        return Money.from_cents(abs(self.cents))
+
+
+# Shared instances for whole dollar amounts, returned by Money(int)
+_SMALL_MONEY: dict[int, Money] = {}
+_SMALL_MONEY.update((value, Money.from_cents(value * 100)) for value in range(-100, 1001))
+_SHARED_IDS = frozenset(id(x) for x in _SMALL_MONEY.values())
+
+
+class MoneyAccumulator:
+    """Running total of cents for hot loops. Adds plain ints, no Money is allocated per addition"""
+    __slots__ = ('cents',)
+
+    def __init__(self, value=0):
+        self.cents = Money(value).cents
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.cents / 100.0:.2f})"
+
+    def add(self, money: Money):
+        self.cents += money.cents
+
+    def sub(self, money: Money):
+        self.cents -= money.cents
+
+    def __iadd__(self, other):
+        if isinstance(other, Money):
+            self.cents += other.cents
+        elif isinstance(other, float):
+            self.cents += int(round(other * 100))
+        elif isinstance(other, int):
+            self.cents += other * 100
+        else:
+            return NotImplemented
         return self
 
     def __isub__(self, other):
-        if not isinstance(other, (int, float, Money)):
+        if isinstance(other, Money):
+            self.cents -= other.cents
+        elif isinstance(other, float):
+            self.cents -= int(round(other * 100))
+        elif isinstance(other, int):
+            self.cents -= other * 100
+        else:
             return NotImplemented
+        return self
 
-        if isinstance(other, Money):
-            self.cents = self.cents - other.cents
+    def reset(self):
+        self.cents = 0
+
+    @property
+    def value(self) -> Money:
+        return Money.from_cents(self.cents)
+
+
+def _float_to_cents_scalar(value: float) -> int:
+    """ROUND_HALF_UP of a float to cents, based on the float's shortest decimal repr like str(value).
+
+    Away from a half cent, rounding value * 100 gives the same result, so only values within float
+    error of a tie (or too large for exact float arithmetic) are rounded from their repr.
+    """
+    scaled = value * 100.0
+    magnitude = scaled if scaled >= 0 else -scaled
+    if magnitude < 4503599627370496.0:  # 2 ** 52
+        floor = int(magnitude)
+        fraction = magnitude - floor
+        distance = fraction - 0.5 if fraction >= 0.5 else 0.5 - fraction
+        if distance > 1e-9 and distance > magnitude * 1e-12:
+            cents = floor + 1 if fraction > 0.5 else floor
+            return cents if scaled >= 0 else -cents
+
+    text = repr(value)
+    if "e" in text or "n" in text:
+        return _decimal_str_to_cents(text)
+
+    # Plain repr, half up only depends on the third decimal digit
+    negative = text[0] == "-"
+    whole, _, fraction = (text[1:] if negative else text).partition(".")
+    cents = int(whole + fraction[:2].ljust(2, "0"))
+    if len(fraction) > 2 and fraction[2] >= "5":
+        cents += 1
+    return -cents if negative else cents
+
+
+def _decimal_str_to_cents(text: str) -> int:
+    """ROUND_HALF_UP of a decimal string to cents using integer arithmetic"""
+    mantissa, _, exponent = text.strip().replace("_", "").lower().partition("e")
+    sign = -1 if mantissa.startswith("-") else 1
+    whole, _, fraction = mantissa.lstrip("+-").partition(".")
+    digits = int((whole + fraction) or "0")
+
+    # value = digits * 10 ** (exponent - len(fraction)), shifted by 2 more places for cents
+    shift = int(exponent or 0) - len(fraction) + 2
+    if shift >= 0:
+        return sign * digits * 10 ** shift
+
+    divisor = 10 ** -shift
+    cents, remainder = divmod(digits, divisor)
+    if 2 * remainder >= divisor:
+        cents += 1
+    return sign * cents
+
+
+class MoneyArray:
+    """Vectorized counterpart of Money backed by an int64 array of cents.
+
+    Follows the same rounding rules as Money so that every element is identical to the scalar
+    result: floats are rounded ROUND_HALF_UP to the cent and results of multiplication/division
+    are rounded from cents like Money.from_cents.
+    """
+    __slots__ = ('cents',)
 
-        if isinstance(other, float):
-            self.cents = self.cents - int(round(other * 100))
+    def __init__(self, values):
+        if isinstance(values, MoneyArray):
+            self.cents = values.cents.copy()
+            return
 
+        if isinstance(values, (list, tuple)) and len(values) and all(isinstance(x, Money) for x in values):
+            self.cents = np.fromiter((x.cents for x in values), dtype=np.int64, count=len(values))
+            return
+
+        values = np.asarray(values)
+        if values.dtype.kind in "iu":
+            self.cents = values.astype(np.int64) * 100
+        elif values.dtype.kind == "f":
+            self.cents = _float_to_cents(values)
+        else:
+            raise TypeError(f"Cannot create {type(self).__name__} from array of dtype {values.dtype}")
+
+    @classmethod
+    def from_cents(cls, values) -> "MoneyArray":
+        _ = cls.__new__(cls)
+        values = np.asarray(values)
+        if values.dtype.kind in "iu":
+            _.cents = values.astype(np.int64, copy=False)
+        elif values.dtype.kind == "f":
+            _.cents = np.rint(values).astype(np.int64)
+        else:
+            raise TypeError(f"Cannot create {cls.__name__} from cents if cents not of type int or float")
+
+        return _
+
+    def __repr__(self):
+        return f"{type(self).__name__}({np.array2string(self.cents / 100.0, precision=2, floatmode='fixed')})"
+
+    def __len__(self):
+        return len(self.cents)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return Money.from_cents(int(self.cents[key]))
+        return MoneyArray.from_cents(self.cents[key])
+
+    def __iter__(self):
+        return (Money.from_cents(x) for x in self.cents.tolist())
+
+    @property
+    def shape(self):
+        return self.cents.shape
+
+    def _other_cents(self, other, operation):
+        if isinstance(other, MoneyArray):
+            return other.cents
+        if isinstance(other, Money):
+            return other.cents
         if isinstance(other, int):
-            self.cents = self.cents - other * 100
+            return other * 100
+        raise TypeError(f"Cannot {operation} {type(self).__name__} object with type {type(other)}")
 
-        return self
+    def __add__(self, other):
+        return MoneyArray.from_cents(self.cents + self._other_cents(other, "add"))
 
-    def abs(self):
-        return Money.from_cents(abs(self.cents))
+    def __radd__(self, other):
+        return self + other
+
+    def __sub__(self, other):
+        if not isinstance(other, (Money, MoneyArray)):
+            raise TypeError(f"Cannot subtract {type(self).__name__} object with type {type(other)}")
+        return MoneyArray.from_cents(self.cents - other.cents)
+
+    def __mul__(self, other):
+        if isinstance(other, (Money, MoneyArray)):
+            return NotImplemented
+        if isinstance(other, (int, float, np.ndarray)):
+            return MoneyArray.from_cents(self.cents * other)
+        return NotImplemented
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __truediv__(self, other):
+        if isinstance(other, (Money, MoneyArray)):
+            return self.cents / other.cents
+        if isinstance(other, (int, float, np.ndarray)):
+            return MoneyArray.from_cents(self.cents / other)
+        return NotImplemented
+
+    def _compare(self, other, op):
+        if isinstance(other, (Money, MoneyArray)):
+            return op(self.cents, other.cents)
+        if isinstance(other, (int, float, np.ndarray)):
+            return op(self.cents / 100, other)
+        raise TypeError(f"Cannot compare {self.__class__} with object of type {type(other)}")
+
+    def __eq__(self, other):
+        return self._compare(other, np.equal)
+
+    def __ne__(self, other):
+        return self._compare(other, np.not_equal)
+
+    def __lt__(self, other):
+        return self._compare(other, np.less)
+
+    def __le__(self, other):
+        return self._compare(other, np.less_equal)
+
+    def __gt__(self, other):
+        return self._compare(other, np.greater)
+
+    def __ge__(self, other):
+        return self._compare(other, np.greater_equal)
+
+    __hash__ = None
+
+    def sum(self) -> Money:
+        return Money.from_cents(int(self.cents.sum()))
+
+    def abs(self) -> "MoneyArray":
+        return MoneyArray.from_cents(np.abs(self.cents))
+
+    def to_list(self) -> list[Money]:
+        return list(self)
+
+    def to_numpy(self) -> np.ndarray:
+        """Values as float64 dollars"""
+        return self.cents / 100.0
+
+
+def _float_to_cents(values: np.ndarray) -> np.ndarray:
+    """ROUND_HALF_UP of floats to cents, identical to Money(float) for every element.
+
+    Money rounds the shortest decimal repr of the float. Away from a half cent this is the same as
+    rounding value * 100, so only values within float error of a tie go through the scalar path.
+    """
+    scaled = np.abs(values * 100.0)
+    floor = np.floor(scaled)
+    cents = np.copysign(floor + (scaled - floor >= 0.5), values)
+    tolerance = np.maximum(scaled * 1e-12, 1e-9)
+    ambiguous = ~np.isfinite(scaled) | (np.abs(scaled - floor - 0.5) <= tolerance)
+
+    result = np.where(ambiguous, 0, cents).astype(np.int64)
+    for i in zip(*np.nonzero(ambiguous)):
+        result[i] = Money(float(values[i])).cents
+
+    return result
 
 
 if __name__ == '__main__':
@@ -0,0 +1,85 @@
+from collections import defaultdict
+from datetime import date
+from time import perf_counter
+import json
+import pandas as pd
+
+
+class Profiler:
+    """Cumulative wall time and call count of the phases of a simulation, per trading day and per strategy.
+
+    Enabled with Market(..., profile=True) or market.enable_profiling(). Market and Portfolio only check
+    `market.profiler is None` when profiling is off, so a normal run pays next to nothing for it.
+
+    Phases
+    ------
+    simulation : whole run_simulation loop
+    load_day : reading and building the price block of the next day in next_tick
+    positions : marking positions to market and processing take profit/stop loss exits
+    scorer : Scorer.execute, per portfolio
+    optimizer : Optimizer.execute, per portfolio
+
+    Example
+    -------
+    market = Market(..., profile=True)
+    ...
+    market.run_simulation()
+    print(market.profiler.summary())
+    market.profiler.save("profile.csv")
+    """
+
+    def __init__(self):
+        self.day: date = None
+        self._records: dict[tuple, list] = defaultdict(_new_record)     # (day, phase, strategy) -> [seconds, calls]
+
+    def add(self, phase: str, seconds: float, strategy: str = ""):
+        record = self._records[(self.day, phase, strategy)]
+        record[0] += seconds
+        record[1] += 1
+
+    def time(self, phase: str, func, *args, strategy: str = ""):
+        """Calls func(*args), recording its wall time under phase. Returns what func returns"""
+        start = perf_counter()
+        value = func(*args)
+        self.add(phase, perf_counter() - start, strategy)
+        return value
+
+    def reset(self):
+        self._records.clear()
+
+    def totals(self) -> dict[str, dict[str, float]]:
+        """{phase: {"seconds", "calls"}} over the whole run"""
+        totals = {}
+        for (_, phase, _), (seconds, calls) in self._records.items():
+            total = totals.setdefault(phase, {"seconds": 0.0, "calls": 0})
+            total["seconds"] += seconds
+            total["calls"] += calls
+        return totals
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per day, phase and strategy with columns [date, phase, strategy, seconds, calls]"""
+        rows = [(day, phase, strategy, seconds, calls) for (day, phase, strategy), (seconds, calls) in self._records.items()]
+        return pd.DataFrame(rows, columns=["date", "phase", "strategy", "seconds", "calls"])
+
+    def save(self, path: str):
+        """Writes the records to a .csv, or to a .json file with the totals"""
+        frame = self.to_frame()
+        if str(path).endswith(".json"):
+            frame["date"] = frame["date"].astype(str)
+            with open(path, "w") as f:
+                json.dump({"totals": self.totals(), "records": frame.to_dict(orient="records")}, f, indent=2)
+        else:
+            frame.to_csv(path, index=False)
+
+    def summary(self) -> str:
+        totals = self.totals()
+        run_time = totals.get("simulation", {}).get("seconds", 0.0)
+        lines = []
+        for phase, total in sorted(totals.items(), key=lambda x: -x[1]["seconds"]):
+            share = f"{total['seconds'] / run_time:7.1%}" if run_time else ""
+            lines.append(f"{phase:12s} {total['seconds']:10.4f} s {total['calls']:10d} calls {share}")
+        return "\n".join(lines)
+
+
+def _new_record() -> list:
+    return [0.0, 0]
@@ -1,2 +1,4 @@
 from pybt.datapack.calendar_data import CalendarData, Calendar
 from pybt.datapack.pricedata import PriceData, PriceDataPack
+from pybt.datapack.daybars import DayBars
+from pybt.datapack.barset import BarSet
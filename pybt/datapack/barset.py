@@ -0,0 +1,141 @@
+import os
+import numpy as np
+import datetime as dt
+from typing import Optional
+from pybt.datapack.daybars import DayBars
+
+
+class BarSet:
+    """OHLCV bars resampled from minute data for every day of a trading calendar.
+
+    Bars are aligned on the session open of each day: hourly bar i covers [open + i hours, open + (i + 1) hours)
+    clipped to the close, and the daily bar covers the whole session. Early close days have fewer periods, the
+    unused periods are NaN like periods without any minute bar.
+
+    Attributes
+    ----------
+    frequency : str
+        "1hour" or "daily"
+    days : np.ndarray
+        (days,) datetime64[D] trading days
+    symbols : list[str]
+        symbols in row order
+    periods : np.ndarray
+        (days,) int64 number of bars of each day
+    data : dict[str, np.ndarray]
+        (days, symbols, max periods) float64 open, high, low, close and volume, NaN where there is no bar
+    """
+    fields = ["open", "high", "low", "close", "volume"]
+    period_minutes = {"1hour": 60, "daily": None}
+
+    def __init__(self, frequency: str, days: np.ndarray, symbols: list[str], periods: np.ndarray, data: dict[str, np.ndarray]):
+        if frequency not in self.period_minutes:
+            raise ValueError(f"{frequency} invalid. BarSet frequency should be '1hour' or 'daily'")
+        self.frequency = frequency
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.symbols = list(symbols)
+        self.periods = np.asarray(periods, dtype=np.int64)
+        self.data = data
+        self.day_index: dict[dt.date, int] = {day: i for i, day in enumerate(self.days.astype(dt.date))}
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.data[field]
+
+    def covers(self, dates: list[dt.date], symbols: list[str]) -> bool:
+        """True if every date and symbol is in the set"""
+        return all(date in self.day_index for date in dates) and all(symbol in self.symbols for symbol in symbols)
+
+    def day(self, date: dt.date, symbols: Optional[list[str]] = None) -> Optional[dict[str, np.ndarray]]:
+        """Bars of date as (symbols x periods) arrays, or None if the day is not in the set"""
+        d = self.day_index.get(date, None)
+        if d is None:
+            return None
+        n = self.periods[d]
+        rows = slice(None) if symbols is None or list(symbols) == self.symbols else [self.symbols.index(x) for x in symbols]
+        return {field: values[d, rows, :n] for field, values in self.data.items()}
+
+    @classmethod
+    def build(cls, datapack, calendar, symbols: list[str], frequency: str) -> "BarSet":
+        """Resamples the minute data of datapack for every day of calendar
+
+        Args:
+            datapack (PriceDataPack): minute price data
+            calendar (CalendarData): trading days with their open and close times
+            symbols (list[str]): symbols to resample
+            frequency (str): "1hour" or "daily"
+        """
+        minutes = cls.period_minutes[frequency]
+        sessions = []
+        for day in calendar:
+            open_time = np.datetime64(dt.datetime.combine(day.date, day.open))
+            session = np.datetime64(dt.datetime.combine(day.date, day.close)) - open_time
+            step = session if minutes is None else np.timedelta64(minutes, "m")
+            sessions.append((day.date, open_time, session, step))
+
+        periods = np.array([-(-(session // np.timedelta64(1, "m")) // (step // np.timedelta64(1, "m"))) for _, _, session, step in sessions], dtype=np.int64)
+        width = int(periods.max()) if len(periods) else 0
+        data = {field: np.full((len(sessions), len(symbols), width), np.nan) for field in cls.fields}
+
+        for d, (date, open_time, session, step) in enumerate(sessions):
+            resample_day(datapack._read_day(date, symbols), open_time, session, step, {field: values[d] for field, values in data.items()})
+
+        return cls(frequency, [x[0] for x in sessions], symbols, periods, data)
+
+    def save(self, path: str, **extra):
+        np.savez(path, frequency=self.frequency, days=self.days, symbols=np.array(self.symbols, dtype=str),
+                 periods=self.periods, **{field: self.data[field] for field in self.fields}, **extra)
+
+    @classmethod
+    def load(cls, path: str) -> "BarSet":
+        with np.load(path) as f:
+            data = {field: f[field] for field in cls.fields}
+            return cls(str(f["frequency"]), f["days"], [str(x) for x in f["symbols"]], f["periods"], data)
+
+
+def resample_day(bars: DayBars, open_time: np.datetime64, session: np.timedelta64, step: np.timedelta64, out: dict[str, np.ndarray]):
+    """Aggregates one day of minute bars into fixed periods from the open, writing into out in place.
+
+    Minute bars are labelled by their start, so bars in [open, close) belong to the session.
+
+    Args:
+        bars (DayBars): minute bars, rows of out follow bars.symbols
+        open_time (np.datetime64): session open
+        session (np.timedelta64): session length
+        step (np.timedelta64): period length
+        out (dict[str, np.ndarray]): (symbols x periods) arrays for every BarSet field
+    """
+    delta = bars.time - open_time
+    keep = (delta >= np.timedelta64(0)) & (delta < session)
+    if not keep.any():
+        return
+
+    rows = np.flatnonzero(keep)
+    symbol = bars.symbol_codes()[rows]
+    delta = delta[rows]
+    if (np.diff(symbol) < 0).any() or ((np.diff(delta) < np.timedelta64(0)) & (np.diff(symbol) == 0)).any():
+        order = np.lexsort((delta, symbol))
+        rows, symbol, delta = rows[order], symbol[order], delta[order]
+    period = (delta // step).astype(np.int64)
+
+    # Rows are sorted by symbol then time so every (symbol, period) group is a contiguous run
+    key = symbol * out["close"].shape[1] + period
+    starts = np.flatnonzero(np.concatenate([[True], key[1:] != key[:-1]]))
+    ends = np.concatenate([starts[1:], [len(key)]]) - 1
+    values = {field: bars[field][rows] for field in BarSet.fields}
+    rows, cols = symbol[starts], period[starts]
+
+    out["open"][rows, cols] = values["open"][starts]
+    out["close"][rows, cols] = values["close"][ends]
+    out["high"][rows, cols] = np.fmax.reduceat(values["high"], starts)
+    out["low"][rows, cols] = np.fmin.reduceat(values["low"], starts)
+    out["volume"][rows, cols] = np.add.reduceat(np.nan_to_num(values["volume"]), starts)
+
+
+def source_mtime(path: str) -> float:
+    """Last modification time of a cache file, or of the newest file of a cache directory"""
+    if os.path.isdir(path):
+        return max([os.path.getmtime(os.path.join(path, x)) for x in os.listdir(path)] + [os.path.getmtime(path)])
+    return os.path.getmtime(path)
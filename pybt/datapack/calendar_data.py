@@ -1,10 +1,27 @@
 from datetime import datetime, time, date
+from typing import Optional, Union
 import alpaca_trade_api as tradeapi
 from pytz import timezone
+import numpy as np
 import pandas as pd
+import os
 
 
 class Calendar:
+    """One trading day. A lightweight view on a row of CalendarData
+
+    Attributes
+    ----------
+    date : date
+        trading day
+    open : time
+        session open
+    close : time
+        session close
+
+    Additional columns of the calendar (ie session_open from Alpaca) are available as attributes.
+    """
+    __slots__ = ("_store", "_index")
 
     def __init__(self, _date: date, open: time, close: time, **kwargs):
         if not isinstance(_date, date):
@@ -13,78 +30,273 @@ class Calendar:
             raise TypeError(f"open should be datetime.time object. Got type {type(open)} instead")
         if not isinstance(close, time):
             raise TypeError(f"close should be datetime.time object. Got type {type(close)} instead")
-        self.date: date = _date
-        self.open: time = open
-        self.close: time = close
+        self._store = CalendarData.from_arrays([_date], [open], [close], **{key: [value] for key, value in kwargs.items()})
+        self._index = 0
+
+    @classmethod
+    def _view(cls, store: "CalendarData", index: int) -> "Calendar":
+        view = cls.__new__(cls)
+        view._store = store
+        view._index = index
+        return view
+
+    @property
+    def date(self) -> date:
+        return self._store.dates[self._index].item()
+
+    @property
+    def open(self) -> time:
+        return self._store.opens[self._index].item().time()
+
+    @property
+    def close(self) -> time:
+        return self._store.closes[self._index].item().time()
+
+    def __getattr__(self, name: str):
+        extra = self._store.extra if name not in Calendar.__slots__ else None
+        if extra is not None and name in extra:
+            value = extra[name][self._index]
+            return value.item() if isinstance(value, np.generic) else value
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __eq__(self, other):
+        if not isinstance(other, Calendar):
+            return NotImplemented
+        return (self.date, self.open, self.close) == (other.date, other.open, other.close)
 
-        for key, value in kwargs.items():
-            self.__dict__[key] = value
+    def __repr__(self):
+        return f"{type(self).__name__}({self.date}, open={self.open}, close={self.close})"
 
 
 class CalendarData:
+    """Trading calendar stored as NumPy arrays, one row per trading day sorted by date.
 
-    def __init__(self, data):
-        self.data = data
+    Indexing returns Calendar views. Range queries (between) and date lookups (index, indices) are
+    vectorized, and the calendar can be saved to and loaded from a local .npz file (save, load).
+
+    Attributes
+    ----------
+    dates : np.ndarray
+        (days,) datetime64[D] trading days
+    opens : np.ndarray
+        (days,) datetime64[s] session open of every day
+    closes : np.ndarray
+        (days,) datetime64[s] session close of every day
+    extra : dict[str, np.ndarray]
+        (days,) additional columns
+    """
+    cache_path = "data_cache"
+    cache_name = "alpaca_calendar.npz"
+
+    def __init__(self, data: list[Calendar] = None):
+        # Kept for compatibility with code building calendars from lists of Calendar
+        data = data if data is not None else []
+        self._set_arrays(np.array([x.date for x in data], dtype="datetime64[D]"),
+                         np.array([datetime.combine(x.date, x.open) for x in data], dtype="datetime64[s]"),
+                         np.array([datetime.combine(x.date, x.close) for x in data], dtype="datetime64[s]"), {})
+
+    def _set_arrays(self, dates: np.ndarray, opens: np.ndarray, closes: np.ndarray, extra: dict[str, np.ndarray]):
+        order = np.argsort(dates, kind="stable")
+        if (order != np.arange(len(order))).any():
+            dates, opens, closes = dates[order], opens[order], closes[order]
+            extra = {key: value[order] for key, value in extra.items()}
+        self.dates = dates
+        self.opens = opens
+        self.closes = closes
+        self.extra = extra
+
+    @classmethod
+    def from_arrays(cls, dates, opens, closes, **extra) -> "CalendarData":
+        """Builds a calendar from array-likes of dates and open/close times (datetime.time) or timestamps"""
+        dates = np.asarray(pd.to_datetime(pd.Series(dates)).values, dtype="datetime64[D]")
+        calendar = cls.__new__(cls)
+        calendar._set_arrays(dates, _session_times(dates, opens), _session_times(dates, closes),
+                             {key: np.asarray(value) for key, value in extra.items()})
+        return calendar
 
     def __len__(self):
-        return len(self.data)
+        return len(self.dates)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Calendar, "CalendarData"]:
+        if isinstance(key, slice):
+            return self._subset(key)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("calendar index out of range")
+        return Calendar._view(self, key)
 
-    def __getitem__(self, key: int) -> Calendar:
-        return self.data[key]
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Calendar._view(self, i)
 
     def __setitem__(self, key: int, value: Calendar):
-        self.data[key] = value
+        self.dates[key] = np.datetime64(value.date, "D")
+        self.opens[key] = np.datetime64(datetime.combine(value.date, value.open), "s")
+        self.closes[key] = np.datetime64(datetime.combine(value.date, value.close), "s")
 
     def __delitem__(self, key: int):
-        del self.data[key]
+        keep = np.ones(len(self), dtype=bool)
+        keep[key] = False
+        self._set_arrays(self.dates[keep], self.opens[keep], self.closes[keep], {k: v[keep] for k, v in self.extra.items()})
+
+    def _subset(self, rows) -> "CalendarData":
+        calendar = type(self).__new__(type(self))
+        calendar.dates = self.dates[rows]
+        calendar.opens = self.opens[rows]
+        calendar.closes = self.closes[rows]
+        calendar.extra = {key: value[rows] for key, value in self.extra.items()}
+        return calendar
+
+    def index(self, day: Union[date, datetime]) -> Optional[int]:
+        """Row of a trading day, None if day is not a trading day"""
+        target = np.datetime64(day.date() if isinstance(day, datetime) else day, "D")
+        i = int(np.searchsorted(self.dates, target))
+        if i < len(self.dates) and self.dates[i] == target:
+            return i
+        return None
+
+    def indices(self, days) -> np.ndarray:
+        """Rows of many days at once, -1 for days that are not trading days"""
+        target = np.asarray(pd.to_datetime(pd.Series(days)).values, dtype="datetime64[D]")
+        rows = np.searchsorted(self.dates, target)
+        found = rows < len(self.dates)
+        found[found] = self.dates[rows[found]] == target[found]
+        return np.where(found, rows, -1)
+
+    def between(self, start: Union[date, datetime] = None, end: Union[date, datetime] = None) -> "CalendarData":
+        """Trading days from start to end (both included). The returned calendar shares this calendar's arrays"""
+        lo = np.searchsorted(self.dates, _day(start), side="left") if start is not None else 0
+        hi = np.searchsorted(self.dates, _day(end), side="right") if end is not None else len(self.dates)
+        return self._subset(slice(lo, hi))
+
+    def to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame({"date": self.dates.astype("datetime64[ns]"), "open": [x.item().time() for x in self.opens],
+                             "close": [x.item().time() for x in self.closes], **self.extra})
+
+    def save(self, path: str, **metadata):
+        """Saves the calendar to a .npz file. metadata (ie the requested date range) is stored alongside"""
+        np.savez(path, dates=self.dates, opens=self.opens, closes=self.closes,
+                 **{"extra_" + key: value for key, value in self.extra.items()},
+                 **{"meta_" + key: np.asarray(value) for key, value in metadata.items()})
 
     @classmethod
-    def load_from_alpaca(cls, api_key: str, secret_key: str, base_url: str = "https://paper-api.alpaca.markets", start_date: datetime = datetime(2015, 1, 1), end_date: datetime = datetime.today(), tz: str = "US/Eastern"):
+    def load(cls, path: str) -> "CalendarData":
+        calendar = cls.__new__(cls)
+        with np.load(path, allow_pickle=False) as f:
+            calendar._set_arrays(f["dates"], f["opens"], f["closes"],
+                                 {key[len("extra_"):]: f[key] for key in f.files if key.startswith("extra_")})
+        return calendar
+
+    @classmethod
+    def load_from_alpaca(cls, api_key: str, secret_key: str, base_url: str = "https://paper-api.alpaca.markets", start_date: datetime = datetime(2015, 1, 1), end_date: datetime = None, tz: str = "US/Eastern", cache: Union[bool, str] = True):
+        """Trading calendar from Alpaca between start_date and end_date.
+
+        The reply is kept in a local cache file (data_cache/alpaca_calendar.npz by default, or the path given
+        as cache) and later calls covered by the cached range are answered offline. The cache is keyed on
+        base_url and tz, a call with others queries Alpaca and replaces it. cache=False always queries Alpaca.
+        """
+        end_date = end_date if end_date is not None else datetime.today()
+        cache_file = None
+        if cache:
+            cache_file = cache if isinstance(cache, str) else os.path.join(os.getcwd(), cls.cache_path, cls.cache_name)
+            cached = cls._load_cached_range(cache_file, start_date, end_date, base_url, tz)
+            if cached is not None:
+                return cached
+
         api = tradeapi.REST(api_key, secret_key, base_url)
         market_tz = timezone(tz)
         start = market_tz.localize(start_date).date().isoformat()
         end = market_tz.localize(end_date).date().isoformat()
         calendar_data = api.get_calendar(start=start, end=end)
 
-        # Convert Alpaca API reply to local Calendar object
-        for i, cal in enumerate(calendar_data):
-            _date = cal.date.to_pydatetime().date()
-            open = cal.open
-            close = cal.close
-            new_cal = Calendar(_date, open, close)
-            calendar_data[i] = new_cal
+        # Convert Alpaca API reply to arrays
+        dates = [cal.date.to_pydatetime().date() for cal in calendar_data]
+        calendar = cls.from_arrays(dates, [cal.open for cal in calendar_data], [cal.close for cal in calendar_data])
 
-        return cls(calendar_data)
+        if cache_file is not None:
+            calendar._save_cached_range(cache_file, start_date, end_date, base_url, tz)
+        return calendar
 
     @classmethod
-    def load_from_pandas(cls, data):
+    def _load_cached_range(cls, path: str, start_date: datetime, end_date: datetime, base_url: str, tz: str) -> Optional["CalendarData"]:
+        if not _same_source(path, base_url, tz):
+            return None
+        with np.load(path) as f:
+            cached_start, cached_end = f["meta_start"], f["meta_end"]
+        if cached_start <= _day(start_date) and _day(end_date) <= cached_end:
+            return cls.load(path).between(start_date, end_date)
+        return None
+
+    def _save_cached_range(self, path: str, start_date: datetime, end_date: datetime, base_url: str, tz: str):
+        start, end = _day(start_date), _day(end_date)
+        merged = self
+        if _same_source(path, base_url, tz):
+            # Extend the cached range when the new range overlaps or touches it
+            with np.load(path) as f:
+                cached_start, cached_end = f["meta_start"], f["meta_end"]
+            if cached_start <= end + 1 and start <= cached_end + 1:
+                cached = type(self).load(path)
+                keep = cached.indices(self.dates.astype("datetime64[ns]")) if len(self) else np.array([], dtype=np.int64)
+                old = np.ones(len(cached), dtype=bool)
+                old[keep[keep >= 0]] = False
+                merged = type(self).__new__(type(self))
+                merged._set_arrays(np.concatenate([cached.dates[old], self.dates]), np.concatenate([cached.opens[old], self.opens]),
+                                   np.concatenate([cached.closes[old], self.closes]), {})
+                start, end = min(start, cached_start), max(end, cached_end)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        merged.save(path, start=start, end=end, base_url=base_url, tz=tz)
+
+    @classmethod
+    def load_from_pandas(cls, data: pd.DataFrame):
         required_col = ["date", "open", "close"]
-        cal_data = []
         for col in required_col:
             if col not in data.columns:
                 raise ValueError(f"DataFrame should have ['date', 'open', 'close'] columns. Received {data.columns} instead")
 
+        if not pd.api.types.is_datetime64_any_dtype(data["date"]):
+            bad = [x for x in data["date"] if not isinstance(x, (date, pd.Timestamp))]
+            if bad:
+                raise TypeError(f"date value should either be datetime.date or pandas.Timestamp object. Got type {type(bad[0])} instead")
+
         additional_col = [x for x in data.columns if x not in required_col]
-        for idx, row in data.iterrows():
-            if isinstance(row.date, (date, pd.Timestamp)):
-                _date = row.date.to_pydatetime().date()
-            else:
-                raise TypeError(f"date value should either be datetime.date or pandas.Timestamp object. Got type {type(row.date)} instead")
+        return cls.from_arrays(data["date"], data["open"], data["close"], **{col: data[col].to_numpy() for col in additional_col})
+
+
+def _day(value: Union[date, datetime, np.datetime64]) -> np.datetime64:
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+def _same_source(path: str, base_url: str, tz: str) -> bool:
+    """Whether the calendar cached at path was queried from base_url in tz"""
+    if not os.path.exists(path):
+        return False
+    with np.load(path) as f:
+        if "meta_base_url" not in f.files or "meta_tz" not in f.files:
+            return False
+        return str(f["meta_base_url"]) == base_url and str(f["meta_tz"]) == tz
 
-            new_cal = Calendar(_date, row.open, row.close)
-            for col in additional_col:
-                new_cal.__setattr__(col, row[col])
-            cal_data.append(new_cal)
 
-        return cls(cal_data)
+def _session_times(dates: np.ndarray, times) -> np.ndarray:
+    """datetime64[s] timestamps from dates and datetime.time of the day (or full timestamps)"""
+    values = list(times)
+    if all(isinstance(x, time) for x in values):
+        seconds = np.array([x.hour * 3600 + x.minute * 60 + x.second for x in values], dtype="timedelta64[s]")
+        return dates.astype("datetime64[s]") + seconds
+    if any(isinstance(x, (date, pd.Timestamp, np.datetime64)) for x in values):
+        return np.asarray(pd.to_datetime(pd.Series(values)).values, dtype="datetime64[s]")
+    bad = next(x for x in values if not isinstance(x, time))
+    raise TypeError(f"open and close should be datetime.time objects. Got type {type(bad)} instead")
 
 
 if __name__ == '__main__':
-    import os
     SECRET_KEY = os.getenv("SECRET_KEY")
     API_KEY = os.getenv("API_KEY")
     # cal = CalendarData.load_from_alpaca(API_KEY, SECRET_KEY)
-    cal_df = pd.read_excel("D:\ocr_ml\pandas_test_calendar.xlsx", parse_dates=True)
+    cal_df = pd.read_excel(r"D:\ocr_ml\pandas_test_calendar.xlsx", parse_dates=True)
     cal = CalendarData.load_from_pandas(cal_df)
 
-    print(cal[0].__dict__)
+    print(cal[0])
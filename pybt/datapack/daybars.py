@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import datetime as dt
+
+
+class DayBars:
+    """One trading day of bars for many symbols, stacked in flat columns.
+
+    Bars of symbols[i] are rows offsets[i]:offsets[i + 1], sorted by time. Columns can be views on a
+    memory mapped store, treat them as read only.
+
+    Attributes
+    ----------
+    date : dt.date
+        trading day of the bars
+    symbols : list[str]
+        symbols in row order
+    offsets : np.ndarray
+        (symbols + 1,) int64 row offsets
+    time : np.ndarray
+        (rows,) datetime64[ns] bar time
+    columns : dict[str, np.ndarray]
+        (rows,) float64 open, high, low, close and volume
+    """
+    column_names = ["open", "high", "low", "close", "volume"]
+
+    def __init__(self, date: dt.date, symbols: list[str], offsets: np.ndarray, time: np.ndarray, columns: dict[str, np.ndarray]):
+        self.date = date
+        self.symbols = list(symbols)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.time = time
+        self.columns = columns
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __len__(self):
+        return len(self.time)
+
+    def __contains__(self, symbol: str):
+        return symbol in self._index
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column == "time":
+            return self.time
+        return self.columns[column]
+
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def symbol_codes(self) -> np.ndarray:
+        """(rows,) index into symbols of every row"""
+        return np.repeat(np.arange(len(self.symbols)), self.counts())
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """Bars of one symbol as a DataFrame indexed by time, like PriceData.get_prices"""
+        i = self._index[symbol]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return pd.DataFrame({col: self.columns[col][start:end] for col in self.columns}, index=pd.DatetimeIndex(self.time[start:end]))
+
+    def select(self, symbols: list[str]) -> "DayBars":
+        """Subset (and reorder) of symbols. Returns self when nothing changes, otherwise copies rows.
+        Symbols without bars are kept with no rows"""
+        symbols = list(symbols)
+        if symbols == self.symbols:
+            return self
+
+        starts = np.array([self.offsets[self._index[x]] if x in self._index else 0 for x in symbols], dtype=np.int64)
+        ends = np.array([self.offsets[self._index[x] + 1] if x in self._index else 0 for x in symbols], dtype=np.int64)
+        rows = _ranges(starts, ends)
+        offsets = np.concatenate([[0], np.cumsum(ends - starts)])
+        return DayBars(self.date, symbols, offsets, self.time[rows], {col: values[rows] for col, values in self.columns.items()})
+
+    @classmethod
+    def from_frames(cls, date: dt.date, frames: dict[str, pd.DataFrame]) -> "DayBars":
+        """Stacks per-symbol DataFrames (as returned by PriceData.get_prices)"""
+        symbols = list(frames.keys())
+        lengths = [len(df) if df is not None else 0 for df in frames.values()]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        present = [df for df in frames.values() if df is not None and len(df)]
+        if present:
+            time = np.concatenate([df.index.values.astype("datetime64[ns]") for df in present])
+            columns = {col: np.concatenate([_column(df, col) for df in present]) for col in cls.column_names}
+        else:
+            time = np.array([], dtype="datetime64[ns]")
+            columns = {col: np.array([], dtype=np.float64) for col in cls.column_names}
+        return cls(date, symbols, offsets, time, columns)
+
+    @classmethod
+    def from_long_frame(cls, date: dt.date, df: pd.DataFrame, symbols: list[str]) -> "DayBars":
+        """Builds DayBars from one DataFrame holding bars of many symbols in a 'symbol' column"""
+        codes = pd.Categorical(df["symbol"], categories=symbols).codes.astype(np.int64)
+        time = df.index.values.astype("datetime64[ns]")
+        keep = codes >= 0
+        order = np.lexsort((time[keep], codes[keep]))
+        rows = np.flatnonzero(keep)[order]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[keep], minlength=len(symbols)))]).astype(np.int64)
+        columns = {col: _column(df, col)[rows] for col in cls.column_names}
+        return cls(date, symbols, offsets, time[rows], columns)
+
+
+def _column(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column in df.columns:
+        return df[column].to_numpy(dtype=np.float64)
+    return np.full(len(df), np.nan)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, end) for every pair, vectorized"""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.array([], dtype=np.int64)
+    position = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + position
@@ -0,0 +1,149 @@
+import os
+import numpy as np
+import pandas as pd
+import datetime as dt
+from typing import Callable, Optional
+from pybt.datapack.daybars import DayBars
+
+
+class MemmapStore:
+    """Day-major columnar price store backed by NumPy memory maps.
+
+    Every column is its own .npy file. Rows are sorted by (day, symbol, time) so one day of bars for
+    all symbols is a contiguous block, and loading a day is a slice of the memory map (no copy).
+
+    Layout of the store directory
+    -----------------------------
+    symbols.npy : (symbols,) symbol names
+    days.npy : (days,) datetime64[D] trading days
+    offsets.npy : (days, symbols + 1) int64. Rows of symbol s on day d are offsets[d, s]:offsets[d, s + 1]
+    time.npy : (rows,) datetime64[ns] bar time
+    open.npy, high.npy, low.npy, close.npy, volume.npy : (rows,) float64
+    """
+    columns = ["open", "high", "low", "close", "volume"]
+
+    def __init__(self, path: str):
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"{path} is not a memmap store directory")
+
+        self.path = path
+        self.symbols: list[str] = [str(x) for x in np.load(os.path.join(path, "symbols.npy"))]
+        self.days: np.ndarray = np.load(os.path.join(path, "days.npy"))
+        self.offsets: np.ndarray = np.load(os.path.join(path, "offsets.npy"))
+        self.time: np.ndarray = np.load(os.path.join(path, "time.npy"), mmap_mode="r")
+        self.data: dict[str, np.ndarray] = {col: np.load(os.path.join(path, col + ".npy"), mmap_mode="r") for col in self.columns}
+
+        self.symbol_index: dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.day_index: dict[dt.date, int] = {day: i for i, day in enumerate(self.days.astype(dt.date))}
+
+    def __len__(self):
+        return len(self.time)
+
+    def day_rows(self, date: dt.date) -> Optional[np.ndarray]:
+        """Row offsets of every symbol for date, or None if the store has no data on that day
+
+        Returns:
+            np.ndarray: (symbols + 1,) int64 offsets
+        """
+        day = self.day_index.get(date, None)
+        if day is None:
+            return None
+        return self.offsets[day]
+
+    def day_slice(self, date: dt.date) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """Zero-copy view of one day of bars for all symbols
+
+        Returns:
+            tuple[np.ndarray, dict[str, np.ndarray]]: (symbols + 1,) offsets relative to the start of the
+                returned slice, and the time/price columns sliced for the day
+        """
+        rows = self.day_rows(date)
+        if rows is None:
+            rows = np.zeros(len(self.symbols) + 1, dtype=np.int64)
+        start, end = rows[0], rows[-1]
+        columns = {col: self.data[col][start:end] for col in self.columns}
+        columns["time"] = self.time[start:end]
+        return rows - start, columns
+
+    def day_bars(self, date: dt.date) -> DayBars:
+        """One day of bars for every symbol of the store, columns are views on the memory maps"""
+        offsets, columns = self.day_slice(date)
+        time = columns.pop("time")
+        return DayBars(date, self.symbols, offsets, time, columns)
+
+    def symbol_rows(self, symbol: str) -> int:
+        s = self.symbol_index[symbol]
+        return int((self.offsets[:, s + 1] - self.offsets[:, s]).sum())
+
+    def frame(self, symbol: str, date: dt.date) -> pd.DataFrame:
+        """Bars of symbol on date as a DataFrame indexed by time, like the HDF5 source returns"""
+        rows = self.day_rows(date)
+        s = self.symbol_index[symbol]
+        start, end = (rows[s], rows[s + 1]) if rows is not None else (0, 0)
+        index = pd.DatetimeIndex(self.time[start:end])
+        return pd.DataFrame({col: self.data[col][start:end] for col in self.columns}, index=index)
+
+    @classmethod
+    def write(cls, path: str, symbols: list[str], loader: Callable[[str], pd.DataFrame]) -> "MemmapStore":
+        """Writes a store from per-symbol DataFrames without holding all of them in memory.
+
+        The loader is called twice per symbol: once to count bars per day, then to scatter the bars
+        into their day-major position in the output memory maps.
+
+        Args:
+            path (str): store directory, created if needed
+            symbols (list[str]): symbols to write
+            loader (Callable[[str], pd.DataFrame]): returns the full bar history of a symbol
+
+        Returns:
+            MemmapStore: the written store
+        """
+        os.makedirs(path, exist_ok=True)
+
+        # Pass 1: bars per (day, symbol)
+        day_counts = []
+        for symbol in symbols:
+            df = loader(symbol)
+            days, counts = np.unique(_bar_times(df).astype("datetime64[D]"), return_counts=True)
+            day_counts.append((days, counts))
+
+        all_days = np.unique(np.concatenate([days for days, _ in day_counts])) if day_counts else np.array([], dtype="datetime64[D]")
+        counts = np.zeros((len(all_days), len(symbols)), dtype=np.int64)
+        for s, (days, count) in enumerate(day_counts):
+            counts[np.searchsorted(all_days, days), s] = count
+
+        offsets = np.zeros((len(all_days), len(symbols) + 1), dtype=np.int64)
+        offsets[:, 1:] = np.cumsum(counts, axis=1)
+        day_starts = np.concatenate([[0], np.cumsum(offsets[:, -1])[:-1]]).astype(np.int64)
+        offsets += day_starts[:, None]
+        total = int(counts.sum())
+
+        # Pass 2: scatter each symbol's bars into place
+        outputs = {"time": np.lib.format.open_memmap(os.path.join(path, "time.npy"), mode="w+", dtype="datetime64[ns]", shape=(total,))}
+        for col in cls.columns:
+            outputs[col] = np.lib.format.open_memmap(os.path.join(path, col + ".npy"), mode="w+", dtype=np.float64, shape=(total,))
+
+        for s, symbol in enumerate(symbols):
+            df = loader(symbol).sort_index()
+            times = _bar_times(df)
+            day = np.searchsorted(all_days, times.astype("datetime64[D]"))
+            # Position of each bar inside its day block: rows are sorted so rank = row - first row of the day
+            first_of_day = np.searchsorted(day, day)
+            rows = offsets[day, s] + (np.arange(len(day)) - first_of_day)
+            outputs["time"][rows] = times
+            for col in cls.columns:
+                outputs[col][rows] = df[col].to_numpy(dtype=np.float64) if col in df.columns else np.nan
+
+        for output in outputs.values():
+            output.flush()
+        del outputs
+
+        np.save(os.path.join(path, "symbols.npy"), np.array(symbols, dtype=str))
+        np.save(os.path.join(path, "days.npy"), all_days)
+        np.save(os.path.join(path, "offsets.npy"), offsets)
+
+        return cls(path)
+
+
+def _bar_times(df: pd.DataFrame) -> np.ndarray:
+    return df.index.values.astype("datetime64[ns]")
@@ -0,0 +1,103 @@
+import threading
+import datetime as dt
+from time import perf_counter
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Iterable
+
+
+class PrefetchStats:
+    """Counters of a DayPrefetcher
+
+    Attributes
+    ----------
+    requests : int
+        days requested by the simulation
+    ready : int
+        days that were already loaded when requested
+    waited : int
+        days that were still loading when requested, the simulation had to wait
+    missed : int
+        days that were not scheduled (ie out of calendar order) and were loaded on request
+    wait_time : float
+        total seconds the simulation spent waiting for data
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.ready = 0
+        self.waited = 0
+        self.missed = 0
+        self.wait_time = 0.0
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(requests={self.requests}, ready={self.ready}, waited={self.waited}, "
+                f"missed={self.missed}, wait_time={self.wait_time:.4f}s)")
+
+
+class DayPrefetcher:
+    """Loads the next trading days in background threads while the current day is simulated.
+
+    At most depth days ahead of the last requested day are held in memory. Days are dropped as soon as
+    they are handed over to the simulation.
+
+    Args:
+        loader (Callable[[dt.date], Any]): loads one day of data. Must be safe to call from a worker thread
+        dates (Iterable[dt.date]): trading days in simulation order
+        depth (int, optional): number of days to load ahead. Defaults to 2.
+        workers (int, optional): number of loader threads. Defaults to 1.
+    """
+
+    def __init__(self, loader: Callable[[dt.date], Any], dates: Iterable[dt.date], depth: int = 2, workers: int = 1):
+        if depth < 1:
+            raise ValueError(f"depth should be at least 1. Got {depth} instead")
+        self.loader = loader
+        self.dates: list[dt.date] = list(dates)
+        self.depth = depth
+        self.stats = PrefetchStats()
+
+        self._index: dict[dt.date, int] = {date: i for i, date in enumerate(self.dates)}
+        self._pending: OrderedDict[dt.date, Future] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pybt-prefetch")
+
+    def get(self, date: dt.date) -> Any:
+        """Returns the data of date, waiting for it to finish loading if needed. Schedules the next days"""
+        with self._lock:
+            self.stats.requests += 1
+            future = self._pending.pop(date, None)
+            if future is None:
+                self.stats.missed += 1
+                future = self._executor.submit(self.loader, date)
+            elif future.done():
+                self.stats.ready += 1
+            else:
+                self.stats.waited += 1
+            self._schedule_after(date)
+
+        if future.done():
+            return future.result()
+
+        start = perf_counter()
+        result = future.result()
+        self.stats.wait_time += perf_counter() - start
+        return result
+
+    def _schedule_after(self, date: dt.date):
+        position = self._index.get(date, None)
+        upcoming = self.dates[position + 1: position + 1 + self.depth] if position is not None else []
+
+        # Drop anything outside of the window to keep memory bounded
+        for stale in [x for x in self._pending if x not in upcoming]:
+            self._pending.pop(stale).cancel()
+
+        for next_date in upcoming:
+            if next_date not in self._pending:
+                self._pending[next_date] = self._executor.submit(self.loader, next_date)
+
+    def close(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=True)
@@ -1,10 +1,17 @@
 import os
+import copy
 import pickle
+import threading
 import warnings
+import numpy as np
 import pandas as pd
 from typing import Optional
 import datetime as dt
 from pybt.datapack.metadata import DataPackMetaData
+from pybt.datapack.memmap import MemmapStore
+from pybt.datapack.prefetch import DayPrefetcher, PrefetchStats
+from pybt.datapack.daybars import DayBars
+from pybt.datapack.barset import BarSet, source_mtime
 
 DEBUG = False
 
@@ -21,14 +28,32 @@ class PriceData:
         if self.source_type == "pandas-hdf5":
             if kwargs.get("data_generator", None) is not None:
                 self.source = kwargs["data_generator"]
-                self._load_price = self._hdf_load
+                self._read_price = self._hdf_read
                 if not isinstance(self.source, pd.HDFStore):
                     raise TypeError(f"Pandas HDF5 source requires a pandas.HDFStore generator. Got {type(self.source)} instead")
             else:
                 raise AttributeError(f"Pandas HDF5 source requires a data_generator argument to initialize")
 
+        elif self.source_type == "pandas-hdf5-day":
+            if kwargs.get("data_generator", None) is not None:
+                self.source = kwargs["data_generator"]
+                self._read_price = self._hdf_day_read
+                if not isinstance(self.source, pd.HDFStore):
+                    raise TypeError(f"Pandas HDF5 day source requires a pandas.HDFStore generator. Got {type(self.source)} instead")
+            else:
+                raise AttributeError(f"Pandas HDF5 day source requires a data_generator argument to initialize")
+
+        elif self.source_type == "numpy-memmap":
+            if kwargs.get("data_generator", None) is not None:
+                self.source = kwargs["data_generator"]
+                self._read_price = self._memmap_read
+                if not isinstance(self.source, MemmapStore):
+                    raise TypeError(f"NumPy memmap source requires a MemmapStore generator. Got {type(self.source)} instead")
+            else:
+                raise AttributeError(f"NumPy memmap source requires a data_generator argument to initialize")
+
         elif self.source_type == "pandas":
-            self._load_price = self._pd_load
+            self._read_price = self._pd_read
 
             if kwargs.get("df", None) is not None:
                 if not isinstance(kwargs["df"], pd.DataFrame):
@@ -39,7 +64,7 @@ class PriceData:
             self._raw = kwargs["df"]
             self.source = self._raw.groupby(pd.Grouper(freq="D"))
         else:
-            raise NotImplementedError(f"{source_type} is not implemented. Supported sources are [pandas-hdf5, pandas]")
+            raise NotImplementedError(f"{source_type} is not implemented. Supported sources are [pandas-hdf5, pandas-hdf5-day, numpy-memmap, pandas]")
 
     def get_price(self, datetime: dt.datetime) -> pd.Series:
 
@@ -63,26 +88,62 @@ class PriceData:
 
         return self.active_data
 
-    def _pd_load(self, date: dt.date):
-        self.active_data = self.source.get_group(date)
-        self.active_data.sort_index(inplace=True)
+    def _load_price(self, date: dt.date):
+        self.active_data = self._read_price(date)
+        self.active_date = date
+
+    def set_active(self, date: dt.date, data: pd.DataFrame):
+        """Sets data loaded elsewhere (ie by a prefetcher) as the in memory data for date"""
+        self.active_data = data
         self.active_date = date
 
-    def _hdf_load(self, date: dt.date):
+    def _pd_read(self, date: dt.date) -> pd.DataFrame:
+        try:
+            data = self.source.get_group(date)
+        except KeyError:
+            # No bars for this date, keep the same behaviour as an empty HDF5 select
+            data = self._raw.iloc[0:0]
+        return data.sort_index()
+
+    def _hdf_read(self, date: dt.date) -> pd.DataFrame:
         """Lazy Loader for Pandas HDFStore object
-        Loads current date data into memory
+        Reads date data from the store
 
         Args:
-            date (dt.date): Date to load into memory
+            date (dt.date): Date to read
         """
         store = self.source
-        start_string = f"pd.Timestamp('{date.strftime('%Y-%m-%d')}')"
-        end_string = f"pd.Timestamp('{(date + dt.timedelta(days=1)).strftime('%Y-%m-%d')}')"
-        load_string = f"index >= {start_string} & index < {end_string}"
+        return store.select(self.symbol, _day_where(date)).sort_index()
 
-        self.active_data = store.select(self.symbol, load_string)
-        self.active_data.sort_index(inplace=True)
-        self.active_date = date
+    def _hdf_day_read(self, date: dt.date) -> pd.DataFrame:
+        """Reads date data of this symbol from the single 'bars' table of a pandas-hdf5-day store
+
+        Args:
+            date (dt.date): Date to read
+        """
+        data = self.source.select("bars", f"{_day_where(date)} & symbol == {self.symbol!r}")
+        return data.drop(columns="symbol").sort_index()
+
+    def _memmap_read(self, date: dt.date) -> pd.DataFrame:
+        """Reads date data from the memmap store. Columns are views on the memory map
+
+        Args:
+            date (dt.date): Date to read
+        """
+        return self.source.frame(self.symbol, date)
+
+    def _full_history(self) -> pd.DataFrame:
+        """Every bar of this symbol, used when converting between cache formats"""
+        if self.source_type == "pandas":
+            return self._raw
+        elif self.source_type == "pandas-hdf5":
+            return self.source.select(self.symbol)
+        elif self.source_type == "pandas-hdf5-day":
+            return self.source.select("bars", f"symbol == {self.symbol!r}").drop(columns="symbol")
+        elif self.source_type == "numpy-memmap":
+            return pd.concat([self.source.frame(self.symbol, day) for day in self.source.day_index])
+        else:
+            raise NotImplementedError(f"Reading full history is not supported for {self.source_type}")
 
     def _pd_save(self, store: pd.HDFStore):
         if self.source_type != "pandas":
@@ -112,6 +173,10 @@ class PriceData:
         warnings.warn("Call to __len__ for PriceData object is innacurate. The length depends on the data source type")
         if self.source_type == "pandas-hdf5":
             return self.source.get_storer(self.symbol).nrows
+        elif self.source_type == "pandas-hdf5-day":
+            return len(self.source.select_as_coordinates("bars", f"symbol == {self.symbol!r}"))
+        elif self.source_type == "numpy-memmap":
+            return self.source.symbol_rows(self.symbol)
         elif self.source_type == "pandas":
             return len(self.source)
         else:
@@ -121,12 +186,21 @@ class PriceData:
 class PriceDataPack:
     cache_path = "data_cache"
     meta_path = "metadata"
+    cacheable_sources = ["pandas", "pandas-hdf5", "pandas-hdf5-day", "numpy-memmap"]    # Sources that can be converted to day-major caches
 
     def __init__(self, source: str = None, path: str = None):
         self.symbols: list[str] = []
         self.data: dict[str, PriceData] = {}
         self.meta: DataPackMetaData = DataPackMetaData(source, path)
 
+        # Prefetch Context
+        self._prefetcher: DayPrefetcher = None
+        self._prefetched: DayBars = None
+        self._io_lock = threading.Lock()     # HDF5 reads are not thread safe
+
+        # Resampled bars by frequency. See get_bars
+        self._barsets: dict[str, BarSet] = {}
+
     def set_active_symbols(self, symbols: list[str]):
         if all(item in self.data.keys() for item in symbols):
             self.symbols = symbols
@@ -137,7 +211,153 @@ class PriceDataPack:
         return self[symbol].get_price(datetime)
 
     def get_prices(self, symbol, date):
-        return self[symbol].get_prices(date)
+        if self._prefetcher is None:
+            return self[symbol].get_prices(date)
+
+        bars = self._prefetched_day(date)
+        if symbol not in bars:
+            with self._io_lock:
+                return self[symbol].get_prices(date)
+
+        data = bars.frame(symbol)
+        self[symbol].set_active(date, data)
+        return data
+
+    def get_day(self, date: dt.date, symbols: Optional[list[str]] = None) -> DayBars:
+        """Bars of every requested symbol for date, stacked in a single DayBars.
+
+        numpy-memmap and pandas-hdf5-day caches read the whole day in one read (see supports_bulk_day),
+        other sources stack the per-symbol data.
+
+        Args:
+            date (dt.date): trading day
+            symbols (list[str], optional): symbols to return, in that order. Defaults to the active symbols.
+
+        Returns:
+            DayBars: stacked bars of the day
+        """
+        symbols = list(symbols) if symbols is not None else list(self.symbols)
+        if self._prefetcher is not None:
+            bars = self._prefetched_day(date)
+            if all(symbol in bars for symbol in symbols):
+                return bars.select(symbols)
+
+        return self._read_day(date, symbols)
+
+    @property
+    def supports_bulk_day(self) -> bool:
+        """True when get_day reads a whole day of all symbols in one read"""
+        return self._bulk_source() is not None
+
+    def _bulk_source(self) -> Optional[PriceData]:
+        # Bulk reads need every symbol to live in the same day-major store
+        sources = {id(item.source): item for item in self.data.values()}
+        if len(sources) == 1:
+            item = next(iter(sources.values()))
+            if item.source_type in ["numpy-memmap", "pandas-hdf5-day"]:
+                return item
+        return None
+
+    def _prefetched_day(self, date: dt.date) -> DayBars:
+        if self._prefetched is None or self._prefetched.date != date:
+            self._prefetched = self._prefetcher.get(date)
+        return self._prefetched
+
+    def enable_prefetch(self, calendar, depth: int = 2, workers: int = 1, symbols: Optional[list[str]] = None):
+        """Loads the next trading days in the background while the current day is being simulated
+
+        Args:
+            calendar (CalendarData | list[dt.date]): trading days in simulation order
+            depth (int, optional): number of days loaded ahead. Bounds memory to depth + 1 days. Defaults to 2.
+            workers (int, optional): number of loader threads. Defaults to 1.
+            symbols (list[str], optional): symbols to prefetch. Defaults to the active symbols.
+        """
+        self.disable_prefetch()
+        dates = [x if isinstance(x, dt.date) else x.date for x in calendar]
+        symbols = list(symbols) if symbols is not None else list(self.symbols)
+        self._prefetcher = DayPrefetcher(lambda date: self._read_day(date, symbols), dates, depth=depth, workers=workers)
+
+    def disable_prefetch(self):
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+        self._prefetcher = None
+        self._prefetched = None
+
+    def close(self):
+        """Stops prefetching and closes the HDF5 stores the datapack reads from. The datapack can not read
+        from them afterwards"""
+        self.disable_prefetch()
+        for store in {id(x.source): x.source for x in self.data.values()}.values():
+            if isinstance(store, pd.HDFStore):
+                store.close()
+
+    @property
+    def prefetch_stats(self) -> Optional[PrefetchStats]:
+        return self._prefetcher.stats if self._prefetcher is not None else None
+
+    def _read_day(self, date: dt.date, symbols: list[str]) -> DayBars:
+        """Reads one day of data for symbols without touching the PriceData in memory state"""
+        bulk = self._bulk_source()
+        if bulk is not None and bulk.source_type == "numpy-memmap":
+            return bulk.source.day_bars(date).select(symbols)
+
+        if bulk is not None and bulk.source_type == "pandas-hdf5-day":
+            with self._io_lock:
+                data = bulk.source.select("bars", _day_where(date))
+            return DayBars.from_long_frame(date, data, symbols)
+
+        frames = {}
+        for symbol in symbols:
+            if self[symbol].source_type.startswith("pandas-hdf5"):
+                with self._io_lock:
+                    frames[symbol] = self[symbol]._read_price(date)
+            else:
+                frames[symbol] = self[symbol]._read_price(date)
+        return DayBars.from_frames(date, frames)
+
+    def get_bars(self, calendar, frequency: str, symbols: Optional[list[str]] = None, path: Optional[str] = None) -> BarSet:
+        """Hourly or daily OHLCV bars resampled from the minute data, for every day of calendar.
+
+        Bars are computed once per datapack and frequency. Cached datapacks also keep a copy next to the
+        cache file (<cache>.<frequency>.bars.npz) that is reused by later runs until the cache changes.
+
+        Args:
+            calendar (CalendarData): trading days with their open and close times
+            frequency (str): "1hour" or "daily"
+            symbols (list[str], optional): symbols to resample. Defaults to the active symbols.
+            path (str, optional): where to keep the bars on disk. Defaults to next to the cache file,
+                datapacks that are not cached only keep them in memory.
+
+        Returns:
+            BarSet: resampled bars
+        """
+        symbols = list(symbols) if symbols is not None else list(self.symbols)
+        dates = [x.date for x in calendar]
+        barset = self._barsets.get(frequency, None)
+        if barset is not None and barset.covers(dates, symbols):
+            return barset
+
+        source_type, source_path = _cache_source(self.meta)
+        if path is None and self.is_cached():
+            path = os.path.splitext(source_path)[0] + f".{frequency}.bars.npz"
+        mtime = source_mtime(source_path) if self.is_cached() else 0.0
+
+        barset = None
+        if path is not None and os.path.exists(path):
+            with np.load(path) as f:
+                fresh = float(f["source_mtime"]) == mtime if "source_mtime" in f else False
+            if fresh:
+                barset = BarSet.load(path)
+                if not barset.covers(dates, symbols):
+                    barset = None
+
+        if barset is None:
+            barset = BarSet.build(self, calendar, symbols, frequency)
+            if path is not None:
+                barset.save(path, source_mtime=mtime)
+
+        self._barsets[frequency] = barset
+        return barset
 
     def load_bulk_data(self, data: list[PriceData]) -> None:
         for item in data:
@@ -155,6 +375,34 @@ class PriceDataPack:
     def __len__(self):
         return len(self.data)
 
+    def is_cached(self) -> bool:
+        """True if the datapack reads from a cache on disk (see create_cache)"""
+        source_type, source_path = _cache_source(self.meta)
+        return source_type in ["pandas-hdf5", "pandas-hdf5-day", "numpy-memmap"] and source_path is not None
+
+    def reopen(self) -> 'PriceDataPack':
+        """A datapack reading the same cache with its own file handles, ie for use in another process.
+        Datapacks that are not cached are returned as is"""
+        if not self.is_cached():
+            return self
+        dp = self._load_metadata(self.meta, list(self.data.keys()))
+        dp.symbols = list(self.symbols)
+        return dp
+
+    def __reduce__(self):
+        # Cached datapacks are pickled as their metadata and reopened, in memory ones without thread state
+        if self.is_cached():
+            return (_reopen_datapack, (self.meta, list(self.data.keys()), list(self.symbols)))
+        state = {key: value for key, value in self.__dict__.items() if key not in ["_io_lock", "_prefetcher", "_prefetched"]}
+        return (type(self), (), state)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._io_lock = threading.Lock()
+        self._prefetcher = None
+        self._prefetched = None
+        self.__dict__.setdefault("_barsets", {})
+
     def save(self, path: str) -> None:
         self.meta.save(path)
 
@@ -163,33 +411,45 @@ class PriceDataPack:
         metadata = None
         cls.valid_filename(name, raise_error=True)
         metadata_dir = os.path.join(os.getcwd(), cls.cache_path, cls.meta_path)
-        metadata_path = os.path.join(metadata_dir, name + ".pkl")
+        metadata_path = path_to_meta if path_to_meta is not None else os.path.join(metadata_dir, os.path.splitext(name)[0] + ".pkl")
 
         with open(metadata_path, "rb") as f:
             metadata = pickle.load(f)
 
-        if metadata.source == "pandas-hdf5":
-            store = pd.HDFStore(metadata.source_path, mode="r")  # doesnt load into memory
-            keys = store.keys()
-            dps = []
-            dp = cls()
-            dp.meta = metadata
+        return cls._load_metadata(metadata, active_symbols)
 
-            # Dont load all of the cached data, just subsets
-            if active_symbols:
-                if all(item in [key.replace("/", "") for key in keys] for item in active_symbols):
-                    keys = active_symbols
+    @classmethod
+    def _load_metadata(cls, metadata: DataPackMetaData, active_symbols: Optional[list[str]] = None) -> 'PriceDataPack':
+        source_type, source_path = _cache_source(metadata)
+
+        if source_type == "pandas-hdf5":
+            store = pd.HDFStore(source_path, mode="r")  # doesnt load into memory
+            keys = [key.replace("/", "") for key in store.keys()]
+        elif source_type == "pandas-hdf5-day":
+            store = pd.HDFStore(source_path, mode="r")
+            keys = getattr(metadata, "symbols", None) or list(store.select_column("bars", "symbol").unique())
+        elif source_type == "numpy-memmap":
+            store = MemmapStore(source_path)    # memory mapped, doesnt load into memory
+            keys = store.symbols
+        else:
+            raise NotImplementedError("Only supports pandas-hdf5, pandas-hdf5-day and numpy-memmap")
 
-            for key in keys:
-                symbol = key.replace("/", "")
-                temp = PriceData(symbol, metadata.source, data_generator=store)
-                dps.append(temp)
+        dps = []
+        dp = cls()
+        dp.meta = metadata
 
-            dp.load_bulk_data(dps)
+        # Dont load all of the cached data, just subsets
+        if active_symbols:
+            if all(item in keys for item in active_symbols):
+                keys = active_symbols
 
-            return dp
-        else:
-            raise NotImplementedError("Only supports pandas-hdf5")
+        for symbol in keys:
+            temp = PriceData(symbol, source_type, data_generator=store)
+            dps.append(temp)
+
+        dp.load_bulk_data(dps)
+
+        return dp
 
     @classmethod
     def load_pandas(cls, dfs: dict[str, pd.DataFrame], active_symbols: list = None):
@@ -229,8 +489,17 @@ class PriceDataPack:
                 return False
         return True
 
-    def create_cache(self, name: str, overwrite: bool = False):
-        metadata = self.meta
+    def create_cache(self, name: str, overwrite: bool = False, source_type: str = "pandas-hdf5"):
+        """Saves the datapack to the data_cache directory so it can be reloaded with load_cache
+
+        Args:
+            name (str): cache name
+            overwrite (bool, optional): replace an existing cache. Defaults to False.
+            source_type (str, optional): "pandas-hdf5" (one table per symbol), "pandas-hdf5-day" (one table
+                of all symbols indexed by time, a day is one read) or "numpy-memmap" (day-major columnar
+                memory maps). Defaults to "pandas-hdf5".
+        """
+        metadata = copy.copy(self.meta)     # The datapack itself keeps reading from its current source
         self.valid_filename(name, raise_error=True)  # Check if valid filename, this raises an error and stops execution
         cache_dir = os.path.join(os.getcwd(), self.cache_path)
         if not os.path.exists(cache_dir):
@@ -239,25 +508,83 @@ class PriceDataPack:
         if not os.path.exists(os.path.join(cache_dir, self.meta_path)):
             os.mkdir(os.path.join(cache_dir, self.meta_path))
 
-        file_name = name + ".h5"
+        if source_type in ["pandas-hdf5", "pandas-hdf5-day"]:
+            file_name = name + ".h5"
+        elif source_type == "numpy-memmap":
+            file_name = name + ".npcache"
+        else:
+            raise NotImplementedError(f"Caching to {source_type} is not yet supported")
+
         file_path = os.path.join(cache_dir, file_name)
         full_path = os.path.abspath(file_path)
 
         if os.path.exists(full_path) & (not overwrite):
             raise FileExistsError(f"{full_path} exists already. Set overwrite mode if you want to replace the file")
 
-        if metadata.data_type == "pandas":
+        if source_type == "pandas-hdf5" and metadata.data_type == "pandas":
             store = pd.HDFStore(full_path, mode="w")
 
             for key, data in self.data.items():
                 data._pd_save(store)
 
             store.close()
-            metadata.data_type = "pandas-hdf5"
-            metadata.file_path = full_path
-
-            self.meta = metadata
-            self.save(os.path.join(cache_dir, self.meta_path, name + ".pkl"))
-            print(f"Saved cached data at {full_path}")
+        elif source_type == "pandas-hdf5-day" and metadata.data_type in self.cacheable_sources:
+            store = pd.HDFStore(full_path, mode="w")
+            width = max([len(x) for x in self.data.keys()] + [1])
+            for symbol, data in self.data.items():
+                df = data._full_history().sort_index().assign(symbol=symbol)
+                store.append("bars", df, data_columns=["symbol"], min_itemsize={"symbol": width}, index=False)
+            store.create_table_index("bars", columns=["index", "symbol"], optlevel=9, kind="full")
+            store.close()
+            metadata.symbols = list(self.data.keys())
+        elif source_type == "numpy-memmap" and metadata.data_type in self.cacheable_sources:
+            MemmapStore.write(full_path, list(self.data.keys()), lambda symbol: self[symbol]._full_history())
         else:
-            raise NotImplementedError(f"Caching {metadata.data_type} is not yet supported")
+            raise NotImplementedError(f"Caching {metadata.data_type} to {source_type} is not yet supported")
+
+        metadata.data_type = source_type
+        metadata.file_path = full_path
+
+        metadata.save(os.path.join(cache_dir, self.meta_path, name + ".pkl"))
+        print(f"Saved cached data at {full_path}")
+
+    @classmethod
+    def convert_cache(cls, name: str, new_name: str, source_type: str = "numpy-memmap", overwrite: bool = False) -> 'PriceDataPack':
+        """Converts an existing cache (ie pandas-hdf5) to another cache format and loads it
+
+        Args:
+            name (str): existing cache name
+            new_name (str): name of the converted cache
+            source_type (str, optional): format to convert to. Defaults to "numpy-memmap".
+            overwrite (bool, optional): replace an existing cache named new_name. Defaults to False.
+
+        Returns:
+            PriceDataPack: datapack loaded from the converted cache
+        """
+        datapack = cls.load_cache(name)
+        try:
+            datapack.meta.data_type, datapack.meta.file_path = _cache_source(datapack.meta)
+            datapack.create_cache(new_name, overwrite=overwrite, source_type=source_type)
+        finally:
+            datapack.close()    # Release the source file before the converted cache is opened
+        return cls.load_cache(new_name)
+
+
+def _cache_source(metadata: DataPackMetaData) -> tuple[str, str]:
+    """Source type and path of a cache. Older metadata files used source/source_path instead of data_type/file_path"""
+    source_type = getattr(metadata, "data_type", None) or getattr(metadata, "source", None)
+    source_path = getattr(metadata, "file_path", None) or getattr(metadata, "source_path", None)
+    return source_type, source_path
+
+
+def _day_where(date: dt.date) -> str:
+    """HDFStore where clause selecting the rows of date"""
+    start_string = f"pd.Timestamp('{date.strftime('%Y-%m-%d')}')"
+    end_string = f"pd.Timestamp('{(date + dt.timedelta(days=1)).strftime('%Y-%m-%d')}')"
+    return f"index >= {start_string} & index < {end_string}"
+
+
+def _reopen_datapack(metadata: DataPackMetaData, keys: list[str], symbols: list[str]) -> PriceDataPack:
+    dp = PriceDataPack._load_metadata(metadata, keys)
+    dp.symbols = symbols
+    return dp
@@ -0,0 +1,219 @@
+from pybt.datapack.calendar_data import CalendarData
+from pybt.datapack.memmap import MemmapStore
+from pybt.datapack.metadata import DataPackMetaData
+from pybt.datapack.pricedata import PriceDataPack
+from datetime import date, datetime, time, timedelta
+import os
+import numpy as np
+import pandas as pd
+
+HALF_DAY_CLOSE = time(13)
+
+
+def symbol_names(n_symbols: int) -> list[str]:
+    """n_symbols placeholder symbols, ie ["S0000", "S0001", ...]"""
+    return [f"S{i:04d}" for i in range(n_symbols)]
+
+
+def trading_days(start: date, n_days: int) -> list[date]:
+    """First n_days weekdays from start (inclusive)"""
+    days = []
+    day = start
+    while len(days) < n_days:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def synthetic_frames(symbols: list[str], days: list[date], drop: float = 0.3, seed: int = 0,
+                     open_time: time = time(9, 30), close_time: time = time(16)) -> dict[str, pd.DataFrame]:
+    """Seeded random walk minute bars for every symbol, with a fraction of bars dropped to leave gaps
+
+    Args:
+        symbols (list[str]): symbols to generate
+        days (list[date]): trading days
+        drop (float, optional): fraction of minute bars removed at random. Defaults to 0.3.
+        seed (int, optional): random seed, the same seed always gives the same bars. Defaults to 0.
+        open_time (time, optional): session open. Defaults to time(9, 30).
+        close_time (time, optional): session close, included. Defaults to time(16).
+
+    Returns:
+        dict[str, pd.DataFrame]: open/high/low/close/volume frames indexed by minute, ready for PriceDataPack.load_pandas
+    """
+    rng = np.random.default_rng(seed)
+    session = int((datetime.combine(date.min, close_time) - datetime.combine(date.min, open_time)) // timedelta(minutes=1)) + 1
+    opens = np.array([datetime.combine(x, open_time) for x in days], dtype="datetime64[m]")
+    index = (opens[:, None] + np.arange(session)).ravel()
+
+    dfs = {}
+    for symbol in symbols:
+        keep = rng.random(len(index)) >= drop
+        returns = rng.standard_normal(keep.sum()) * 0.001
+        close = 100 * np.exp(returns.cumsum()) * rng.uniform(0.5, 2)
+        open_ = np.concatenate([close[:1], close[:-1]])
+        spread = np.abs(rng.standard_normal(len(close))) * close * 0.0005
+        dfs[symbol] = pd.DataFrame({
+            "open": open_,
+            "high": np.maximum(open_, close) + spread,
+            "low": np.minimum(open_, close) - spread,
+            "close": close,
+            "volume": rng.integers(100, 10_000, len(close)).astype(np.float64),
+        }, index=pd.DatetimeIndex(index[keep].astype("datetime64[ns]")))
+
+    return dfs
+
+
+def synthetic_datapack(symbols: list[str], days: list[date], drop: float = 0.3, seed: int = 0) -> PriceDataPack:
+    """In memory PriceDataPack of synthetic_frames"""
+    return PriceDataPack.load_pandas(synthetic_frames(symbols, days, drop, seed))
+
+
+def synthetic_calendar(days: list[date], open_time: time = time(9, 30), close_time: time = time(16)) -> CalendarData:
+    """CalendarData with the same session every day"""
+    return CalendarData.from_arrays(days, [open_time] * len(days), [close_time] * len(days))
+
+
+def market_calendar(start: date, n_days: int, open_time: time = time(9, 30), close_time: time = time(16)) -> CalendarData:
+    """n_days trading days from start with the main US market holidays removed and early closes on the days
+    around them (July 3, the day after Thanksgiving and Christmas Eve)"""
+    days, closes = [], []
+    day = start
+    while len(days) < n_days:
+        if day.weekday() < 5 and not _is_holiday(day):
+            days.append(day)
+            closes.append(HALF_DAY_CLOSE if _is_half_day(day) else close_time)
+        day += timedelta(days=1)
+    return CalendarData.from_arrays(days, [open_time] * len(days), closes)
+
+
+def write_synthetic_cache(name: str, calendar: CalendarData, n_symbols: int, seed: int = 0, overwrite: bool = False,
+                          listing_rate: float = 0.1, halt_rate: float = 0.002, max_drop: float = 0.5) -> PriceDataPack:
+    """Writes seeded random walk minute bars of n_symbols symbols over every day of calendar straight into a
+    numpy-memmap cache, one day at a time so memory stays flat whatever the size of the cache. Reload it
+    with PriceDataPack.load_cache(name); the calendar is saved next to it as <name>.calendar.npz.
+
+    The data mimics real minute bars: every symbol has its own price, volatility and liquidity (fraction of
+    minutes without a trade, up to max_drop), a fraction listing_rate of the symbols is listed after the
+    first day or delisted before the last, and a symbol is halted for a whole day with probability halt_rate.
+
+    Args:
+        name (str): cache name
+        calendar (CalendarData): trading days and sessions, ie market_calendar(...)
+        n_symbols (int): universe size, symbols are named by symbol_names
+        seed (int, optional): random seed. The same seed always gives the same cache. Defaults to 0.
+        overwrite (bool, optional): replace an existing cache. Defaults to False.
+
+    Returns:
+        PriceDataPack: the cache, loaded
+    """
+    PriceDataPack.valid_filename(name, raise_error=True)
+    cache_dir = os.path.join(os.getcwd(), PriceDataPack.cache_path)
+    full_path = os.path.abspath(os.path.join(cache_dir, name + ".npcache"))
+    if os.path.exists(full_path) and not overwrite:
+        raise FileExistsError(f"{full_path} exists already. Set overwrite mode if you want to replace the file")
+    os.makedirs(os.path.join(cache_dir, PriceDataPack.meta_path), exist_ok=True)
+
+    symbols = symbol_names(n_symbols)
+    n_days = len(calendar)
+    sessions = ((calendar.closes - calendar.opens) // np.timedelta64(1, "m")).astype(np.int64)
+    universe = _SyntheticUniverse(n_symbols, n_days, seed, listing_rate, max_drop)
+
+    # Pass 1: bars per (day, symbol). Masks come from their own per day stream so pass 2 draws the same ones
+    counts = np.zeros((n_days, n_symbols), dtype=np.int64)
+    for d in range(n_days):
+        counts[d] = universe.bar_mask(d, sessions[d], halt_rate).sum(axis=1)
+
+    offsets = np.zeros((n_days, n_symbols + 1), dtype=np.int64)
+    offsets[:, 1:] = np.cumsum(counts, axis=1)
+    offsets += np.concatenate([[0], np.cumsum(offsets[:, -1])[:-1]])[:, None]
+    total = int(counts.sum())
+
+    # Pass 2: rows of a day are (symbol, time) sorted, which is the row major order of the (symbols x minutes) grid
+    os.makedirs(full_path, exist_ok=True)
+    outputs = {"time": np.lib.format.open_memmap(os.path.join(full_path, "time.npy"), mode="w+", dtype="datetime64[ns]", shape=(total,))}
+    for col in MemmapStore.columns:
+        outputs[col] = np.lib.format.open_memmap(os.path.join(full_path, col + ".npy"), mode="w+", dtype=np.float64, shape=(total,))
+
+    for d in range(n_days):
+        mask = universe.bar_mask(d, sessions[d], halt_rate)
+        bars = universe.day_bars(d, sessions[d])
+        start, end = offsets[d, 0], offsets[d, -1]
+        times = calendar.opens[d].astype("datetime64[ns]") + np.arange(sessions[d]).astype("timedelta64[m]")
+        outputs["time"][start:end] = np.broadcast_to(times, mask.shape)[mask]
+        for col in MemmapStore.columns:
+            outputs[col][start:end] = bars[col][mask]
+
+    for output in outputs.values():
+        output.flush()
+    del outputs
+
+    np.save(os.path.join(full_path, "symbols.npy"), np.array(symbols, dtype=str))
+    np.save(os.path.join(full_path, "days.npy"), calendar.dates)
+    np.save(os.path.join(full_path, "offsets.npy"), offsets)
+    calendar.save(os.path.join(cache_dir, name + ".calendar.npz"))
+
+    metadata = DataPackMetaData("numpy-memmap", "synthetic", full_path, seed=seed, symbols=symbols)
+    metadata.save(os.path.join(cache_dir, PriceDataPack.meta_path, name + ".pkl"))
+    return PriceDataPack.load_cache(name)
+
+
+class _SyntheticUniverse:
+    """Per symbol parameters of write_synthetic_cache and the bars of one day. Every day draws from its own
+    seeded streams so a day can be generated again without replaying the days before it, except for the
+    price level which carries over from the previous close"""
+
+    def __init__(self, n_symbols: int, n_days: int, seed: int, listing_rate: float, max_drop: float):
+        self.seed = seed
+        rng = np.random.default_rng([seed, 0])
+        self.price = np.exp(rng.uniform(np.log(5), np.log(500), n_symbols))
+        self.volatility = rng.uniform(0.0003, 0.002, n_symbols)    # per minute log return deviation
+        self.drop = rng.uniform(0, max_drop, n_symbols)
+
+        # Listed days [first, last), a listed symbol is either listed late or delisted early
+        self.first = np.zeros(n_symbols, dtype=np.int64)
+        self.last = np.full(n_symbols, n_days, dtype=np.int64)
+        changed = np.flatnonzero(rng.random(n_symbols) < listing_rate)
+        late = rng.random(len(changed)) < 0.5
+        cut = rng.integers(1, max(n_days, 2), len(changed))
+        self.first[changed[late]] = cut[late]
+        self.last[changed[~late]] = cut[~late]
+
+    def bar_mask(self, day: int, session: int, halt_rate: float) -> np.ndarray:
+        """(symbols x minutes) bool, True where the symbol has a bar"""
+        rng = np.random.default_rng([self.seed, 1, day])
+        listed = (self.first <= day) & (day < self.last) & (rng.random(len(self.first)) >= halt_rate)
+        return (rng.random((len(self.first), session)) >= self.drop[:, None]) & listed[:, None]
+
+    def day_bars(self, day: int, session: int) -> dict[str, np.ndarray]:
+        """(symbols x minutes) open/high/low/close/volume of every minute of the day. Call in day order"""
+        rng = np.random.default_rng([self.seed, 2, day])
+        n = len(self.price)
+        returns = rng.standard_normal((n, session)) * self.volatility[:, None]
+        close = self.price[:, None] * np.exp(np.cumsum(returns, axis=1))
+        open_ = np.empty_like(close)
+        open_[:, 0] = self.price
+        open_[:, 1:] = close[:, :-1]
+        spread = np.abs(rng.standard_normal((n, session))) * close * self.volatility[:, None] * 0.5
+        self.price = close[:, -1].copy()
+        return {
+            "open": open_,
+            "high": np.maximum(open_, close) + spread,
+            "low": np.minimum(open_, close) - spread,
+            "close": close,
+            "volume": rng.integers(100, 10_000, (n, session)).astype(np.float64),
+        }
+
+
+def _is_holiday(day: date) -> bool:
+    return (day.month, day.day) in [(1, 1), (7, 4), (12, 25)] or day == _thanksgiving(day.year)
+
+
+def _is_half_day(day: date) -> bool:
+    return (day.month, day.day) in [(7, 3), (12, 24)] or day == _thanksgiving(day.year) + timedelta(days=1)
+
+
+def _thanksgiving(year: int) -> date:
+    """Fourth Thursday of November"""
+    first = date(year, 11, 1)
+    return first + timedelta(days=(3 - first.weekday()) % 7 + 21)
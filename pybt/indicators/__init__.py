@@ -0,0 +1,5 @@
+from pybt.indicators.base import BaseIndicator
+from pybt.indicators.average import SMAIndicator, EMAIndicator, BollingerBands, VWAPIndicator
+from pybt.indicators.momentum import RSIIndicator
+from pybt.indicators.extrema import RollingMax, RollingMin
+from pybt.indicators.bank import IndicatorBank
@@ -0,0 +1,108 @@
+from pybt.indicators.base import BaseIndicator, RingBuffer
+from typing import Union
+import numpy as np
+
+
+class SMAIndicator(BaseIndicator):
+    """Simple moving average over the last `duration` prices. Running sum over a ring buffer, O(1) per update"""
+
+    def __init__(self, symbol: Union[str, list[str]], duration: int, length: int = 30):
+        super().__init__(symbol, length)
+        self.duration = duration
+        self.history = RingBuffer(duration, len(self.symbols))
+        self._sum = np.zeros(len(self.symbols))
+        self._valid = np.zeros(len(self.symbols), dtype=np.int64)
+
+    def _update(self, prices: np.ndarray) -> np.ndarray:
+        dropped = self.history.push(prices)
+        self._sum += np.nan_to_num(prices) - np.nan_to_num(dropped)
+        self._valid += np.isfinite(prices).astype(np.int64) - np.isfinite(dropped)
+        if self.history.wrapped:
+            # Resum once per window so float error of the running sum does not build up
+            self._sum = _sequential_sum(self.history.rows)
+        return np.where(self._valid == self.duration, self._sum / self.duration, np.nan)
+
+
+class EMAIndicator(BaseIndicator):
+    """Exponential moving average with smoothing 2 / (duration + 1), seeded with the SMA of the first
+    `duration` prices (same as TA-Lib's EMA). Missing prices (NaN) leave a symbol's average unchanged"""
+
+    def __init__(self, symbol: Union[str, list[str]], duration: int, length: int = 30):
+        super().__init__(symbol, length)
+        self.duration = duration
+        self.alpha = 2 / (duration + 1)
+        self._ema = np.full(len(self.symbols), np.nan)
+        self._seed = np.zeros(len(self.symbols))
+        self._seen = np.zeros(len(self.symbols), dtype=np.int64)
+
+    def _update(self, prices: np.ndarray) -> np.ndarray:
+        valid = np.isfinite(prices)
+        seeding = valid & (self._seen < self.duration)
+        steady = valid & ~seeding
+
+        self._seed[seeding] += prices[seeding]
+        self._seen[valid] += 1
+        seeded = seeding & (self._seen == self.duration)
+        self._ema[seeded] = self._seed[seeded] / self.duration
+        self._ema[steady] += self.alpha * (prices[steady] - self._ema[steady])
+        return self._ema.copy()
+
+
+class BollingerBands(BaseIndicator):
+    """SMA of the last `duration` prices plus/minus nbdev population standard deviations.
+
+    update returns (upper, middle, lower), like TA-Lib's BBANDS.
+    """
+
+    def __init__(self, symbol: Union[str, list[str]], duration: int = 20, nbdev: float = 2.0, length: int = 30):
+        super().__init__(symbol, length)
+        self.duration = duration
+        self.nbdev = nbdev
+        self.history = RingBuffer(duration, len(self.symbols))
+        self._sum = np.zeros(len(self.symbols))
+        self._sum_sq = np.zeros(len(self.symbols))
+        self._valid = np.zeros(len(self.symbols), dtype=np.int64)
+
+    def _update(self, prices: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        dropped = self.history.push(prices)
+        x, old = np.nan_to_num(prices), np.nan_to_num(dropped)
+        self._sum += x - old
+        self._sum_sq += x * x - old * old
+        self._valid += np.isfinite(prices).astype(np.int64) - np.isfinite(dropped)
+        if self.history.wrapped:
+            self._sum = _sequential_sum(self.history.rows)
+            self._sum_sq = _sequential_sum(self.history.rows ** 2)
+
+        full = self._valid == self.duration
+        middle = np.where(full, self._sum / self.duration, np.nan)
+        deviation = np.sqrt(np.maximum(self._sum_sq / self.duration - middle ** 2, 0)) * self.nbdev
+        return middle + deviation, middle, middle - deviation
+
+
+class VWAPIndicator(BaseIndicator):
+    """Volume weighted average price since the start of the session. Call reset at every session open.
+
+    update takes the price and the volume traded at that price.
+    """
+
+    def __init__(self, symbol: Union[str, list[str]], length: int = 30):
+        super().__init__(symbol, length)
+        self._value = np.zeros(len(self.symbols))
+        self._volume = np.zeros(len(self.symbols))
+
+    def reset(self):
+        self._value[:] = 0
+        self._volume[:] = 0
+
+    def _update(self, prices: np.ndarray, volumes: np.ndarray) -> np.ndarray:
+        valid = np.isfinite(prices) & np.isfinite(volumes)
+        self._value += np.where(valid, prices * volumes, 0)
+        self._volume += np.where(valid, volumes, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self._volume > 0, self._value / self._volume, np.nan)
+
+
+def _sequential_sum(rows: np.ndarray) -> np.ndarray:
+    """Column sums ignoring NaN, added in row order whatever the number of columns, so an indicator gives
+    bit-identical results in single and batch mode (np.sum switches to pairwise summation for one column)"""
+    return np.add.accumulate(np.nan_to_num(rows), axis=0)[-1]
@@ -0,0 +1,73 @@
+from pybt.indicators.base import BaseIndicator
+from typing import Union
+import numpy as np
+
+
+class IndicatorBank:
+    """Indicators of a whole universe, precomputed one trading day at a time.
+
+    Every registered indicator runs in batch mode over all symbols. compute_day feeds it the day's
+    (symbols x ticks) price block column by column and keeps every output, so reading an indicator during
+    the simulation is an array lookup instead of one update call per symbol per tick. Indicator objects live
+    across days, so warm-up state carries over from the previous day.
+
+    The whole day is computed ahead of time. Strategies should only read the current tick (Market.get_indicator),
+    later columns are in the future.
+    """
+
+    def __init__(self, symbols: list[str]):
+        self.symbols = list(symbols)
+        self.indicators: dict[str, BaseIndicator] = {}
+        self.values: dict[str, Union[np.ndarray, tuple[np.ndarray, ...]]] = {}
+        self._specs: dict[str, tuple] = {}
+
+    def __len__(self):
+        return len(self.indicators)
+
+    def __contains__(self, name: str):
+        return name in self.indicators
+
+    def __getitem__(self, name: str) -> Union[np.ndarray, tuple[np.ndarray, ...]]:
+        """(symbols x ticks) values of the current day. Tuple of blocks for indicators with several outputs"""
+        return self.values[name]
+
+    def register(self, name: str, indicator: type, *args, **kwargs) -> BaseIndicator:
+        """Adds indicator(symbols, *args, **kwargs) under name. Registering the same name again with the same
+        arguments returns the existing indicator
+
+        Args:
+            name (str): name used to read the indicator
+            indicator (type): BaseIndicator subclass, ie SMAIndicator
+            *args, **kwargs: indicator arguments after symbol, ie the duration
+        """
+        spec = (indicator, args, tuple(sorted(kwargs.items())))
+        if name in self.indicators:
+            if self._specs[name] != spec:
+                raise ValueError(f"Indicator '{name}' is already registered with different arguments")
+            return self.indicators[name]
+
+        self.indicators[name] = indicator(self.symbols, *args, **kwargs)
+        self._specs[name] = spec
+        return self.indicators[name]
+
+    def compute_day(self, prices: np.ndarray, names: list[str] = None):
+        """Runs the indicators over one day of prices
+
+        Args:
+            prices (np.ndarray): (symbols x ticks) float64 prices, NaN for symbols without data
+            names (list[str], optional): indicators to compute. Defaults to all of them.
+        """
+        for name in names if names is not None else list(self.indicators):
+            indicator = self.indicators[name]
+            outputs = [indicator.update(prices[:, tick]) for tick in range(prices.shape[1])]
+            if outputs and isinstance(outputs[0], tuple):
+                self.values[name] = tuple(np.stack(x, axis=1) for x in zip(*outputs))
+            else:
+                self.values[name] = np.stack(outputs, axis=1) if outputs else np.empty((len(self.symbols), 0))
+
+    def current(self, name: str, tick: int) -> Union[np.ndarray, tuple[np.ndarray, ...]]:
+        """(symbols,) values at tick"""
+        values = self.values[name]
+        if isinstance(values, tuple):
+            return tuple(x[:, tick] for x in values)
+        return values[:, tick]
@@ -0,0 +1,98 @@
+from pybt.commons import Money
+from collections import deque
+from typing import Union
+import numpy as np
+
+
+class BaseIndicator:
+    """Streaming indicator of one symbol, or of many symbols at once (batch mode).
+
+    Subclasses keep fixed size state per symbol (ring buffers, running sums) so update is constant time
+    whatever the duration, and implement `_update` on (symbols,) float64 arrays.
+
+    Single mode: `Indicator("AAPL", ...)`. update takes a Money/float price and returns a Money (or float for
+    unitless indicators), or None while the indicator is warming up.
+
+    Batch mode: `Indicator(["AAPL", "GOOG"], ...)`. update takes a (symbols,) float array, ie
+    Market.get_current_prices(), and returns a (symbols,) float array, NaN while warming up.
+
+    Attributes
+    ----------
+    symbol : str | list[str]
+        symbol(s) the indicator was created for
+    symbols : list[str]
+        symbols in batch order
+    data : deque
+        last `length` outputs, oldest first
+    """
+    money_output = True     # Single mode outputs are prices (Money) rather than plain floats
+
+    def __init__(self, symbol: Union[str, list[str]], length: int = 30):
+        self.symbol = symbol
+        self.batch = not isinstance(symbol, str)
+        self.symbols: list[str] = list(symbol) if self.batch else [symbol]
+        self.length = length
+        self.data = deque([None for _ in range(length)], maxlen=length)
+        self.count = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def update(self, current_price, *args):
+        """Adds the latest price and returns the new value of the indicator"""
+        values = self._update(_as_row(current_price, len(self.symbols)), *[_as_row(x, len(self.symbols)) for x in args])
+        self.count += 1
+        output = self._output(values)
+        self.data.append(output)
+        return output
+
+    @property
+    def value(self):
+        """Latest output, same as the last value returned by update"""
+        return self.data[-1]
+
+    def _update(self, prices: np.ndarray, *args) -> np.ndarray:
+        raise NotImplementedError("Indicator class must have an '_update' method defined")
+
+    def _output(self, values):
+        if self.batch:
+            return values
+        if isinstance(values, tuple):
+            return tuple(self._scalar(x) for x in values) if not np.isnan(values[0][0]) else None
+        return self._scalar(values)
+
+    def _scalar(self, values: np.ndarray):
+        value = float(values[0])
+        if np.isnan(value):
+            return None
+        return Money(value) if self.money_output else value
+
+
+def _as_row(value, n: int) -> np.ndarray:
+    """(n,) float64 row from a Money, float or array"""
+    if isinstance(value, Money):
+        value = value.cents / 100
+    row = np.asarray(value, dtype=np.float64)
+    if row.ndim == 0:
+        row = np.full(n, float(row))
+    return row
+
+
+class RingBuffer:
+    """Last `size` rows of (symbols,) values. push returns the row that falls out of the window (NaN until full)"""
+
+    def __init__(self, size: int, width: int):
+        self.size = size
+        self.rows = np.full((size, width), np.nan)
+        self.position = 0
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        dropped = self.rows[self.position].copy()
+        self.rows[self.position] = row
+        self.position = (self.position + 1) % self.size
+        return dropped
+
+    @property
+    def wrapped(self) -> bool:
+        """True right after the buffer has been filled once more, ie every `size` pushes"""
+        return self.position == 0
@@ -0,0 +1,52 @@
+from pybt.indicators.base import BaseIndicator
+from typing import Union
+import numpy as np
+
+
+class _RollingExtremum(BaseIndicator):
+    """Max/min of the last `duration` prices in O(1) per update (van Herk/Gil-Werman).
+
+    The stream is cut in blocks of `duration` prices. The window ending at position k of the current block is
+    the suffix k + 1: of the previous block plus the prefix :k + 1 of the current one, so keeping the suffix
+    extrema of the previous block (computed once per block) and the running prefix extremum is enough.
+    Missing prices (NaN) are ignored, the output is NaN until `duration` prices have been seen.
+    """
+    reduce = None
+    identity = None
+
+    def __init__(self, symbol: Union[str, list[str]], duration: int, length: int = 30):
+        super().__init__(symbol, length)
+        self.duration = duration
+        self._block = np.full((duration, len(self.symbols)), self.identity)
+        self._suffix = np.full((duration, len(self.symbols)), self.identity)
+        self._prefix = np.full(len(self.symbols), self.identity)
+        self._position = 0
+
+    def _update(self, prices: np.ndarray) -> np.ndarray:
+        k = self._position
+        x = np.where(np.isnan(prices), self.identity, prices)
+        self._block[k] = x
+        self._prefix = self.reduce(self._prefix, x)
+        result = self.reduce(self._suffix[k + 1], self._prefix) if k + 1 < self.duration else self._prefix.copy()
+
+        self._position += 1
+        if self._position == self.duration:
+            self._suffix = self.reduce.accumulate(self._block[::-1], axis=0)[::-1]
+            self._prefix = np.full(len(self.symbols), self.identity)
+            self._position = 0
+
+        if self.count + 1 < self.duration:
+            return np.full(len(self.symbols), np.nan)
+        return np.where(np.isinf(result), np.nan, result)
+
+
+class RollingMax(_RollingExtremum):
+    """Highest of the last `duration` prices"""
+    reduce = np.maximum
+    identity = -np.inf
+
+
+class RollingMin(_RollingExtremum):
+    """Lowest of the last `duration` prices"""
+    reduce = np.minimum
+    identity = np.inf
@@ -0,0 +1,36 @@
+from pybt.indicators.base import BaseIndicator
+from typing import Union
+import numpy as np
+
+
+class RSIIndicator(BaseIndicator):
+    """Relative strength index with Wilder's smoothing (same as TA-Lib's RSI). Outputs floats in [0, 100]"""
+    money_output = False
+
+    def __init__(self, symbol: Union[str, list[str]], duration: int = 14, length: int = 30):
+        super().__init__(symbol, length)
+        self.duration = duration
+        self._previous = np.full(len(self.symbols), np.nan)
+        self._gain = np.zeros(len(self.symbols))
+        self._loss = np.zeros(len(self.symbols))
+        self._seen = np.zeros(len(self.symbols), dtype=np.int64)
+
+    def _update(self, prices: np.ndarray) -> np.ndarray:
+        valid = np.isfinite(prices) & np.isfinite(self._previous)
+        delta = np.where(valid, prices - self._previous, 0)
+        gain, loss = np.maximum(delta, 0), np.maximum(-delta, 0)
+
+        # The first duration changes are averaged, later ones smoothed as avg = (avg * (n - 1) + change) / n
+        seeding = valid & (self._seen < self.duration)
+        steady = valid & ~seeding
+        self._gain[seeding] += gain[seeding] / self.duration
+        self._loss[seeding] += loss[seeding] / self.duration
+        self._gain[steady] += (gain[steady] - self._gain[steady]) / self.duration
+        self._loss[steady] += (loss[steady] - self._loss[steady]) / self.duration
+        self._seen[valid] += 1
+        self._previous = np.where(np.isfinite(prices), prices, self._previous)
+
+        total = self._gain + self._loss
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rsi = np.where(total > 0, 100 * self._gain / total, 0.0)
+        return np.where(self._seen >= self.duration, rsi, np.nan)
@@ -0,0 +1,257 @@
+import os
+import uuid
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from pybt.commons import Money
+
+
+class Trade(NamedTuple):
+    """One closed trade read back from a TradeLedger. Has the same attributes as a closed Position"""
+    symbol: str
+    size: float
+    open_time: datetime
+    close_time: datetime
+    open_price: Money
+    close_price: Money
+    open_commission: Money
+    close_commission: Money
+    close_type: str
+
+    @property
+    def position_type(self) -> str:
+        return "long" if self.size > 0 else "short"
+
+    @property
+    def open_value(self) -> Money:
+        return self.open_price * self.size
+
+    @property
+    def close_value(self) -> Money:
+        return self.close_price * self.size
+
+    @property
+    def total_commission(self) -> Money:
+        return self.open_commission + self.close_commission
+
+    @property
+    def gain(self) -> Money:
+        return self.close_value - self.open_value
+
+
+class TradeLedger:
+    """Append-only columnar record of the closed trades of a Portfolio.
+
+    Trades are stored as growable NumPy columns (prices and commissions in int64 cents, times in
+    datetime64[us], symbol and close type as small integer codes) instead of keeping every closed Position
+    object alive. With spill_path set, every chunk_size trades are written to a .npz file in that directory
+    and dropped from memory, so the memory held by the ledger stays bounded over long high turnover runs.
+
+    Indexing and iterating give Trade tuples, to_frame gives every trade as a DataFrame.
+
+    Example
+    -------
+    ledger = TradeLedger(market.assets, spill_path="trades", chunk_size=100_000)
+    portfolio = market.register_portfolio(100000, ledger=ledger)
+    ...
+    portfolio.ledger.save("trades.parquet")
+    """
+    columns = {"symbol": np.int32, "size": np.float64, "open_time": "datetime64[us]", "close_time": "datetime64[us]",
+               "open_price": np.int64, "close_price": np.int64, "open_commission": np.int64, "close_commission": np.int64,
+               "close_type": np.int8}
+    close_types = ["manual_close", "take_profit", "stop_loss", "incomplete_price", "end_of_simulation"]
+
+    def __init__(self, symbols: list[str], capacity: int = 64, spill_path: str = None, chunk_size: int = 100_000):
+        self.symbols = list(symbols)
+        self.symbol_index: dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.close_types = list(self.close_types)
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.chunk_size = chunk_size
+        self.chunks: list[str] = []         # Spilled chunk files, oldest first
+        self._chunk_ends: list[int] = []    # Number of trades spilled up to and including each chunk
+        self._spilled = 0
+        self._n = 0
+        # Chunk files are named after the ledger and a counter clear() does not reset, so ledgers sharing
+        # a spill_path never overwrite each other's chunks
+        self._spill_prefix = uuid.uuid4().hex[:12]
+        self._spill_count = 0
+        for name, dtype in self.columns.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        if spill_path is not None:
+            os.makedirs(spill_path, exist_ok=True)
+
+    def __len__(self):
+        return self._spilled + self._n
+
+    def _grow(self):
+        self.capacity *= 2
+        for name in self.columns:
+            column = getattr(self, name)
+            grown = np.zeros(self.capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def record(self, position) -> None:
+        """Appends a closed position. The close price recorded is the price the position was valued at when
+        it closed, which is its last known price for incomplete_price closes"""
+        if self._n == self.capacity:
+            self._grow()
+
+        row = self._n
+        self.symbol[row] = self.symbol_index[position.symbol]
+        self.size[row] = position.size
+        self.open_time[row] = position.open_time
+        self.close_time[row] = position.close_time
+        self.open_price[row] = position.open_price.cents
+        self.close_price[row] = position.current_price.cents
+        self.open_commission[row] = position.open_commission.cents
+        self.close_commission[row] = position.close_commission.cents
+        self.close_type[row] = self._close_type_code(position.close_type)
+        self._n += 1
+
+        if self.spill_path is not None and self._n >= self.chunk_size:
+            self.spill()
+
+    def _close_type_code(self, close_type: str) -> int:
+        if close_type not in self.close_types:
+            self.close_types.append(close_type)
+        return self.close_types.index(close_type)
+
+    def spill(self) -> None:
+        """Writes the trades held in memory to a new chunk file and drops them from memory"""
+        if self.spill_path is None:
+            raise RuntimeError("TradeLedger was created without a spill_path")
+        if self._n == 0:
+            return
+        path = os.path.join(self.spill_path, f"trades_{self._spill_prefix}_{self._spill_count:05d}.npz")
+        self._spill_count += 1
+        np.savez(path, **self._memory_columns())
+        self.chunks.append(path)
+        self._spilled += self._n
+        self._chunk_ends.append(self._spilled)
+        self._n = 0
+
+    def __setstate__(self, state):
+        # Copies of a ledger (ie resumed twice from one checkpoint) spill to their own files
+        self.__dict__.update(state)
+        self._spill_prefix = uuid.uuid4().hex[:12]
+        self._spill_count = 0
+
+    def clear(self) -> None:
+        """Forgets every trade, spilled chunks included (their files are left on disk)"""
+        self.chunks = []
+        self._chunk_ends = []
+        self._spilled = 0
+        self._n = 0
+
+    def extend(self, other: "TradeLedger") -> None:
+        """Appends every trade of other, ie the ledgers of consecutive parts of a run"""
+        arrays = other.arrays()
+        n = len(arrays["size"])
+        # Codes of other mapped to the codes of this ledger
+        symbols = np.array([self.symbol_index[x] for x in other.symbols], dtype=np.int32)
+        close_types = np.array([self._close_type_code(x) for x in other.close_types], dtype=np.int8)
+        while self._n + n > self.capacity:
+            self._grow()
+        for name in self.columns:
+            values = arrays[name]
+            if name == "symbol":
+                values = symbols[values]
+            elif name == "close_type":
+                values = close_types[values]
+            getattr(self, name)[self._n:self._n + n] = values
+        self._n += n
+        if self.spill_path is not None and self._n >= self.chunk_size:
+            self.spill()
+
+    def _memory_columns(self) -> dict[str, np.ndarray]:
+        return {name: getattr(self, name)[:self._n] for name in self.columns}
+
+    def _parts(self) -> Iterator[dict[str, np.ndarray]]:
+        """Columns of each spilled chunk, then of the trades in memory"""
+        for path in self.chunks:
+            with np.load(path) as f:
+                yield {name: f[name] for name in self.columns}
+        yield self._memory_columns()
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Every column of every trade, spilled chunks included, oldest first"""
+        parts = list(self._parts())
+        return {name: np.concatenate([x[name] for x in parts]) for name in self.columns}
+
+    def _row(self, index: int) -> dict[str, np.ndarray]:
+        if index >= self._spilled:
+            row = index - self._spilled
+            return {name: getattr(self, name)[row] for name in self.columns}
+        chunk = int(np.searchsorted(self._chunk_ends, index, side="right"))
+        row = index - (self._chunk_ends[chunk - 1] if chunk else 0)
+        with np.load(self.chunks[chunk]) as f:
+            return {name: f[name][row] for name in self.columns}
+
+    def _trade(self, row: dict[str, np.ndarray]) -> Trade:
+        return Trade(
+            symbol=self.symbols[row["symbol"]],
+            size=float(row["size"]),
+            open_time=row["open_time"].item(),
+            close_time=row["close_time"].item(),
+            open_price=Money.from_cents(int(row["open_price"])),
+            close_price=Money.from_cents(int(row["close_price"])),
+            open_commission=Money.from_cents(int(row["open_commission"])),
+            close_commission=Money.from_cents(int(row["close_commission"])),
+            close_type=self.close_types[row["close_type"]],
+        )
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Trade, list[Trade]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ledger index out of range")
+        return self._trade(self._row(index))
+
+    def __iter__(self) -> Iterator[Trade]:
+        # One read per spilled chunk
+        for part in self._parts():
+            for i in range(len(part["size"])):
+                yield self._trade({name: column[i] for name, column in part.items()})
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every trade as a DataFrame. Prices and commissions in dollars, symbol and close_type as categoricals"""
+        arrays = self.arrays()
+        frame = pd.DataFrame({
+            "symbol": pd.Categorical.from_codes(arrays["symbol"], self.symbols),
+            "size": arrays["size"],
+            "open_time": arrays["open_time"],
+            "close_time": arrays["close_time"],
+        })
+        for name in ["open_price", "close_price", "open_commission", "close_commission"]:
+            frame[name] = arrays[name] / 100
+        frame["close_type"] = pd.Categorical.from_codes(arrays["close_type"], self.close_types)
+        return frame
+
+    def save(self, path: str) -> None:
+        """Writes every trade to a .csv, .parquet or .npz file (raw columns, reload with TradeLedger.load)"""
+        path = str(path)
+        if path.endswith(".npz"):
+            np.savez(path, **self.arrays(), symbols=np.array(self.symbols, dtype=str),
+                     close_types=np.array(self.close_types, dtype=str))
+        elif path.endswith(".parquet"):
+            self.to_frame().to_parquet(path, index=False)
+        else:
+            self.to_frame().to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path: str, spill_path: Optional[str] = None) -> "TradeLedger":
+        """Ledger of a .npz file written by save"""
+        with np.load(path) as f:
+            ledger = cls([str(x) for x in f["symbols"]], capacity=max(len(f["size"]), 1), spill_path=spill_path)
+            ledger.close_types = [str(x) for x in f["close_types"]]
+            for name in cls.columns:
+                getattr(ledger, name)[:len(f[name])] = f[name]
+            ledger._n = len(f["size"])
+        return ledger
@@ -1,41 +1,76 @@
-from pybt.portfolio import Portfolio
-from pybt.datapack import CalendarData, Calendar, PriceDataPack, PriceData
+from pybt.portfolio import Portfolio, PortfolioGroup
+from pybt.datapack import CalendarData, Calendar, PriceDataPack, PriceData, DayBars, BarSet
 from pybt.commons import Money
 from pybt.commons.markettime import MarketTime
 from pybt.commons.helper import timer
+from pybt.commons.profiler import Profiler
+from pybt.indicators.bank import IndicatorBank
 from datetime import datetime, timedelta, date, time
+from time import perf_counter
+import os
+import pickle
 from scipy.interpolate import interp1d
+import numpy as np
 import pandas as pd
 
 
+class SymbolOutsideGroupError(LookupError):
+    """A strategy read a symbol outside the symbols of its partition, see Market.guard_symbols"""
+
+
+class _GuardedIndex(dict):
+    """symbol_index that raises SymbolOutsideGroupError for guarded symbols instead of KeyError"""
+
+    def __init__(self, index: dict[str, int], guarded: frozenset):
+        super().__init__(index)
+        self.guarded = guarded
+
+    def __missing__(self, symbol):
+        if symbol in self.guarded:
+            raise SymbolOutsideGroupError(f"{symbol} is not in the symbol group of this market")
+        raise KeyError(symbol)
+
+
 class Market:
     market_time = MarketTime()
     mt_tz = market_time.market_tz
 
-    def __init__(self, asset_context: list[str], frequency: str = "1minute", start_date: datetime = None, end_date: datetime = None,  debug_mode: bool = False, test_mode: bool = False):
+    def __init__(self, asset_context: list[str], frequency: str = "1minute", start_date: datetime = None, end_date: datetime = None,  debug_mode: bool = False, test_mode: bool = False, stepping: str = "tick",
+                 batch_portfolios: bool = False, profile: bool = False, record_equity=None):
         self.debug_mode = debug_mode
         self.frequency = frequency
+        self.stepping = stepping
         self.start_date = start_date if start_date is not None else datetime(2015, 1, 1)
         self.end_date = end_date if end_date is not None else datetime.utcnow()
         self.test_mode = test_mode
         self.traders = []
+        # Equity curve sampling of every portfolio, see EquityRecorder. None when not recorded
+        self.record_equity = record_equity
+        # Shared by every registered portfolio when batch_portfolios, so one tick updates all of them at once
+        self.portfolio_group = PortfolioGroup(self) if batch_portfolios else None
+        # Per phase timings, see Profiler. None when profiling is off
+        self.profiler: Profiler = Profiler() if profile else None
         self.prices: dict[str, PriceData] = {}
         self._daily_prices = {}
 
+        # Price Context. Rebuilt once per day by get_today_prices
+        self._price_cents: np.ndarray = None    # (symbols x ticks) int64 cents, gap filled
+        self._price_valid: np.ndarray = None    # (symbols,) bool, False if symbol has no usable data today
+        self._bar_cents: tuple[np.ndarray, np.ndarray, np.ndarray] = None  # (symbols x ticks) open, high, low cents. 1hour and daily only
+        self.bars: BarSet = None
+
         # Timing Context
         self.day_counter = 0
         self.tick_counter = 0
         self.total_tick = 0
+        self._configure_clock()
 
-        # Frequency Context
-        if self.frequency == "1minute":
-            self.next_tick = self._minute_next_tick
-        elif self.frequency == "1hour":
-            self.next_tick = self._hour_next_tick
-        elif self.frequency == "daily":
-            self.next_tick = self._daily_next_tick
-        else:
-            raise ValueError(f"{self.frequency} invalid. Frequency should be '1minute', '1hour' or 'daily'")
+        # Checkpoint Context. See enable_checkpoints
+        self.checkpoint_dir: str = None
+        self.checkpoint_every: int = None
+        self.checkpoint_keep: int = None
+        self._paused = False          # Stopped at the end of a day, see run_simulation(until=...) and resume
+        self._pause_date: date = None
 
         if self.test_mode:
             self._test_date_list = []
@@ -45,6 +80,9 @@ class Market:
         self.assets = asset_context
         # self.assets = Asset.select().where(Asset.symbol << asset_context)
         self.active_symbols = self.assets
+        self.symbol_index: dict[str, int] = {symbol: i for i, symbol in enumerate(self.assets)}
+        self.indicators = IndicatorBank(self.assets)
+        self._guarded_symbols = frozenset()     # See guard_symbols
 
         self.calendar = None
         self.time_now = None
@@ -53,6 +91,28 @@ class Market:
 
         self._fully_initialized = False
 
+    def _configure_clock(self):
+        # Frequency Context
+        if self.frequency == "1minute":
+            self._step_tick = self._minute_next_tick
+            self.tick_step = timedelta(minutes=1)
+        elif self.frequency == "1hour":
+            self._step_tick = self._hour_next_tick
+            self.tick_step = timedelta(hours=1)
+        elif self.frequency == "daily":
+            self._step_tick = self._daily_next_tick
+            self.tick_step = timedelta(0)
+        else:
+            raise ValueError(f"{self.frequency} invalid. Frequency should be '1minute', '1hour' or 'daily'")
+
+        # Stepping Context. "tick" visits every tick, "event" jumps to the next tick where a trader has something to do
+        if self.stepping == "tick":
+            self.next_tick = self._step_tick
+        elif self.stepping == "event":
+            self.next_tick = self._event_next_tick
+        else:
+            raise ValueError(f"{self.stepping} invalid. Stepping should be 'tick' or 'event'")
+
     def load_calendar_data(self, source: str, **kwargs):
         if source == "alpaca":
             api_key = kwargs.get("api_key", None)
@@ -60,59 +120,192 @@ class Market:
             start_date = kwargs.get("start_date", self.start_date)
             end_date = kwargs.get("end_date", self.end_date)
 
-            self.calendar = CalendarData.load_from_alpaca(api_key, secret_key, start_date=start_date, end_date=end_date)
+            cache = kwargs.get("cache", True)
+
+            self.calendar = CalendarData.load_from_alpaca(api_key, secret_key, start_date=start_date, end_date=end_date, cache=cache)
         elif source == "dataframe":
             data = kwargs.get("data", None)
             if not isinstance(data, pd.DataFrame):
                 raise TypeError(f"df should be type pandas.DataFrame. Got {type(data)} instead")
             self.calendar = CalendarData.load_from_pandas(data)
+        elif source == "calendar":
+            data = kwargs.get("data", None)
+            if not isinstance(data, CalendarData):
+                raise TypeError(f"data should be type CalendarData. Got {type(data)} instead")
+            self.calendar = data
+        elif source == "file":
+            path = kwargs.get("path", None)
+            self.calendar = CalendarData.load(path)
         else:
-            raise ValueError(f"source should be 'alpaca' or 'pandas'. Got '{source}' instead")
+            raise ValueError(f"source should be 'alpaca', 'dataframe', 'calendar' or 'file'. Got '{source}' instead")
 
         self._update_day()
 
-        self.time_now = datetime.combine(self.date, self.open)
+        self.time_now = self._tick_time(0)
         self._fully_initialized = True
 
     def load_price_data(self, source: PriceDataPack):
-        self.datapack = source
-        self.get_today_prices = self._get_today_prices_dp
+        self._attach_price_data(source)
         self.get_today_prices()
         self._fully_initialized = True
 
+    def _attach_price_data(self, source: PriceDataPack):
+        self.datapack = source
+        if self.frequency == "1minute":
+            self.get_today_prices = self._get_today_prices_dp
+        else:
+            # Hourly and daily runs never touch the minute data, bars are resampled once per datapack
+            if self.calendar is None:
+                raise RuntimeError(f"Calendar data must be loaded before price data for '{self.frequency}' frequency")
+            self.bars = source.get_bars(self.calendar, self.frequency, self.assets)
+            self.get_today_prices = self._get_today_bars
+
+    def register_indicator(self, name: str, indicator: type, *args, **kwargs):
+        """Precomputes indicator for every asset, one trading day at a time. Read it with get_indicator
+
+        Args:
+            name (str): indicator name, ie "sma30"
+            indicator (type): BaseIndicator subclass, ie SMAIndicator
+            *args, **kwargs: indicator arguments after symbol, ie the duration
+
+        Example
+        -------
+        market.register_indicator("sma30", SMAIndicator, 30)
+        """
+        new = name not in self.indicators
+        self.indicators.register(name, indicator, *args, **kwargs)
+        if new and self._price_cents is not None:
+            # Registered mid simulation (ie from a Scorer's __init__), start from today
+            self.indicators.compute_day(self._indicator_prices(), [name])
+
+    def get_indicator(self, name: str, symbol: str = None):
+        """Value of a registered indicator at the current tick
+
+        Args:
+            name (str): indicator name
+            symbol (str, optional): symbol to read. Defaults to None (every asset as a (symbols,) array).
+
+        Returns:
+            float | np.ndarray: value(s), NaN while warming up or without data
+        """
+        values = self.indicators.current(name, self.tick_counter)
+        if symbol is None:
+            return values
+        idx = self.symbol_index[symbol]
+        if isinstance(values, tuple):
+            return tuple(float(x[idx]) for x in values)
+        return float(values[idx])
+
+    def _indicator_prices(self) -> np.ndarray:
+        return np.where(self._price_valid[:, None], self._price_cents / 100, np.nan)
+
+    def _compute_indicators(self):
+        if len(self.indicators):
+            self.indicators.compute_day(self._indicator_prices())
+
     @timer
-    def run_simulation(self):
+    def run_simulation(self, until: date = None):
+        """Runs the simulation to the end of the calendar, then closes every position
+
+        Args:
+            until (date, optional): pause at the end of this day instead, positions stay open. Calling
+                run_simulation again carries on from the next day. Defaults to None.
+        """
         if not self._fully_initialized:
             raise RuntimeError(f"Incomplete initialization. Must load calendar data and price data first")
         print("START SIMULATION")
+        if self.profiler is not None:
+            start = perf_counter()
+        # A paused or resumed market stopped at the end of a day, carry on from the next one
+        self._pause_date = None
+        running = not self._paused or self._enter_next_day()
+        self._paused = False
+        self._pause_date = until
         # RUN ONCE
-        while True:
+        while running:
             if self.test_mode:
                 self._test_date_list.append(self.time_now)
-            for trader in self.traders:
-                trader.update()
+            for group in self._portfolio_groups():
+                group.update()
             self.total_tick += 1
             if not self.next_tick():
-                break
+                running = False
+
+        if self.profiler is not None:
+            self.profiler.add("simulation", perf_counter() - start)
+
+        if self._paused:
+            print(f"SIMULATION PAUSED AFTER {self.date}")
+            return
 
         for trader in self.traders:
             trader.end_simulation()
         print("SIMULATION ENDED")
 
+    def _enter_next_day(self) -> bool:
+        if not self._next_day():
+            return False
+        self.tick_counter = 0
+        self.time_now = self._tick_time(0)
+        return True
+
     def _next_day(self):
+        if self.checkpoint_dir is not None and not self._paused:
+            finished = self.day_counter + 1 >= len(self.calendar)
+            if finished or (self.day_counter + 1) % self.checkpoint_every == 0:
+                self.save_checkpoint()
+        if self._pause_date is not None and self.date >= self._pause_date:
+            self._paused = True
+            return False
         self.day_counter += 1
         if self.day_counter < len(self.calendar):
             self._update_day()
-            self.get_today_prices()
+            if self.profiler is None:
+                self.get_today_prices()
+            else:
+                self.profiler.time("load_day", self.get_today_prices)
             return True
         else:
             return False
 
     def _hour_next_tick(self):
-        raise NotImplementedError("Hourly simulation has not been implemented yet")
+        return self._bar_next_tick()
 
     def _daily_next_tick(self):
-        pass
+        return self._bar_next_tick()
+
+    def _bar_next_tick(self):
+        if self.tick_counter + 1 >= self._price_cents.shape[1]:
+            if self._next_day():
+                self.tick_counter = 0
+            else:
+                return False
+        else:
+            self.tick_counter += 1
+
+        self.time_now = self._tick_time(self.tick_counter)
+        return True
+
+    def _event_next_tick(self):
+        """Jumps to the next tick where a trader is due or a position can close. Gives the same results as
+        tick stepping: every day still starts at its first tick and the simulation ends on the last tick"""
+        n_ticks = self.n_ticks
+        events = [trader.next_event_tick(self.tick_counter) for trader in self.traders]
+        events = [x for x in events if x is not None and x < n_ticks]
+
+        if events:
+            target = min(events)
+        elif self.day_counter + 1 >= len(self.calendar):
+            target = n_ticks - 1
+            if target <= self.tick_counter:
+                return self._step_tick()
+        else:
+            target = n_ticks
+
+        # Move to the tick before the target and let the frequency stepper handle the day change
+        self.tick_counter = target - 1
+        self.time_now = self._tick_time(self.tick_counter)
+        return self._step_tick()
 
     def _minute_next_tick(self):
         if self.time_now == self.today_close - timedelta(minutes=1):
@@ -126,6 +319,15 @@ class Market:
         self.time_now = self.today_open + timedelta(minutes=self.tick_counter)
         return True
 
+    def _tick_time(self, tick: int) -> datetime:
+        """Time of a tick of today. The price of an hourly or daily tick is the close of its bar, only known
+        once the bar is over, so those ticks are stamped at the end of the bar (the close at the latest)"""
+        if self.frequency == "1minute":
+            return self.today_open + timedelta(minutes=tick)
+        if not self.tick_step:
+            return self.today_close
+        return min(self.today_open + self.tick_step * (tick + 1), self.today_close)
+
     def _update_day(self):
         self.today: Calendar = self.calendar[self.day_counter]
         self.date: date = self.today.date
@@ -134,6 +336,8 @@ class Market:
 
         self.today_close = datetime.combine(self.date, self.close)
         self.today_open = datetime.combine(self.date, self.open)
+        if self.profiler is not None:
+            self.profiler.day = self.date
 
     def _get_today_prices_db(self):
         min_timestamp = self.today_open
@@ -146,12 +350,48 @@ class Market:
         self._daily_prices = {}
 
     def _get_today_prices_dp(self):
-        # This method calls Datapack's load_day_prices(date) which asks the datapack to
-        # actually load the data into memory (or whatever). Making it available to calls for
-        # get_price(datetime)
-        for symbol in self.assets:
-            self.prices[symbol] = self.datapack.get_prices(symbol, self.today.date)
+        # Asks the datapack for the whole day of every asset at once (a single read for
+        # bulk capable caches) and turns it into today's price block
+        self._build_price_block(self.datapack.get_day(self.today.date, self.assets))
+        self._compute_indicators()
+        self._daily_prices = {}
 
+    def _build_price_block(self, bars: DayBars):
+        """Builds today's (symbols x ticks) price block from the day's bars in one vectorized pass.
+
+        Gaps are filled by linear interpolation (extrapolated at the edges) on the minute offset
+        from the open, then rounded to 3 decimals and converted to cents. Symbols with less than
+        two bars for the day are marked as invalid.
+        """
+        open_time = np.datetime64(self.today_open)
+        session = np.datetime64(self.today_close) - open_time
+        n_ticks = int(session // np.timedelta64(1, "m"))
+
+        symbol_rows = np.array([self.symbol_index.get(symbol, -1) for symbol in bars.symbols] + [-1], dtype=np.int64)
+        codes = symbol_rows[bars.symbol_codes()]
+        delta = bars.time - open_time
+        in_session = (codes >= 0) & (delta >= np.timedelta64(0)) & (delta <= session)
+
+        grid = np.full((len(self.assets), n_ticks + 1), np.nan)
+        grid[codes[in_session], delta[in_session] // np.timedelta64(1, "m")] = bars["close"][in_session]
+
+        filled, valid = _interpolate_rows(grid)
+        self._price_cents = _to_cents(filled[:, :n_ticks])
+        self._price_valid = valid
+
+    def _get_today_bars(self):
+        """Loads today's bars from the precomputed BarSet. Periods without minute data carry the last
+        close forward (or the first close back), their open/high/low are set to that close."""
+        day = self.bars.day(self.date, self.assets)
+        if day is None:
+            day = {field: np.full((len(self.assets), 1), np.nan) for field in BarSet.fields}
+
+        close, valid = _fill_bars(day["close"])
+        missing = np.isnan(day["close"])
+        self._price_cents = _to_cents(close)
+        self._price_valid = valid
+        self._bar_cents = tuple(_to_cents(np.where(missing, close, day[field])) for field in ["open", "high", "low"])
+        self._compute_indicators()
         self._daily_prices = {}
 
     # DB mode
@@ -210,54 +450,289 @@ class Market:
 
     # DP Mode
     def get_current_price(self, symbol: str) -> Money:
-        # Check if we have saved data for the pricing
-        # _daily_prices gets cleared by get_today_prices function
-        if symbol in self._daily_prices.keys():
-            interp_func, latest_tick_data = self._daily_prices[symbol]
-            tick_counter, price = latest_tick_data
-
-            # Check if we have the current price already calculated
-            if self.tick_counter == tick_counter:
-                return price
-
-            # We dont have the latest tick data, so we calculate it based on the interp function
-            current_val = Money(round(float(interp_func(self.tick_counter)), 3))
-
-            # We save that calculated value so we dont have to recalc if we get asked again
-            self._daily_prices[symbol] = (interp_func, (self.tick_counter, current_val))
-
-            return current_val
-
-        # Some sanity checks to make sure we have some price data
-        if symbol not in self.prices.keys():
+        idx = self.symbol_index.get(symbol, None)
+        if idx is None and symbol in self._guarded_symbols:
+            raise SymbolOutsideGroupError(f"{symbol} is not in the symbol group of this market")
+        if idx is None or not self._price_valid[idx]:
             return None
-        try:
-            # If we get here, we need to create an interp function before returning the current price
-            # We save that interp function so we dont have to recreate it again for that day
-            open_time = self.today_open
-            close_time = self.today_close
-            df = self.prices[symbol]
-            asset_price = df.loc[open_time: close_time]
-            y_val = list(asset_price["close"])
-            x_val = list((asset_price.index - open_time).total_seconds()//60)
-            x_val = [int(x) for x in x_val]
-            interp_func = interp1d(x_val, y_val, fill_value="extrapolate")
-            current_val = round(float(interp_func(self.tick_counter)), 3)
-            current_val = Money(current_val)
-            self._daily_prices[symbol] = (interp_func, (self.tick_counter, current_val))
 
-            return current_val
-        except ValueError as e:
-            del self.prices[symbol]
-            print(e)
-            return None
-        except AttributeError as e:
-            del self.prices[symbol]
-            print(e)
+        return Money.from_cents(int(self._price_cents[idx, self.tick_counter]))
+
+    def get_current_prices(self) -> np.ndarray:
+        """Current price of every symbol in asset_context order. NaN for symbols without data today
+
+        Returns:
+            np.ndarray: (symbols,) float64 array of prices
+        """
+        return np.where(self._price_valid, self._price_cents[:, self.tick_counter] / 100, np.nan)
+
+    def get_current_cents(self) -> tuple[np.ndarray, np.ndarray]:
+        """Current price row in cents and the mask of symbols with valid data today
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (symbols,) int64 cents and (symbols,) bool mask
+        """
+        return self._price_cents[:, self.tick_counter], self._price_valid
+
+    @property
+    def n_ticks(self) -> int:
+        """Number of ticks of the current day"""
+        return self._price_cents.shape[1]
+
+    def day_ticks(self) -> np.ndarray:
+        """(days,) int64 number of ticks of every day of the calendar"""
+        if not self.tick_step:
+            return np.ones(len(self.calendar), dtype=np.int64)
+        session = self.calendar.closes - self.calendar.opens
+        return -(-session // np.timedelta64(self.tick_step)).astype(np.int64)
+
+    def get_today_cents(self) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Whole day price block, used to look ahead for the next possible position exit in event stepping.
+        Strategies must not use it.
+
+        Returns:
+            tuple: (symbols x ticks) int64 cents, (symbols,) bool mask of valid symbols and the (symbols x ticks)
+                open, high and low cents blocks (None for 1minute)
+        """
+        return self._price_cents, self._price_valid, self._bar_cents
+
+    def get_current_bar_cents(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Open, high and low of the current bar in cents for 1hour and daily frequencies, None for 1minute
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: (symbols,) int64 open, high and low cents
+        """
+        if self._bar_cents is None:
             return None
+        return tuple(x[:, self.tick_counter] for x in self._bar_cents)
+
+    def enable_checkpoints(self, directory: str, every: int = 20, keep: int = 2):
+        """Writes a checkpoint to directory at the end of every `every` trading days and at the end of the
+        simulation (before positions are closed), keeping the last `keep` of them. See save_checkpoint
+
+        Args:
+            directory (str): checkpoint directory, created if needed
+            every (int, optional): trading days between checkpoints. Defaults to 20.
+            keep (int, optional): checkpoints kept, older ones are deleted. None keeps all. Defaults to 2.
+        """
+        if every < 1:
+            raise ValueError(f"every should be at least 1. Got {every} instead")
+        os.makedirs(directory, exist_ok=True)
+        self.checkpoint_dir = directory
+        self.checkpoint_every = every
+        self.checkpoint_keep = keep
+
+    def save_checkpoint(self, path: str = None) -> str:
+        """Pickles the market at the end of the current day: clock, portfolios, open positions, ledgers,
+        indicator and strategy state. The datapack and the day's price block are left out and attached
+        again by Market.resume. Scorer/Optimizer classes must be importable (defined at module level).
+
+        Args:
+            path (str, optional): file to write. Defaults to checkpoint_<day>_<date>.pkl in checkpoint_dir.
+
+        Returns:
+            str: path of the checkpoint
+        """
+        if path is None:
+            if self.checkpoint_dir is None:
+                raise RuntimeError("No checkpoint directory. Pass a path or call enable_checkpoints first")
+            path = os.path.join(self.checkpoint_dir, f"checkpoint_{self.day_counter:06d}_{self.date}.pkl")
+
+        # Written next to the target and renamed, a crash mid write never leaves a truncated checkpoint
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
+        if self.checkpoint_dir is not None and self.checkpoint_keep is not None:
+            for old in self.list_checkpoints(self.checkpoint_dir)[:-self.checkpoint_keep]:
+                os.remove(old)
+        return path
+
+    @staticmethod
+    def list_checkpoints(directory: str) -> list[str]:
+        """Checkpoints written by enable_checkpoints in directory, oldest first"""
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(x for x in os.listdir(directory) if x.startswith("checkpoint_") and x.endswith(".pkl"))
+        return [os.path.join(directory, x) for x in names]
+
+    @classmethod
+    def resume(cls, path: str, datapack: PriceDataPack, calendar: CalendarData = None) -> "Market":
+        """Market restored from a checkpoint (a file, or a checkpoint directory for its latest checkpoint).
+        run_simulation carries on from the day after the checkpoint.
+
+        Args:
+            path (str): checkpoint file or directory
+            datapack (PriceDataPack): price data, may have days added since the checkpoint
+            calendar (CalendarData, optional): calendar to continue on, ie extended with new days. Must
+                contain the checkpoint day. Defaults to None (the calendar of the checkpoint).
+
+        Returns:
+            Market: restored market
+        """
+        if os.path.isdir(path):
+            checkpoints = cls.list_checkpoints(path)
+            if not checkpoints:
+                raise FileNotFoundError(f"No checkpoint in {path}")
+            path = checkpoints[-1]
+
+        with open(path, "rb") as f:
+            market: Market = pickle.load(f)
+
+        if calendar is not None:
+            day = calendar.index(market.date)
+            if day is None:
+                raise ValueError(f"calendar does not contain the checkpoint day {market.date}")
+            market.calendar = calendar
+            market.day_counter = day
+            market._update_day()
+
+        market._attach_price_data(datapack)
+        market._paused = True
+        market._fully_initialized = True
+        return market
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Data and whatever is rebuilt from it, and bound methods rewired by _configure_clock
+        for key in ["datapack", "bars", "prices", "_daily_prices", "_price_cents", "_price_valid", "_bar_cents",
+                    "get_today_prices", "next_tick", "_step_tick"]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.datapack = None
+        self.bars = None
+        self.prices = {}
+        self._daily_prices = {}
+        self._price_cents = None
+        self._price_valid = None
+        self._bar_cents = None
+        self.get_today_prices = None
+        self._fully_initialized = False
+        self._configure_clock()
+
+    def enable_profiling(self) -> Profiler:
+        """Turns on per phase timings, see Profiler. Returns the profiler"""
+        if self.profiler is None:
+            self.profiler = Profiler()
+            if self.calendar is not None:
+                self.profiler.day = self.date
+        return self.profiler
 
     def register_portfolio(self, start_value, **kwargs):
-        new_portfolio = Portfolio(start_value, self.start_date, self.end_date, **kwargs)
+        if self.portfolio_group is not None:
+            kwargs.setdefault("group", self.portfolio_group)
+        new_portfolio = Portfolio(start_value, self.start_date, self.end_date, market=self, **kwargs)
         self.traders.append(new_portfolio)
 
         return new_portfolio
+
+    def guard_symbols(self, symbols: list[str]):
+        """Makes reading the price, indicator or index of any of symbols raise SymbolOutsideGroupError
+        instead of returning nothing. Used by SymbolPartitionedBacktest to fail fast when a strategy reads
+        symbols of another partition"""
+        self._guarded_symbols = frozenset(symbols) - set(self.assets)
+        self.symbol_index = _GuardedIndex(self.symbol_index, self._guarded_symbols)
+
+    def scale_capital(self, fraction: float):
+        """Scales the start value of every portfolio, see PortfolioGroup.scale_capital"""
+        for group in self._portfolio_groups():
+            group.scale_capital(fraction)
+
+    def reset_portfolios(self):
+        """Drops the positions, trades and recorded equity of every portfolio, see PortfolioGroup.reset"""
+        for group in self._portfolio_groups():
+            group.reset()
+
+    def _portfolio_groups(self) -> list[PortfolioGroup]:
+        """Groups of the registered portfolios in registration order. One per portfolio unless batched"""
+        return list(dict.fromkeys(trader.group for trader in self.traders))
+
+
+def _interpolate_rows(grid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Row-wise linear interpolation of NaN gaps, extrapolating from the first/last two points.
+
+    Mirrors scipy's interp1d(fill_value="extrapolate") for every row at once.
+
+    Args:
+        grid (np.ndarray): (rows x columns) array, NaN where there is no data
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: filled grid and (rows,) mask of rows with at least 2 points
+    """
+    rows, width = grid.shape
+    known = ~np.isnan(grid)
+    valid = known.sum(axis=1) >= 2
+    cols = np.arange(width)
+
+    # Last known column at or before each column, and first known column at or after it
+    prev = np.maximum.accumulate(np.where(known, cols, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(known, cols, width)[:, ::-1], axis=1)[:, ::-1]
+
+    # interp1d interpolates x on the segment (x_lo, x_hi], clipping to the first/last segment
+    lo = np.empty_like(prev)
+    lo[:, 0] = -1
+    lo[:, 1:] = prev[:, :-1]
+    hi = nxt.copy()
+
+    r = np.arange(rows)
+    first = nxt[:, 0]
+    second = nxt[r, np.minimum(first + 1, width - 1)]
+    last = prev[:, -1]
+    before_last = prev[r, np.maximum(last - 1, 0)]
+
+    head = lo < 0
+    lo = np.where(head, first[:, None], lo)
+    hi = np.where(head, second[:, None], hi)
+    tail = hi >= width
+    lo = np.where(tail, before_last[:, None], lo)
+    hi = np.where(tail, last[:, None], hi)
+
+    # Rows with less than 2 known points get dummy anchors, they are masked out by valid
+    lo = np.where(valid[:, None], lo, 0)
+    hi = np.where(valid[:, None], hi, 1 if width > 1 else 0)
+    y_lo = np.take_along_axis(grid, lo, axis=1)
+    y_hi = np.take_along_axis(grid, hi, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (y_hi - y_lo) / (hi - lo)
+        filled = slope * (cols - lo) + y_lo
+
+    return filled, valid
+
+
+def _fill_bars(close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Carries the last close forward over empty bars, back-filling leading ones from the first close
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: filled (symbols x periods) closes and (symbols,) mask of symbols with any bar
+    """
+    rows, width = close.shape
+    known = ~np.isnan(close)
+    valid = known.any(axis=1)
+    cols = np.arange(width)
+    prev = np.maximum.accumulate(np.where(known, cols, -1), axis=1)
+    first = np.argmax(known, axis=1)
+    source = np.where(prev >= 0, prev, first[:, None])
+    return np.take_along_axis(close, source, axis=1), valid
+
+
+def _to_cents(prices: np.ndarray) -> np.ndarray:
+    """Rounds prices to 3 decimals then to cents with ROUND_HALF_UP, same as Money(round(price, 3)).
+
+    round(price, 3) rounds the exact decimal value of the float, so only prices within float error of a
+    half mill go through the scalar path (see MoneyArray._float_to_cents). NaN gives 0.
+    """
+    prices = np.nan_to_num(prices)
+    scaled = np.abs(prices * 1000)
+    floor = np.floor(scaled)
+    tolerance = np.maximum(scaled * 1e-12, 1e-9)
+    ambiguous = np.abs(scaled - floor - 0.5) <= tolerance
+
+    mills = np.rint(prices * 1000).astype(np.int64)
+    cents = np.sign(mills) * ((np.abs(mills) + 5) // 10)
+    for i in zip(*np.nonzero(ambiguous)):
+        cents[i] = Money(round(float(prices[i]), 3)).cents
+    return cents
@@ -1,10 +1,177 @@
-from pybt.commons.helper import set_object_by_caller
-from pybt import Portfolio
+import io
+import itertools
+import multiprocessing
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from time import perf_counter
+from typing import Any, Callable, Iterator, Optional
 
 
 class BaseOptimizer:
-    def __init__(self):
-        self.portfolio = set_object_by_caller(Portfolio)
+    schedule = None     # Ticks at which execute is called, every tick by default. See pybt.schedule.Schedule
+
+    def __init__(self, portfolio=None):
+        # portfolio is injected by Portfolio before __init__ runs. See commons.helper.create_with_context
+        if portfolio is not None or not hasattr(self, "portfolio"):
+            self.portfolio = portfolio
 
     def execute(self):
         raise NotImplementedError("Optimizer class must have an 'execute' method defined")
+
+
+def parameter_grid(grid: dict[str, list]) -> list[dict[str, Any]]:
+    """Every combination of a parameter grid
+
+    Args:
+        grid (dict[str, list]): parameter name to the list of values to try
+
+    Returns:
+        list[dict[str, Any]]: one dictionary of parameters per combination
+    """
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+
+
+def summarize_portfolio(portfolio) -> dict[str, Any]:
+    """Picklable end of simulation summary of a portfolio"""
+    return {
+        "start_value": portfolio.start_value.cents / 100,
+        "cash": portfolio.cash.cents / 100,
+        "equity": portfolio.equity.cents / 100,
+        "nett_gain": portfolio.nett_gain.cents / 100,
+        "open_positions": len(portfolio.open_positions),
+        "closed_positions": len(portfolio.closed_positions),
+    }
+
+
+class SweepResult:
+    """Outcome of one run of a ParameterSweep
+
+    Attributes
+    ----------
+    index : int
+        position of the run in the parameter grid
+    params : dict
+        parameters the strategy factory was called with
+    portfolios : list[dict]
+        summarize_portfolio of every portfolio registered by the factory
+    error : str
+        traceback if the run raised, None otherwise
+    elapsed : float
+        wall time of the run in seconds
+    """
+
+    def __init__(self, index: int, params: dict, portfolios: list[dict] = None, error: str = None, elapsed: float = 0.0):
+        self.index = index
+        self.params = params
+        self.portfolios = portfolios if portfolios is not None else []
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        status = "error" if self.error else f"{len(self.portfolios)} portfolios"
+        return f"{type(self).__name__}(index={self.index}, params={self.params}, {status}, elapsed={self.elapsed:.2f}s)"
+
+
+# Data shared by every run of a worker process. Set once by _init_worker
+_WORKER_CONTEXT: dict[str, Any] = {}
+
+
+def _init_worker(datapack, calendar, asset_context, market_kwargs, quiet):
+    _WORKER_CONTEXT.update(datapack=datapack.reopen(), calendar=calendar, asset_context=asset_context,
+                           market_kwargs=market_kwargs, quiet=quiet)
+
+
+def _pool_context(start_method: Optional[str] = None):
+    """Multiprocessing context of the worker pools, the platform default start method unless one is given"""
+    return multiprocessing.get_context(start_method)
+
+
+def _run_in_worker(factory, index: int, params: dict) -> SweepResult:
+    import traceback
+    from pybt.market import Market
+
+    context = _WORKER_CONTEXT
+    start = perf_counter()
+    try:
+        market = Market(asset_context=context["asset_context"], **context["market_kwargs"])
+        market.load_calendar_data("calendar", data=context["calendar"])
+        market.load_price_data(context["datapack"])
+        factory(market, **params)
+        if context["quiet"]:
+            with redirect_stdout(io.StringIO()):
+                market.run_simulation()
+        else:
+            market.run_simulation()
+        portfolios = [summarize_portfolio(x) for x in market.traders]
+        return SweepResult(index, params, portfolios, elapsed=perf_counter() - start)
+    except Exception:
+        return SweepResult(index, params, error=traceback.format_exc(), elapsed=perf_counter() - start)
+
+
+class ParameterSweep:
+    """Runs a strategy over a parameter grid, sharding the runs over a process pool.
+
+    The datapack and calendar are loaded once by the caller and handed to every worker process.
+    Cached datapacks are reopened by each worker so memory mapped data is shared through the OS
+    page cache. In memory datapacks are pickled to every worker, unless start_method="fork" is given
+    where the platform supports it: forked workers share them copy-on-write. Forking a process that
+    runs threads (prefetching datapacks, some BLAS builds) can deadlock, so it is opt-in.
+
+    Args:
+        strategy_factory (Callable): called as strategy_factory(market, **params) in the worker. It should
+            register the portfolios of the run, ie market.register_portfolio(100_000, optimizer=...).
+            Must be picklable (a module level function)
+        grid (dict[str, list] | list[dict]): parameter grid (see parameter_grid) or explicit list of parameters
+        datapack (PriceDataPack): loaded price data shared by every run
+        calendar (CalendarData): trading calendar shared by every run
+        asset_context (list[str], optional): Market asset_context. Defaults to the datapack's symbols.
+        max_workers (int, optional): number of runs executed at the same time. 0 runs everything in this
+            process. Defaults to the number of CPUs.
+        quiet (bool, optional): silence simulation prints in the workers. Defaults to True.
+        start_method (str, optional): multiprocessing start method of the worker pool ("fork", "spawn",
+            "forkserver"). Defaults to the platform default.
+        **market_kwargs: extra Market arguments (start_date, end_date, ...)
+    """
+
+    def __init__(self, strategy_factory: Callable, grid, datapack, calendar, asset_context: Optional[list[str]] = None,
+                 max_workers: Optional[int] = None, quiet: bool = True, start_method: Optional[str] = None, **market_kwargs):
+        self.strategy_factory = strategy_factory
+        self.params: list[dict] = parameter_grid(grid) if isinstance(grid, dict) else list(grid)
+        self.datapack = datapack
+        self.calendar = calendar
+        self.asset_context = list(asset_context) if asset_context is not None else list(datapack.symbols)
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        self.quiet = quiet
+        self.start_method = start_method
+        self.market_kwargs = market_kwargs
+
+    def __len__(self):
+        return len(self.params)
+
+    def run(self) -> Iterator[SweepResult]:
+        """Yields the result of every run as soon as it finishes (not in grid order)"""
+        init_args = (self.datapack, self.calendar, self.asset_context, self.market_kwargs, self.quiet)
+        if self.max_workers == 0:
+            _init_worker(*init_args)
+            for index, params in enumerate(self.params):
+                yield _run_in_worker(self.strategy_factory, index, params)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_pool_context(self.start_method), initializer=_init_worker, initargs=init_args) as pool:
+            # Keep at most max_workers runs queued on top of the running ones so results stream back early
+            queue = iter(enumerate(self.params))
+            pending = set()
+            for index, params in itertools.islice(queue, 2 * self.max_workers):
+                pending.add(pool.submit(_run_in_worker, self.strategy_factory, index, params))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    for index, params in itertools.islice(queue, 1):
+                        pending.add(pool.submit(_run_in_worker, self.strategy_factory, index, params))
+
+    def run_all(self) -> list[SweepResult]:
+        """Runs every parameter set and returns the results in grid order"""
+        return sorted(self.run(), key=lambda x: x.index)
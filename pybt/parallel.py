@@ -0,0 +1,426 @@
+import io
+import multiprocessing
+from collections import Counter
+from contextlib import nullcontext, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from pybt.ledger import TradeLedger
+from pybt.optimizer import _WORKER_CONTEXT, _init_worker, _pool_context
+
+
+class ShardResult:
+    """Outcome of one date shard of a DateShardedBacktest, computed in a worker
+
+    Attributes
+    ----------
+    index : int
+        position of the shard in the calendar, -1 for the serial reference run
+    start, end : date
+        first and last traded day, warm-up excluded
+    symbols : list[str]
+        asset_context of the shard
+    names : list[str]
+        names of the portfolios registered by the strategy factory
+    start_values : list[int]
+        start value of every portfolio in cents
+    nett_gains : list[int]
+        nett gain of every portfolio over the shard in cents
+    ledgers : list[TradeLedger]
+        trades of every portfolio closed after the warm-up
+    curves : list[pd.DataFrame]
+        equity curve of every portfolio after the warm-up (see Portfolio.equity_curve)
+    error : str
+        traceback if the shard raised, None otherwise
+    elapsed : float
+        wall time of the shard in seconds
+    """
+
+    def __init__(self, index: int, start: date, end: date, symbols: list[str] = None, names: list[str] = None, start_values: list[int] = None, nett_gains: list[int] = None,
+                 ledgers: list[TradeLedger] = None, curves: list[pd.DataFrame] = None, error: str = None, elapsed: float = 0.0):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.symbols = symbols if symbols is not None else []
+        self.names = names if names is not None else []
+        self.start_values = start_values if start_values is not None else []
+        self.nett_gains = nett_gains if nett_gains is not None else []
+        self.ledgers = ledgers if ledgers is not None else []
+        self.curves = curves if curves is not None else []
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        status = "error" if self.error else f"{len(self.names)} portfolios"
+        return f"{type(self).__name__}(index={self.index}, {self.start} - {self.end}, {status}, elapsed={self.elapsed:.2f}s)"
+
+
+def _run_shard(factory, params: dict, index: int, first: int, start: int, end: int, symbols: list[str] = None,
+               fraction: float = 1.0) -> ShardResult:
+    """Simulates calendar[first:end], throwing away everything traded before calendar[start]. With symbols,
+    only those symbols are traded with fraction of the capital and reading any other symbol raises"""
+    import traceback
+    from pybt.market import Market
+
+    context = _WORKER_CONTEXT
+    calendar = context["calendar"]
+    symbols = symbols if symbols is not None else context["asset_context"]
+    begin = perf_counter()
+    try:
+        market = Market(asset_context=symbols, **context["market_kwargs"])
+        market.guard_symbols(context["asset_context"])
+        market.load_calendar_data("calendar", data=calendar[first:end])
+        market.load_price_data(context["datapack"])
+        factory(market, **params)
+        if fraction != 1.0:
+            market.scale_capital(fraction)
+        with redirect_stdout(io.StringIO()) if context["quiet"] else nullcontext():
+            if start > first:
+                # Warm-up: indicators and strategy state carry on, positions and trades are dropped
+                market.run_simulation(until=calendar[start - 1].date)
+                market.reset_portfolios()
+            market.run_simulation()
+        return ShardResult(index, calendar[start].date, calendar[end - 1].date, symbols,
+                           names=[x.name for x in market.traders],
+                           start_values=[x.start_value.cents for x in market.traders],
+                           nett_gains=[x.nett_gain.cents for x in market.traders],
+                           ledgers=[x.ledger for x in market.traders],
+                           curves=[x.equity_curve.copy() for x in market.traders],
+                           elapsed=perf_counter() - begin)
+    except Exception:
+        return ShardResult(index, calendar[start].date, calendar[end - 1].date, symbols, error=traceback.format_exc(),
+                           elapsed=perf_counter() - begin)
+
+
+class BacktestResult:
+    """Merged outcome of the runs of a parallel backtest, one entry per portfolio name
+
+    Attributes
+    ----------
+    names : list[str]
+        names of the portfolios
+    start_values : list[int]
+        start value of every portfolio in cents
+    ledgers : list[TradeLedger]
+        merged trades of every portfolio
+    equity_curves : list[pd.DataFrame]
+        merged cash, equity and margin of every portfolio in int64 cents indexed by time
+    nett_gains : list[int]
+        merged nett gain of every portfolio in cents
+    elapsed : float
+        wall time of the whole run in seconds
+    difference : dict
+        see difference_report, when the run was compared to a serial run
+    """
+
+    def __init__(self, names: list[str], start_values: list[int], elapsed: float = 0.0):
+        self.names = names
+        self.start_values = start_values
+        self.elapsed = elapsed
+        self.ledgers: list[TradeLedger] = []
+        self.equity_curves: list[pd.DataFrame] = []
+        self.nett_gains: list[int] = []
+        self.difference: dict[str, dict[str, Any]] = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self.names)} portfolios, elapsed={self.elapsed:.2f}s)"
+
+    def summary(self) -> pd.DataFrame:
+        """Start value, nett gain and number of trades of every portfolio, in dollars"""
+        return pd.DataFrame({
+            "start_value": np.array(self.start_values) / 100,
+            "nett_gain": np.array(self.nett_gains) / 100,
+            "closed_positions": [len(x) for x in self.ledgers],
+        }, index=pd.Index(self.names, name="portfolio"))
+
+
+class ShardedResult(BacktestResult):
+    """Date shards stitched back into one run
+
+    Trade ledgers are concatenated in date order. Equity curves are chained: the cash and margin of every
+    shard are shifted by the nett gain of the shards before it, as if each shard started with the account
+    the previous one ended with.
+
+    Attributes
+    ----------
+    shards : list[ShardResult]
+        result of every shard in date order
+    """
+
+    def __init__(self, shards: list[ShardResult], elapsed: float = 0.0):
+        super().__init__(shards[0].names, shards[0].start_values, elapsed)
+        self.shards = shards
+        for i in range(len(self.names)):
+            ledger = TradeLedger(shards[0].ledgers[i].symbols)
+            curves = []
+            gain = 0
+            for shard in shards:
+                ledger.extend(shard.ledgers[i])
+                curve = shard.curves[i].copy()
+                curve["cash"] += gain
+                curve["margin"] += gain
+                curves.append(curve)
+                gain += shard.nett_gains[i]
+            self.ledgers.append(ledger)
+            self.equity_curves.append(pd.concat(curves))
+            self.nett_gains.append(gain)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self.shards)} shards, {len(self.names)} portfolios, elapsed={self.elapsed:.2f}s)"
+
+
+class PartitionedResult(BacktestResult):
+    """Symbol partitions merged into one run
+
+    Start values, nett gains and equity curves are summed over the partitions. Trade ledgers hold the
+    trades of every partition in partition order, see TradeLedger.to_frame to sort them by time.
+
+    Attributes
+    ----------
+    partitions : list[ShardResult]
+        result of every partition, symbols is the group it traded
+    """
+
+    def __init__(self, partitions: list[ShardResult], symbols: list[str], elapsed: float = 0.0):
+        super().__init__(partitions[0].names, [int(x) for x in np.sum([x.start_values for x in partitions], axis=0)], elapsed)
+        self.partitions = partitions
+        for i in range(len(self.names)):
+            ledger = TradeLedger(symbols)
+            for partition in partitions:
+                ledger.extend(partition.ledgers[i])
+            self.ledgers.append(ledger)
+            self.equity_curves.append(pd.concat([x.curves[i] for x in partitions]).groupby(level=0).sum())
+            self.nett_gains.append(sum(x.nett_gains[i] for x in partitions))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self.partitions)} partitions, {len(self.names)} portfolios, elapsed={self.elapsed:.2f}s)"
+
+
+def difference_report(sharded: BacktestResult, serial: BacktestResult) -> dict[str, dict[str, Any]]:
+    """How far a sharded or partitioned run is from the serial run of the same strategy, per portfolio name
+
+    nett_gain_difference : merged minus serial nett gain, in dollars
+    relative_difference : nett_gain_difference over the start value
+    trades_only_sharded, trades_only_serial : number of trades (matched on symbol, size, open and close time)
+        found in one run only. Positions carried over a shard boundary by the serial run show up here
+    max_margin_difference : largest absolute margin difference at the samples both curves have, in dollars
+    """
+    report = {}
+    for i, name in enumerate(sharded.names):
+        ours, theirs = _trade_keys(sharded.ledgers[i]), _trade_keys(serial.ledgers[i])
+        margins = pd.concat([sharded.equity_curves[i]["margin"], serial.equity_curves[i]["margin"]], axis=1, join="inner")
+        margin_difference = (margins.iloc[:, 0] - margins.iloc[:, 1]).abs().max() if len(margins) else 0
+        gain_difference = sharded.nett_gains[i] - serial.nett_gains[i]
+        report[name] = {
+            "nett_gain_difference": gain_difference / 100,
+            "relative_difference": gain_difference / sharded.start_values[i],
+            "trades_only_sharded": sum((ours - theirs).values()),
+            "trades_only_serial": sum((theirs - ours).values()),
+            "max_margin_difference": int(margin_difference) / 100,
+        }
+    return report
+
+
+def _run_tasks(backtest, tasks: list[tuple]) -> list[ShardResult]:
+    """_run_shard of every task in a process pool, in task order. Raises on the first failed task, without
+    starting the tasks still queued"""
+    init_args = (backtest.datapack, backtest.calendar, backtest.asset_context, backtest.market_kwargs, backtest.quiet)
+    if backtest.max_workers == 0:
+        _init_worker(*init_args)
+        results = []
+        for task in tasks:
+            results.append(_check(_run_shard(backtest.strategy_factory, backtest.params, *task)))
+        return results
+
+    with ProcessPoolExecutor(max_workers=backtest.max_workers, mp_context=_pool_context(backtest.start_method), initializer=_init_worker, initargs=init_args) as pool:
+        futures = [pool.submit(_run_shard, backtest.strategy_factory, backtest.params, *task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                _check(future.result())
+        except RuntimeError:
+            for future in futures:
+                future.cancel()
+            raise
+    return [x.result() for x in futures]
+
+
+def _check(shard: ShardResult) -> ShardResult:
+    if shard.error is not None:
+        raise RuntimeError(f"Run {shard.index} ({shard.start} - {shard.end}, {len(shard.symbols)} symbols) failed:\n{shard.error}")
+    return shard
+
+
+def _trade_keys(ledger: TradeLedger) -> Counter:
+    arrays = ledger.arrays()
+    symbols = np.array(ledger.symbols, dtype=object)[arrays["symbol"]]
+    return Counter(zip(symbols, arrays["size"], arrays["open_time"], arrays["close_time"]))
+
+
+class DateShardedBacktest:
+    """Splits the calendar into contiguous date shards and simulates them in parallel worker processes.
+
+    Meant for strategies that hold nothing overnight, so a day's trades do not depend on the days before
+    it other than through indicators and strategy state. Every shard is preceded by warmup_days of the
+    calendar, simulated to warm them up and then thrown away (see Market.reset_portfolios). Positions
+    still open at the end of a shard are closed by end_simulation, and every shard starts from the start
+    value of the portfolios, so strategies that size positions from cash can drift from a serial run.
+    Run with compare_serial=True to measure it.
+
+    Args:
+        strategy_factory (Callable): called as strategy_factory(market, **params) in the worker to register
+            the portfolios of the run. Must be picklable (a module level function)
+        datapack (PriceDataPack): loaded price data shared by every shard
+        calendar (CalendarData): trading calendar to split
+        n_shards (int, optional): number of date shards. Defaults to max_workers, or the number of CPUs.
+        warmup_days (int, optional): days simulated before each shard and discarded. Defaults to 0.
+        asset_context (list[str], optional): Market asset_context. Defaults to the datapack's symbols.
+        max_workers (int, optional): number of shards simulated at the same time. 0 runs everything in this
+            process. Defaults to the number of CPUs.
+        quiet (bool, optional): silence simulation prints in the workers. Defaults to True.
+        params (dict, optional): keyword arguments of strategy_factory. Defaults to None.
+        start_method (str, optional): multiprocessing start method of the worker pool, "fork" shares in memory
+            datapacks copy-on-write (see ParameterSweep). Defaults to the platform default.
+        **market_kwargs: extra Market arguments. record_equity defaults to "day"
+
+    Example
+    -------
+    backtest = DateShardedBacktest(register, datapack, calendar, n_shards=8, warmup_days=5)
+    result = backtest.run(compare_serial=True)
+    print(result.summary(), result.difference)
+    """
+
+    def __init__(self, strategy_factory: Callable, datapack, calendar, n_shards: Optional[int] = None, warmup_days: int = 0,
+                 asset_context: Optional[list[str]] = None, max_workers: Optional[int] = None, quiet: bool = True,
+                 params: Optional[dict] = None, start_method: Optional[str] = None, **market_kwargs):
+        if warmup_days < 0:
+            raise ValueError(f"warmup_days should be at least 0. Got {warmup_days} instead")
+        self.strategy_factory = strategy_factory
+        self.datapack = datapack
+        self.calendar = calendar
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        self.n_shards = min(n_shards or self.max_workers or 1, len(calendar))
+        self.warmup_days = warmup_days
+        self.asset_context = list(asset_context) if asset_context is not None else list(datapack.symbols)
+        self.quiet = quiet
+        self.params = params if params is not None else {}
+        self.start_method = start_method
+        market_kwargs.setdefault("record_equity", "day")
+        self.market_kwargs = market_kwargs
+
+    def shard_bounds(self) -> list[tuple[int, int, int]]:
+        """(first, start, end) calendar indices of every shard: warm-up from first, traded days start:end"""
+        bounds = []
+        for days in np.array_split(np.arange(len(self.calendar)), self.n_shards):
+            start, end = int(days[0]), int(days[-1]) + 1
+            bounds.append((max(start - self.warmup_days, 0), start, end))
+        return bounds
+
+    def run(self, compare_serial: bool = False) -> ShardedResult:
+        """Simulates every shard and stitches them. With compare_serial, the whole calendar is also simulated
+        in one worker and result.difference holds the difference_report against it"""
+        begin = perf_counter()
+        tasks = [(index, *bounds) for index, bounds in enumerate(self.shard_bounds())]
+        if compare_serial:
+            tasks.insert(0, (-1, 0, 0, len(self.calendar)))     # Longest task first
+
+        results = _run_tasks(self, tasks)
+        shards = [x for x in results if x.index >= 0]
+        result = ShardedResult(shards, elapsed=perf_counter() - begin)
+        if compare_serial:
+            result.difference = difference_report(result, ShardedResult(results[:1]))
+        return result
+
+
+class SymbolPartitionedBacktest:
+    """Splits asset_context into symbol groups and simulates each group in its own worker process.
+
+    Meant for strategies whose decisions for a symbol never depend on other symbols, ie a moving average
+    crossover. Every group runs in a Market whose asset_context is that group, so market.assets,
+    active_symbols and the arrays of get_current_prices/get_indicator only cover the group, and each
+    portfolio trades a fraction of its start value. Reading the price, indicator or symbol_index of a
+    symbol of another group raises SymbolOutsideGroupError (see Market.guard_symbols), which fails the run
+    without starting the groups still queued. Results are merged into one PartitionedResult, run with
+    compare_serial=True to measure how far it is from one market trading every symbol.
+
+    Args:
+        strategy_factory (Callable): called as strategy_factory(market, **params) in the worker to register
+            the portfolios of the run. Must be picklable (a module level function)
+        datapack (PriceDataPack): loaded price data shared by every group
+        calendar (CalendarData): trading calendar of every group
+        partitions (int | list[list[str]], optional): number of contiguous groups asset_context is split into,
+            or the groups themselves. Defaults to max_workers, or the number of CPUs.
+        capital (list[float], optional): fraction of the start value of every portfolio given to each group.
+            Defaults to the group's share of asset_context.
+        asset_context (list[str], optional): every symbol traded. Defaults to the datapack's symbols.
+        max_workers (int, optional): number of groups simulated at the same time. 0 runs everything in this
+            process. Defaults to the number of CPUs.
+        quiet (bool, optional): silence simulation prints in the workers. Defaults to True.
+        params (dict, optional): keyword arguments of strategy_factory. Defaults to None.
+        start_method (str, optional): multiprocessing start method of the worker pool, "fork" shares in memory
+            datapacks copy-on-write (see ParameterSweep). Defaults to the platform default.
+        **market_kwargs: extra Market arguments. record_equity defaults to "day"
+
+    Example
+    -------
+    backtest = SymbolPartitionedBacktest(register, datapack, calendar, partitions=8)
+    result = backtest.run()
+    print(result.summary())
+    """
+
+    def __init__(self, strategy_factory: Callable, datapack, calendar, partitions=None, capital: Optional[list[float]] = None,
+                 asset_context: Optional[list[str]] = None, max_workers: Optional[int] = None, quiet: bool = True,
+                 params: Optional[dict] = None, start_method: Optional[str] = None, **market_kwargs):
+        self.strategy_factory = strategy_factory
+        self.datapack = datapack
+        self.calendar = calendar
+        self.asset_context = list(asset_context) if asset_context is not None else list(datapack.symbols)
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        if partitions is None or isinstance(partitions, int):
+            n = min(partitions or self.max_workers or 1, len(self.asset_context))
+            self.partitions = [list(x) for x in np.array_split(np.array(self.asset_context, dtype=object), n)]
+        else:
+            self.partitions = [list(x) for x in partitions]
+            self._check_partitions()
+        if capital is None:
+            capital = [len(x) / len(self.asset_context) for x in self.partitions]
+        if len(capital) != len(self.partitions) or any(x <= 0 for x in capital):
+            raise ValueError(f"capital should be one positive fraction per partition. Got {capital} for {len(self.partitions)} partitions")
+        self.capital = list(capital)
+        self.quiet = quiet
+        self.params = params if params is not None else {}
+        self.start_method = start_method
+        market_kwargs.setdefault("record_equity", "day")
+        self.market_kwargs = market_kwargs
+
+    def _check_partitions(self):
+        seen = set()
+        for group in self.partitions:
+            if not group:
+                raise ValueError("partitions should not be empty")
+            unknown = set(group) - set(self.asset_context)
+            if unknown:
+                raise ValueError(f"partitions have symbols outside asset_context: {sorted(unknown)}")
+            if seen & set(group):
+                raise ValueError(f"symbols in more than one partition: {sorted(seen & set(group))}")
+            seen |= set(group)
+
+    def run(self, compare_serial: bool = False) -> PartitionedResult:
+        """Simulates every group and merges them. With compare_serial, every symbol is also simulated in one
+        worker with the whole capital and result.difference holds the difference_report against it"""
+        begin = perf_counter()
+        days = len(self.calendar)
+        tasks = [(index, 0, 0, days, group, fraction) for index, (group, fraction) in enumerate(zip(self.partitions, self.capital))]
+        if compare_serial:
+            tasks.insert(0, (-1, 0, 0, days))     # Longest task first
+
+        results = _run_tasks(self, tasks)
+        partitions = [x for x in results if x.index >= 0]
+        result = PartitionedResult(partitions, self.asset_context, elapsed=perf_counter() - begin)
+        if compare_serial:
+            result.difference = difference_report(result, ShardedResult(results[:1]))
+        return result
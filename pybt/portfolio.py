@@ -1,23 +1,369 @@
-import inspect
+import numpy as np
 from datetime import datetime
-from pybt.commons.helper import get_caller
+from time import perf_counter
+from pybt.commons.helper import create_with_context, find_context
 from pybt.commons import Money
 from pybt import Position
+from pybt.schedule import combine_schedules
+from pybt.ledger import TradeLedger
+from pybt.recorder import EquityRecorder
+import pandas as pd
+
+# PositionBook.exit_tick/exit_type markers
+EXIT_UNSCANNED = -2
+EXIT_NONE = -1
+EXIT_TAKE_PROFIT = 1
+EXIT_STOP_LOSS = 2
+
+
+def first_crossings(high: np.ndarray, low: np.ndarray, is_long: np.ndarray, take_profit: np.ndarray, stop_loss: np.ndarray,
+                    has_tp: np.ndarray, has_sl: np.ndarray, stop_loss_first: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """First column at which each row crosses its take profit or stop loss level.
+
+    Mirrors Position.should_close evaluated on every column: long positions take profit when the price is at or
+    above take_profit and stop out at or below stop_loss, short positions the other way around.
+
+    Args:
+        high, low (np.ndarray): (rows x ticks) prices in cents. Same array for tick data, bar high/low for bars
+        is_long, take_profit, stop_loss, has_tp, has_sl (np.ndarray): (rows,) position levels in cents
+        stop_loss_first (bool, optional): which exit wins when both are crossed on the same column. Defaults to
+            False (take profit, the order of Position.should_close).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (rows,) column of the first crossing (-1 if none) and its EXIT_* type
+    """
+    is_long = is_long[:, None]
+    tp_hit = has_tp[:, None] & np.where(is_long, high >= take_profit[:, None], low <= take_profit[:, None])
+    sl_hit = has_sl[:, None] & np.where(is_long, low <= stop_loss[:, None], high >= stop_loss[:, None])
+
+    width = high.shape[1]
+    tp_first = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), width)
+    sl_first = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), width)
+
+    take_profit_wins = (tp_first < sl_first) if stop_loss_first else (tp_first <= sl_first)
+    column = np.minimum(tp_first, sl_first)
+    exit_type = np.where(column >= width, EXIT_NONE, np.where(take_profit_wins, EXIT_TAKE_PROFIT, EXIT_STOP_LOSS)).astype(np.int8)
+    return np.where(column >= width, -1, column), exit_type
+
+
+def _exit_fill(bar: tuple[np.ndarray, np.ndarray, np.ndarray], symbol: int, tick: int, is_long: bool, level: int, take_profit: bool) -> int:
+    """Fill price of a bar exit: the level, or the open when the bar gapped through it"""
+    bar_open = bar[0][symbol, tick]
+    if is_long == take_profit:
+        return max(bar_open, level)
+    return min(bar_open, level)
+
+
+class PositionBook:
+    """Struct-of-arrays store of open positions.
+
+    Each open position owns one row of the column arrays below. The book marks every row to market,
+    checks take profit/stop loss and sums equity in one vectorized step per tick. Position objects
+    keep a reference to their row and read their hot attributes from it.
+
+    Prices and values are int64 cents, size is float64 as in Position. exit_tick is the tick of the day at
+    which the position reaches its take profit/stop loss (exit_type), EXIT_NONE if it does not today.
+    """
+    columns = {"symbol": np.int64, "size": np.float64, "open_price": np.int64, "open_value": np.int64,
+               "current_price": np.int64, "current_value": np.int64, "take_profit": np.int64,
+               "stop_loss": np.int64, "has_tp": np.bool_, "has_sl": np.bool_, "is_long": np.bool_,
+               "active": np.bool_, "exit_tick": np.int64, "exit_type": np.int8, "owner": np.int64}
+
+    def __init__(self, capacity: int = 64):
+        self.positions: list[Position] = []
+        self.capacity = capacity
+        for name, dtype in self.columns.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self._day = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _grow(self):
+        self.capacity *= 2
+        for name in self.columns:
+            column = getattr(self, name)
+            grown = np.zeros(self.capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def add(self, position: Position, symbol_index: int, owner: int = 0):
+        if len(self.positions) == self.capacity:
+            self._grow()
+
+        slot = len(self.positions)
+        self.symbol[slot] = symbol_index
+        self.size[slot] = position.size
+        self.open_price[slot] = position.open_price.cents
+        self.open_value[slot] = position.open_value.cents
+        self.current_price[slot] = position.current_price.cents
+        self.current_value[slot] = position.current_value.cents
+        self.is_long[slot] = position.position_type == "long"
+        self.active[slot] = bool(position.active)
+        self.set_levels(slot, position.take_profit, position.stop_loss)
+        self.exit_type[slot] = EXIT_NONE
+        self.owner[slot] = owner
+
+        self.positions.append(position)
+        position._book = self
+        position._slot = slot
+
+    def set_levels(self, slot: int, take_profit: Money = ..., stop_loss: Money = ...):
+        """Sets the take profit and/or stop loss of a row (None to remove it). The row's exit is scanned again
+        from the next update, so a level moved by a strategy (ie a trailing stop) applies from the next tick"""
+        if take_profit is not ...:
+            self.has_tp[slot] = take_profit is not None
+            self.take_profit[slot] = take_profit.cents if take_profit is not None else 0
+        if stop_loss is not ...:
+            self.has_sl[slot] = stop_loss is not None
+            self.stop_loss[slot] = stop_loss.cents if stop_loss is not None else 0
+        self.exit_tick[slot] = EXIT_UNSCANNED
+
+    def remove(self, position: Position):
+        """Detaches position from the book, moving the last row into its slot"""
+        if position._book is not self:
+            return
+
+        slot = position._slot
+        position._current_price = position.current_price
+        position._current_value = position.current_value
+        position._active = position.active
+        position._take_profit = position.take_profit
+        position._stop_loss = position.stop_loss
+        position._book = None
+        position._slot = None
+
+        last = len(self.positions) - 1
+        moved = self.positions.pop()
+        if slot != last:
+            for name in self.columns:
+                column = getattr(self, name)
+                column[slot] = column[last]
+            self.positions[slot] = moved
+            moved._slot = slot
+
+    def update(self, tick: int, prices: np.ndarray, valid: np.ndarray, bar: tuple[np.ndarray, np.ndarray, np.ndarray] = None, day=None) -> list[tuple[Position, str, int]]:
+        """Marks every active position to market and returns the positions that have to be closed.
+
+        Take profit/stop loss exits are not compared tick by tick: the first crossing of every position is
+        found once per day (or once when the position is opened) by scanning the day's price block, see
+        scan_exits. A position closes on the tick stored in its exit_tick row.
+
+        With bar (hourly and daily frequencies) take profit/stop loss are checked against the bar's high and
+        low and fill at their level, or at the open when the bar gaps through it. When a bar touches both,
+        the stop loss is assumed to have been hit first.
+
+        Args:
+            tick (int): current tick
+            prices (np.ndarray): (symbols x ticks) int64 cents of the day
+            valid (np.ndarray): (symbols,) bool mask of symbols with price data
+            bar (tuple[np.ndarray, np.ndarray, np.ndarray], optional): (symbols x ticks) int64 open, high and low
+                cents of the day. Defaults to None (minute data, checks use the price).
+            day (optional): key of the current day, exits are rescanned when it changes. Defaults to None.
+
+        Returns:
+            list[tuple[Position, str, int]]: positions to close with their close_type and fill price in cents.
+                close_type is None for positions that are already closed (ie manually closed by a strategy),
+                fill price is None when the position closes at the current price
+        """
+        n = len(self.positions)
+        if n == 0:
+            self._day = day
+            return []
+
+        self.scan_exits(tick, prices, bar, day)
+
+        symbol = self.symbol[:n]
+        active = self.active[:n]
+        has_price = valid[symbol]
+        price = np.where(has_price & active, prices[symbol, tick], self.current_price[:n])
+
+        exiting = active & has_price & (self.exit_tick[:n] == tick)
+        hit_tp = exiting & (self.exit_type[:n] == EXIT_TAKE_PROFIT)
+        hit_sl = exiting & (self.exit_type[:n] == EXIT_STOP_LOSS)
+
+        self.current_price[:n] = price
+        keep = active & has_price & ~exiting
+        self.current_value[:n] = np.where(keep, np.rint(price * self.size[:n]), self.current_value[:n])
+
+        closing = []
+        for slot in np.flatnonzero(~keep):
+            fill = None
+            if not active[slot]:
+                close_type = None
+            elif not has_price[slot]:
+                close_type = "incomplete_price"
+            elif hit_tp[slot]:
+                close_type = "take_profit"
+                fill = int(_exit_fill(bar, symbol[slot], tick, self.is_long[slot], self.take_profit[slot], True)) if bar is not None else None
+            else:
+                close_type = "stop_loss"
+                fill = int(_exit_fill(bar, symbol[slot], tick, self.is_long[slot], self.stop_loss[slot], False)) if bar is not None else None
+            closing.append((self.positions[slot], close_type, fill))
+
+        return closing
+
+    def scan_exits(self, tick: int, prices: np.ndarray, bar: tuple[np.ndarray, np.ndarray, np.ndarray] = None, day=None):
+        """Finds the exit tick of every position that has not been scanned today, in one vectorized pass.
+
+        Positions are scanned from tick: carried over positions from the first tick of the day, new positions
+        from the first tick after they were opened, positions whose take profit/stop loss changed (see
+        set_levels) from the first tick after the change. All positions are rescanned when day changes.
+        """
+        n = len(self.positions)
+        if day != self._day:
+            self.exit_tick[:n] = EXIT_UNSCANNED
+            self._day = day
+
+        rows = np.flatnonzero(self.exit_tick[:n] == EXIT_UNSCANNED)
+        if len(rows) == 0:
+            return
+
+        symbol = self.symbol[rows]
+        if bar is None:
+            high = low = prices[symbol, tick:]
+        else:
+            high = bar[1][symbol, tick:]
+            low = bar[2][symbol, tick:]
+
+        offset, exit_type = first_crossings(high, low, self.is_long[rows], self.take_profit[rows], self.stop_loss[rows],
+                                            self.has_tp[rows], self.has_sl[rows], stop_loss_first=bar is not None)
+        self.exit_tick[rows] = np.where(offset >= 0, tick + offset, EXIT_NONE)
+        self.exit_type[rows] = exit_type
+
+    def next_trigger(self, tick: int, prices: np.ndarray, bar: tuple[np.ndarray, np.ndarray, np.ndarray] = None) -> int:
+        """First tick after tick at which any active position reaches its take profit or stop loss
+
+        Args:
+            tick (int): current tick
+            prices (np.ndarray): (symbols x ticks) int64 cents of the day
+            bar (tuple[np.ndarray, np.ndarray, np.ndarray], optional): (symbols x ticks) open, high and low
+                cents of the day. Defaults to None (minute data, checks use the price).
+
+        Returns:
+            int: tick of the first crossing, None if no position can close for the rest of the day
+        """
+        n = len(self.positions)
+        if n == 0 or tick + 1 >= prices.shape[1]:
+            return None
+
+        # Positions opened on this tick are scanned from the next one
+        self.scan_exits(tick + 1, prices, bar, self._day)
+        exits = self.exit_tick[:n][self.active[:n] & (self.exit_tick[:n] > tick)]
+        return int(exits.min()) if len(exits) else None
+
+    def total_value(self) -> int:
+        """Sum of current value of all active positions in cents"""
+        n = len(self.positions)
+        return int(self.current_value[:n][self.active[:n]].sum())
+
+    def owner_values(self, owners: int) -> np.ndarray:
+        """(owners,) int64 sum of current value of the active positions of every owner in cents"""
+        n = len(self.positions)
+        active = self.active[:n]
+        values = np.bincount(self.owner[:n][active], weights=self.current_value[:n][active], minlength=owners)
+        return np.rint(values).astype(np.int64)
+
+
+class PortfolioGroup:
+    """Portfolios trading in one market that share a PositionBook and account arrays.
+
+    Cash, equity and start value of every member are int64 cents in (portfolios,) arrays and all positions
+    live in one book tagged with their owner. update marks every member's positions to market, processes
+    exits and sums equity per portfolio in one vectorized step, then runs the members' strategies.
+    A Portfolio created on its own is the only member of its own group.
+    """
+
+    def __init__(self, market=None):
+        self.market = market
+        self.book = PositionBook()
+        self.portfolios: list["Portfolio"] = []
+        self.cash = np.zeros(0, dtype=np.int64)
+        self.equity = np.zeros(0, dtype=np.int64)
+        self.start_value = np.zeros(0, dtype=np.int64)
+        record_equity = getattr(market, "record_equity", None)
+        self.recorder: EquityRecorder = EquityRecorder(market, record_equity) if record_equity is not None else None
+
+    def __len__(self):
+        return len(self.portfolios)
+
+    def add(self, portfolio: "Portfolio", start_value: Money) -> int:
+        self.portfolios.append(portfolio)
+        self.cash = np.append(self.cash, start_value.cents)
+        self.equity = np.append(self.equity, 0)
+        self.start_value = np.append(self.start_value, start_value.cents)
+        return len(self.portfolios) - 1
+
+    def reset(self):
+        """Drops the open positions, trades and recorded equity of every member and restores their start value.
+        Scorer/Optimizer and indicator state is kept, ie to throw away the trades of a warm-up period"""
+        self.book = PositionBook()
+        self.cash[:] = self.start_value
+        self.equity[:] = 0
+        for portfolio in self.portfolios:
+            portfolio.book = self.book
+            portfolio.open_positions = []
+            portfolio._to_remove = []
+            portfolio.ledger.clear()
+        if self.recorder is not None:
+            self.recorder.clear()
+
+    def scale_capital(self, fraction: float):
+        """Multiplies the start value of every member by fraction, ie to trade a share of the capital.
+        Resets the group, so call it before the simulation starts"""
+        self.start_value[:] = np.rint(self.start_value * fraction).astype(np.int64)
+        for portfolio in self.portfolios:
+            portfolio.start_value = Money.from_cents(int(self.start_value[portfolio._slot]))
+        self.reset()
+
+    def update(self, portfolios: list["Portfolio"] = None):
+        """Runs one tick for the group, executing the strategies of portfolios (defaults to every member).
+        Positions of every member are always updated, so updating members one by one on the same tick
+        gives the same result as updating the group once"""
+        market = self.market
+        if market.profiler is not None:
+            start = perf_counter()
+        prices, valid, bar = market.get_today_cents()
+        for position, close_type, fill in self.book.update(market.tick_counter, prices, valid, bar, day=market.day_counter):
+            if close_type == "incomplete_price":
+                position.terminate_early()
+            elif close_type is not None:
+                position.close_position(close_type, price=Money.from_cents(fill) if fill is not None else None)
+            position.portfolio.process_close(position)
+
+        self.equity[:] = self.book.owner_values(len(self.portfolios))
+        if self.recorder is not None:
+            self.recorder.record(self.cash, self.equity)
+        if market.profiler is not None:
+            market.profiler.add("positions", perf_counter() - start)
+
+        for portfolio in portfolios if portfolios is not None else self.portfolios:
+            portfolio._to_remove = []
+            portfolio.execute_strategy()
 
 
 class Portfolio:
-    def __init__(self, start_value: float = None, start_date: datetime = None, end_date: datetime = None, **kwargs):
+    def __init__(self, start_value: float = None, start_date: datetime = None, end_date: datetime = None, market=None, group: PortfolioGroup = None, name: str = None, ledger: TradeLedger = None, **kwargs):
+        if market is None:
+            from pybt.market import Market
+            market = find_context(Market, "Creating a Portfolio without its market is deprecated. Use Market.register_portfolio to create one")
+            if market is None:
+                raise TypeError("Portfolio requires the market it trades in. Use Market.register_portfolio to create one")
         self.start_value = Money(start_value)
-        self.cash = Money(start_value)
-        self.equity = Money(0)
+        self.market = market
+        self.name = name if name is not None else f"portfolio{len(market.traders)}"
+
+        # Account Context. cash/equity live in the group arrays, positions in the group book
+        self.group = group if group is not None else PortfolioGroup(market)
+        self._slot = self.group.add(self, self.start_value)
+        self.book = self.group.book
+
         self.open_positions = []
-        self.closed_positions = []
-        self.market = get_caller(inspect.stack()[1][0])
+        # Closed trades are recorded in the ledger, the Position objects are not kept
+        self.ledger = ledger if ledger is not None else TradeLedger(market.assets)
         self.start_date = start_date if start_date is not None else self.market.start_date
         self.end_date = end_date if end_date is not None else self.market.end_date
-        self.margin = start_value
         self._to_remove = []
-        self.nett_gain = Money(0)
         self.scorer = None
         self.optimizer = None
 
@@ -26,19 +372,60 @@ class Portfolio:
             value = args[1]
 
             if key == "scorer":
-                self.scorer = value()
+                self.scorer = create_with_context(value, market=self.market)
 
             elif key == "optimizer":
-                self.optimizer = value()
+                self.optimizer = create_with_context(value, portfolio=self)
 
             else:
                 raise AttributeError(f"Unknown keyword argument '{key}'")
 
         self.debug_mode = self.market.debug_mode
 
+        # Strategy schedule. Due ticks of the current day are cached per day
+        self.schedule = combine_schedules(self.scorer, self.optimizer)
+        self._due: np.ndarray = None
+        self._due_day = None
+
+    @property
+    def cash(self) -> Money:
+        return Money.from_cents(int(self.group.cash[self._slot]))
+
+    @cash.setter
+    def cash(self, value: Money):
+        self.group.cash[self._slot] = value.cents if isinstance(value, Money) else Money(value).cents
+
+    @property
+    def equity(self) -> Money:
+        return Money.from_cents(int(self.group.equity[self._slot]))
+
+    @equity.setter
+    def equity(self, value: Money):
+        self.group.equity[self._slot] = value.cents if isinstance(value, Money) else Money(value).cents
+
+    @property
+    def margin(self) -> Money:
+        return Money.from_cents(int(self.group.cash[self._slot] + self.group.equity[self._slot]))
+
+    @property
+    def nett_gain(self) -> Money:
+        return Money.from_cents(int(self.group.cash[self._slot] + self.group.equity[self._slot] - self.group.start_value[self._slot]))
+
+    @property
+    def equity_curve(self) -> pd.DataFrame:
+        """Recorded cash, equity and margin in int64 cents indexed by time. Requires Market(..., record_equity=...)"""
+        if self.group.recorder is None:
+            raise RuntimeError("Equity is not recorded. Create the market with record_equity set, ie Market(..., record_equity=1)")
+        return self.group.recorder.frame(self._slot)
+
+    @property
+    def closed_positions(self) -> TradeLedger:
+        """Closed trades, as Trade tuples with the attributes of the closed positions"""
+        return self.ledger
+
     def open_position_by_value(self, symbol, value, take_profit=None, stop_loss=None):
         if self.can_open(value):
-            self.process_open(Position.open_by_value(symbol, value, take_profit=take_profit, stop_loss=stop_loss))
+            self.process_open(Position.open_by_value(symbol, value, take_profit=take_profit, stop_loss=stop_loss, portfolio=self))
             return True
         return False
 
@@ -46,7 +433,7 @@ class Portfolio:
         current_price = self.market.get_current_price(symbol)
         buy_value = current_price * size
         if self.can_open(buy_value):
-            self.process_open(Position.open_by_value(symbol, buy_value, take_profit=take_profit, stop_loss=stop_loss))
+            self.process_open(Position.open_by_value(symbol, buy_value, take_profit=take_profit, stop_loss=stop_loss, portfolio=self))
             return True
         return False
 
@@ -58,7 +445,7 @@ class Portfolio:
         else:
             return False
         if self.can_open(buy_value):
-            self.process_open(Position.open_by_value(symbol, buy_value, take_profit=take_profit, stop_loss=stop_loss))
+            self.process_open(Position.open_by_value(symbol, buy_value, take_profit=take_profit, stop_loss=stop_loss, portfolio=self))
             return True
         return False
 
@@ -82,47 +469,86 @@ class Portfolio:
             return
         self.cash -= position.open_value + position.open_commission
         self.equity += position.current_value
-        self.margin = self.cash + self.equity
-        self.nett_gain = self.cash + self.equity - self.start_value
         self.open_positions.append(position)
+        self.book.add(position, self.market.symbol_index[position.symbol], owner=self._slot)
 
     def process_close(self, position):
         self.cash += position.close_value - position.close_commission
         self.equity -= position.close_value
         self._to_remove.append(position)
-        self.closed_positions.append(position)
+        self.ledger.record(position)
         self.open_positions.remove(position)
+        self.book.remove(position)
 
         if self.debug_mode == 2:
             print(f"[{self.market.time_now}]Cash: {self.cash} Equity: {self.equity} Nett Gain: {self.nett_gain}")
 
     def update(self):
-        total_value = Money(0)
-        for position in self.open_positions:
-            position.update()
-            if position.active == True:
-                total_value += position.current_value
-            else:
-                self.process_close(position)
+        self.group.update([self])
 
-        self._to_remove = []
-        self.equity = total_value
-        self.margin = self.cash + self.equity
-        self.nett_gain = self.cash + self.equity - self.start_value
+    def execute_strategy(self):
+        if not self.is_due(self.market.tick_counter):
+            return
 
         data = None
+        profiler = self.market.profiler
         # Run scorer and optimizer
         if self.scorer is not None:
-            data = self.scorer.execute()
+            data = self.scorer.execute() if profiler is None else profiler.time("scorer", self.scorer.execute, strategy=self.name)
 
         if self.optimizer is not None:
-            self.optimizer.execute(data)
+            if profiler is None:
+                self.optimizer.execute(data)
+            else:
+                profiler.time("optimizer", self.optimizer.execute, data, strategy=self.name)
 
     def execute(self):
         pass
 
+    def due_ticks(self) -> np.ndarray:
+        """(ticks,) bool mask of the ticks of the current day at which the scorer/optimizer are executed"""
+        day = (self.market.day_counter, self.market.n_ticks)
+        if self._due_day != day:
+            self._due = self.schedule.mask(self.market.today_open, self.market.n_ticks, self.market.tick_step)
+            self._due_day = day
+        return self._due
+
+    def is_due(self, tick: int) -> bool:
+        return self.schedule.every_tick or bool(self.due_ticks()[tick])
+
+    def next_event_tick(self, tick: int) -> int:
+        """Next tick of the current day at which this portfolio has something to do: its strategy is due,
+        a position reaches its take profit/stop loss or a closed position has to be processed
+
+        Returns:
+            int: tick after tick, None if nothing happens for the rest of the day
+        """
+        if self.schedule.every_tick:
+            return tick + 1
+
+        n = len(self.book)
+        if n and not self.book.active[:n].all():
+            return tick + 1
+
+        events = []
+        upcoming = np.flatnonzero(self.due_ticks()[tick + 1:])
+        if len(upcoming):
+            events.append(tick + 1 + int(upcoming[0]))
+
+        if self.group.recorder is not None:
+            sample = self.group.recorder.next_tick(tick, self.market.n_ticks)
+            if sample is not None:
+                events.append(sample)
+
+        prices, _, bar = self.market.get_today_cents()
+        trigger = self.book.next_trigger(tick, prices, bar)
+        if trigger is not None:
+            events.append(trigger)
+
+        return min(events) if events else None
+
     def end_simulation(self):
-        for position in self.open_positions:
+        for position in list(self.open_positions):
             position.update()
             if position.active == True:
                 position.close_position("end_of_simulation")
@@ -131,8 +557,6 @@ class Portfolio:
 
         self._to_remove = []
         self.equity = Money(0)
-        self.margin = self.cash
-        self.nett_gain = self.cash + self.equity - self.start_value
         print(f"END SIMULATION - Cash: {self.cash}, Equity: {self.equity}, Margin: {self.margin}, Nett Gain: {self.nett_gain}")
 
     def get_positions(self, symbol):
@@ -1,6 +1,5 @@
 from pybt.commons import Money
-from pybt.commons.helper import get_caller
-import inspect
+from pybt.commons.helper import find_context
 import warnings
 
 
@@ -10,6 +9,16 @@ class Position:
     def __init__(self, portfolio):
         self.portfolio = portfolio
         self.debug_mode = self.portfolio.debug_mode
+
+        # PositionBook row backing this position while it is open. See pybt.portfolio.PositionBook
+        self._book = None
+        self._slot = None
+        self._active = None
+        self._current_price = None
+        self._current_value = None
+        self._take_profit = None
+        self._stop_loss = None
+
         self.symbol = None
         self.size = None
         self.position_type = None
@@ -32,14 +41,89 @@ class Position:
         self.take_profit = None
         self.stop_loss = None
 
-        self.gain = None
         self.total_commission = self.open_commission + self.close_commission
 
+    # Hot attributes are views on the PositionBook row when the position is held in a book
+    @property
+    def active(self):
+        if self._book is not None:
+            return bool(self._book.active[self._slot])
+        return self._active
+
+    @active.setter
+    def active(self, value):
+        self._active = value
+        if self._book is not None:
+            self._book.active[self._slot] = bool(value)
+
+    @property
+    def current_price(self) -> Money:
+        if self._book is not None:
+            return Money.from_cents(int(self._book.current_price[self._slot]))
+        return self._current_price
+
+    @current_price.setter
+    def current_price(self, value: Money):
+        self._current_price = value
+        if self._book is not None:
+            self._book.current_price[self._slot] = value.cents
+
+    @property
+    def current_value(self) -> Money:
+        if self._book is not None:
+            return Money.from_cents(int(self._book.current_value[self._slot]))
+        return self._current_value
+
+    @current_value.setter
+    def current_value(self, value: Money):
+        self._current_value = value
+        if self._book is not None:
+            self._book.current_value[self._slot] = value.cents
+
+    @property
+    def take_profit(self) -> Money:
+        if self._book is not None:
+            return Money.from_cents(int(self._book.take_profit[self._slot])) if self._book.has_tp[self._slot] else None
+        return self._take_profit
+
+    @take_profit.setter
+    def take_profit(self, value: Money):
+        if value is not None and not isinstance(value, Money):
+            value = Money(value)
+        self._take_profit = value
+        if self._book is not None:
+            self._book.set_levels(self._slot, take_profit=value)
+
+    @property
+    def stop_loss(self) -> Money:
+        if self._book is not None:
+            return Money.from_cents(int(self._book.stop_loss[self._slot])) if self._book.has_sl[self._slot] else None
+        return self._stop_loss
+
+    @stop_loss.setter
+    def stop_loss(self, value: Money):
+        if value is not None and not isinstance(value, Money):
+            value = Money(value)
+        self._stop_loss = value
+        if self._book is not None:
+            self._book.set_levels(self._slot, stop_loss=value)
+
+    @property
+    def gain(self) -> Money:
+        if self.current_value is None or self.open_value is None:
+            return None
+        return self.current_value - self.open_value
+
     @classmethod
-    def open_by_value(cls, symbol, value, take_profit=None, stop_loss=None):
+    def open_by_value(cls, symbol, value, take_profit=None, stop_loss=None, portfolio=None):
+        if portfolio is None:
+            from pybt.portfolio import Portfolio
+            portfolio = find_context(Portfolio, "Position.open_by_value without the portfolio opening the position is deprecated. Use Portfolio.open_position_by_value")
+            if portfolio is None:
+                raise TypeError("Position.open_by_value requires the portfolio opening the position")
         if type(value) != Money:
             value = Money(value)
-        position = cls(get_caller(inspect.stack()[1][0]))  # get_caller gets the portfolio object that called this position.
+        position = cls(portfolio)
         market = position.portfolio.market
         current_price = market.get_current_price(symbol)
         if current_price is None:
@@ -67,7 +151,6 @@ class Position:
         self.open_commission = self.open_value.abs() * self.commission_rate
         self.total_commission = self.open_commission
         self.current_value = self.current_price * self.size
-        self.gain = self.current_value - self.open_value
         self.process_tp_sl(take_profit, stop_loss)
 
         if self.debug_mode:
@@ -75,15 +158,14 @@ class Position:
 
         return self
 
-    def close_position(self, close_type=None):
+    def close_position(self, close_type=None, price: Money = None):
         self.close_time = self.portfolio.market.time_now
-        self.close_price = self.portfolio.market.get_current_price(self.symbol)
+        self.close_price = price if price is not None else self.portfolio.market.get_current_price(self.symbol)
         self.current_price = self.close_price if self.close_price else self.current_price  # Handles incomplete_price scenario
         self.current_value = self.current_price * self.size
         self.close_commission = Money(self.commission_rate * self.current_value).abs()
         self.total_commission = self.open_commission + self.close_commission
         self.close_value = self.current_value
-        self.gain = self.current_value - self.open_value
         self.active = False
 
         if close_type is None:
@@ -143,7 +225,6 @@ class Position:
             return self.close_position(should_close)
 
         self.current_value = self.current_price * self.size
-        self.gain = self.current_value - self.open_value
 
         return self.gain
 
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from typing import Union
+
+
+class EquityRecorder:
+    """Equity curve of the portfolios of a PortfolioGroup, recorded into preallocated int64 cent arrays.
+
+    Enabled with Market(..., record_equity=every). The arrays are sized once from the number of ticks of
+    every day of the calendar, and each sample copies the group's cash/equity arrays into one column, so
+    recording never creates Money objects. Samples are taken after positions are marked to market and
+    before the strategies run.
+
+    every
+    -----
+    int n : every n ticks from the open of each day, 1 for every tick
+    "day" : last tick of each day
+
+    Attributes
+    ----------
+    times : np.ndarray
+        (samples,) datetime64[s] time of each sample
+    cash, equity, margin : np.ndarray
+        (portfolios, samples) int64 cents, row i is the portfolio in slot i of the group
+    """
+
+    def __init__(self, market, every: Union[int, str] = 1):
+        if every != "day" and (not isinstance(every, int) or every < 1):
+            raise ValueError(f"every should be a number of ticks of at least 1 or 'day'. Got {every!r} instead")
+        self.market = market
+        self.every = every
+        self.n = 0
+        self._last: tuple[int, int] = None      # (day, tick) of the last sample
+        self._times: np.ndarray = None
+        self._cash: np.ndarray = None
+        self._equity: np.ndarray = None
+        self._margin: np.ndarray = None
+
+    def __len__(self):
+        return self.n
+
+    def samples_per_day(self, n_ticks: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        if self.every == "day":
+            return np.minimum(n_ticks, 1)
+        return -(-n_ticks // self.every)
+
+    def is_due(self, tick: int, n_ticks: int) -> bool:
+        if self.every == "day":
+            return tick == n_ticks - 1
+        return tick % self.every == 0
+
+    def next_tick(self, tick: int, n_ticks: int) -> int:
+        """First sampled tick of the day after tick, None if there is none"""
+        if self.every == "day":
+            upcoming = n_ticks - 1
+        else:
+            upcoming = (tick // self.every + 1) * self.every
+        return upcoming if tick < upcoming < n_ticks else None
+
+    def _allocate(self, width: int):
+        capacity = int(self.samples_per_day(self.market.day_ticks()).sum())
+        self._times = np.zeros(capacity, dtype="datetime64[s]")
+        self._cash = np.zeros((width, capacity), dtype=np.int64)
+        self._equity = np.zeros((width, capacity), dtype=np.int64)
+        self._margin = np.zeros((width, capacity), dtype=np.int64)
+
+    def record(self, cash: np.ndarray, equity: np.ndarray):
+        """Samples the (portfolios,) cash and equity cents of the group if the current tick is due"""
+        market = self.market
+        if not self.is_due(market.tick_counter, market.n_ticks):
+            return
+        if self._last == (market.day_counter, market.tick_counter):
+            return      # Already sampled, ie every member of a batched group updated one by one
+        if self._cash is None or len(self._cash) != len(cash) or self.n == len(self._times):
+            self._grow(len(cash))       # New portfolios, or a resumed run extended onto new calendar days
+        if self.n == len(self._times):
+            return      # Calendar exhausted, ie stepped past the last day by hand
+
+        i = self.n
+        self._times[i] = market.time_now
+        self._cash[:, i] = cash
+        self._equity[:, i] = equity
+        self._margin[:, i] = cash + equity
+        self.n += 1
+        self._last = (market.day_counter, market.tick_counter)
+
+    def _grow(self, width: int):
+        # Portfolios registered after the first sample have no history before it
+        old = (self._cash, self._equity, self._margin, self._times)
+        self._allocate(max(width, len(old[0]) if old[0] is not None else 0))
+        if old[0] is not None:
+            self._times[:self.n] = old[3][:self.n]
+            for new, previous in zip((self._cash, self._equity, self._margin), old[:3]):
+                new[:len(previous), :self.n] = previous[:, :self.n]
+
+    def clear(self):
+        """Forgets every sample, the arrays are reused"""
+        self.n = 0
+        self._last = None
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times[:self.n] if self._times is not None else np.zeros(0, dtype="datetime64[s]")
+
+    @property
+    def cash(self) -> np.ndarray:
+        return self._cash[:, :self.n] if self._cash is not None else np.zeros((0, 0), dtype=np.int64)
+
+    @property
+    def equity(self) -> np.ndarray:
+        return self._equity[:, :self.n] if self._equity is not None else np.zeros((0, 0), dtype=np.int64)
+
+    @property
+    def margin(self) -> np.ndarray:
+        return self._margin[:, :self.n] if self._margin is not None else np.zeros((0, 0), dtype=np.int64)
+
+    def frame(self, slot: int) -> pd.DataFrame:
+        """Equity curve of the portfolio in slot as a DataFrame of int64 cents indexed by time. The columns
+        are views on the recorder arrays, not copies"""
+        if self._cash is None or slot >= len(self._cash):
+            return pd.DataFrame({"cash": [], "equity": [], "margin": []}, dtype=np.int64)
+        return pd.DataFrame({"cash": self.cash[slot], "equity": self.equity[slot], "margin": self.margin[slot]},
+                            index=pd.DatetimeIndex(self.times, name="time"), copy=False)
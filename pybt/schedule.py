@@ -0,0 +1,92 @@
+import numpy as np
+from datetime import datetime, time, timedelta
+from typing import Union
+
+
+class Schedule:
+    """When a Scorer/Optimizer needs to be executed, declared with the class attribute `schedule`.
+
+    - None: every tick (default)
+    - int n: every n ticks from the open, ie 30 for every half hour in 1minute frequency
+    - datetime.time or list of datetime.time: at the tick covering each time of the day. Hourly and daily
+      ticks are stamped at the end of their bar, so the bar covering 9:30 runs at 10:30 in 1hour frequency
+    - Schedule: used as is
+
+    With event stepping (see Market) the clock only stops at ticks where a strategy is due or an open
+    position can be closed, so a strategy called a few times a day skips most of the day.
+
+    Example
+    -------
+    class RebalanceAtOpen(Optimizer):
+        schedule = [time(9, 30), time(15, 30)]
+    """
+
+    def __init__(self, every: int = None, at: list[time] = None):
+        if every is not None and every < 1:
+            raise ValueError(f"every should be at least 1. Got {every} instead")
+        self.every = every
+        self.at = list(at) if at is not None else None
+
+    @classmethod
+    def from_spec(cls, spec: Union[None, int, time, list, "Schedule"]) -> "Schedule":
+        if spec is None:
+            return cls(every=1)
+        if isinstance(spec, Schedule):
+            return spec
+        if isinstance(spec, int):
+            return cls(every=spec)
+        if isinstance(spec, time):
+            return cls(at=[spec])
+        if isinstance(spec, (list, tuple)) and all(isinstance(x, time) for x in spec):
+            return cls(at=spec)
+        raise TypeError(f"schedule should be None, int, datetime.time or a list of datetime.time. Got {spec!r} instead")
+
+    @property
+    def every_tick(self) -> bool:
+        return self.every == 1
+
+    def mask(self, day_open: datetime, n_ticks: int, step: timedelta) -> np.ndarray:
+        """(n_ticks,) bool mask of the ticks of a day at which the schedule is due
+
+        Args:
+            day_open (datetime): session open of the day
+            n_ticks (int): number of ticks of the day
+            step (timedelta): time between ticks, timedelta(0) when the day is a single tick
+        """
+        due = np.zeros(n_ticks, dtype=bool)
+        if self.every is not None:
+            due[::self.every] = True
+        if self.at is not None:
+            for x in self.at:
+                offset = datetime.combine(day_open.date(), x) - day_open
+                tick = int(offset // step) if step else 0
+                if 0 <= tick < n_ticks and offset >= timedelta(0):
+                    due[tick] = True
+        return due
+
+
+def combine_schedules(*components) -> Schedule:
+    """Schedule of a Portfolio running the given Scorer/Optimizer together. Components without a declared
+    schedule follow the others, a Portfolio where none declares one runs every tick"""
+    declared = [Schedule.from_spec(x.schedule) for x in components if x is not None and getattr(x, "schedule", None) is not None]
+    if not declared:
+        return Schedule(every=1)
+    if len(declared) == 1:
+        return declared[0]
+    return _UnionSchedule(declared)
+
+
+class _UnionSchedule(Schedule):
+    def __init__(self, schedules: list[Schedule]):
+        super().__init__()
+        self.schedules = schedules
+
+    @property
+    def every_tick(self) -> bool:
+        return any(x.every_tick for x in self.schedules)
+
+    def mask(self, day_open: datetime, n_ticks: int, step: timedelta) -> np.ndarray:
+        due = np.zeros(n_ticks, dtype=bool)
+        for x in self.schedules:
+            due |= x.mask(day_open, n_ticks, step)
+        return due
@@ -0,0 +1,2 @@
+from pybt.scorer.base import BaseScorer
+from pybt.scorer import metrics
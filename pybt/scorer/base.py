@@ -0,0 +1,10 @@
+class BaseScorer:
+    schedule = None     # Ticks at which execute is called, every tick by default. See pybt.schedule.Schedule
+
+    def __init__(self, market=None):
+        # market is injected by Portfolio before __init__ runs. See commons.helper.create_with_context
+        if market is not None or not hasattr(self, "market"):
+            self.market = market
+
+    def execute(self, data):
+        raise NotImplementedError("Scorer object must have an execute method defined")
@@ -0,0 +1,127 @@
+"""Vectorized performance metrics of equity curves and trades.
+
+Curve metrics take a (time,) equity curve or a (runs x time) stack of curves and return a float or a
+(runs,) array, so ranking a sweep is one call followed by np.argsort. Curves are account values, ie the
+margin (cash + equity) of EquityRecorder, in any unit. periods_per_year is the number of samples in a year:
+252 for one sample a day, 252 * 390 for every minute.
+
+Trade metrics take per trade arrays (see trade_gains) and optionally the run index of every trade to
+compute the metric of many runs at once.
+"""
+import numpy as np
+from typing import Union
+
+ArrayOrFloat = Union[float, np.ndarray]
+
+
+def returns(equity: np.ndarray) -> np.ndarray:
+    """Simple returns between consecutive samples along the last axis"""
+    equity = np.asarray(equity, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(equity, axis=-1) / equity[..., :-1]
+
+
+def sharpe_ratio(equity: np.ndarray, periods_per_year: float = 252, risk_free: float = 0.0) -> ArrayOrFloat:
+    """Annualized Sharpe ratio. risk_free is the annual rate. NaN for flat curves"""
+    excess = returns(equity) - risk_free / periods_per_year
+    std = excess.std(axis=-1, ddof=1) if excess.shape[-1] > 1 else np.full(excess.shape[:-1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = excess.mean(axis=-1) / std * np.sqrt(periods_per_year)
+    return _result(np.where(std > 0, ratio, np.nan))
+
+
+def sortino_ratio(equity: np.ndarray, periods_per_year: float = 252, target: float = 0.0) -> ArrayOrFloat:
+    """Annualized Sortino ratio against a per period target return. NaN without downside"""
+    excess = returns(equity) - target
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2, axis=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = excess.mean(axis=-1) / downside * np.sqrt(periods_per_year)
+    return _result(np.where(downside > 0, ratio, np.nan))
+
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """Fraction below the running peak at every sample, same shape as equity"""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(peak > 0, 1 - equity / peak, 0.0)
+
+
+def max_drawdown(equity: np.ndarray) -> ArrayOrFloat:
+    """Largest fall from a running peak as a positive fraction, ie 0.25 for a 25% drawdown"""
+    return _result(drawdown(equity).max(axis=-1))
+
+
+def total_return(equity: np.ndarray) -> ArrayOrFloat:
+    equity = np.asarray(equity, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _result(equity[..., -1] / equity[..., 0] - 1)
+
+
+def win_rate(gains: np.ndarray, runs: np.ndarray = None, n_runs: int = None) -> ArrayOrFloat:
+    """Fraction of trades with a positive gain. With runs (the run index of every trade), the (n_runs,)
+    win rate of every run, NaN for runs without trades"""
+    gains = np.asarray(gains, dtype=np.float64)
+    if runs is None:
+        return float(np.mean(gains > 0)) if len(gains) else np.nan
+    wins = np.bincount(runs, weights=gains > 0, minlength=n_runs or 0)
+    counts = np.bincount(runs, minlength=n_runs or 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, wins / counts, np.nan)
+
+
+def turnover(traded: np.ndarray, equity: np.ndarray, runs: np.ndarray = None) -> ArrayOrFloat:
+    """Traded value over the average account value: how many times the account was traded over the run
+
+    Args:
+        traded (np.ndarray): absolute value traded by every trade, ie |open value| + |close value|
+        equity (np.ndarray): (time,) or (runs x time) account value, same unit as traded
+        runs (np.ndarray, optional): run index of every trade when equity is a stack. Defaults to None.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    average = equity.mean(axis=-1)
+    if runs is None:
+        total = np.sum(traded)
+    else:
+        total = np.bincount(runs, weights=traded, minlength=equity.shape[0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _result(np.where(average > 0, total / average, np.nan))
+
+
+def trade_gains(trades: dict[str, np.ndarray]) -> np.ndarray:
+    """Nett gain of every trade in cents (after commissions) from TradeLedger.arrays()"""
+    gross = np.rint(trades["close_price"] * trades["size"]) - np.rint(trades["open_price"] * trades["size"])
+    return gross - trades["open_commission"] - trades["close_commission"]
+
+
+def traded_value(trades: dict[str, np.ndarray]) -> np.ndarray:
+    """Absolute value traded by every trade in cents, opening and closing, from TradeLedger.arrays()"""
+    return np.abs(trades["open_price"] * trades["size"]) + np.abs(trades["close_price"] * trades["size"])
+
+
+def compute_metrics(equity: np.ndarray, periods_per_year: float = 252, gains: np.ndarray = None,
+                    traded: np.ndarray = None, runs: np.ndarray = None) -> dict[str, ArrayOrFloat]:
+    """Every metric of one curve or of a (runs x time) stack, trade metrics when trade arrays are given"""
+    metrics = {
+        "total_return": total_return(equity),
+        "sharpe_ratio": sharpe_ratio(equity, periods_per_year),
+        "sortino_ratio": sortino_ratio(equity, periods_per_year),
+        "max_drawdown": max_drawdown(equity),
+    }
+    n_runs = np.shape(equity)[0] if np.ndim(equity) == 2 else None
+    if gains is not None:
+        metrics["win_rate"] = win_rate(gains, runs, n_runs)
+    if traded is not None:
+        metrics["turnover"] = turnover(traded, equity, runs)
+    return metrics
+
+
+def portfolio_metrics(portfolio, periods_per_year: float = 252) -> dict[str, float]:
+    """compute_metrics of a Portfolio from its recorded equity curve (see EquityRecorder) and trade ledger"""
+    trades = portfolio.ledger.arrays()
+    return compute_metrics(portfolio.equity_curve["margin"].to_numpy(), periods_per_year,
+                           gains=trade_gains(trades), traded=traded_value(trades))
+
+
+def _result(values: np.ndarray) -> ArrayOrFloat:
+    return float(values) if np.ndim(values) == 0 else values
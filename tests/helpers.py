@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, date, time
+from pybt import Market, Portfolio, Scorer, Optimizer
+from pybt.datapack import PriceDataPack
+from pybt.indicators import SMAIndicator
+
+DAYS = [date(2021, 1, 4), date(2021, 1, 5), date(2021, 1, 6)]
+
+
+def make_frames(symbols: list[str], days: list[date] = DAYS, drop: float = 0.3, seed: int = 0) -> dict[str, pd.DataFrame]:
+    """Random walk minute bars between 9:30 and 16:00 with a fraction of bars dropped"""
+    rng = np.random.default_rng(seed)
+    dfs = {}
+    for symbol in symbols:
+        index = []
+        for day in days:
+            index += list(pd.date_range(datetime.combine(day, time(9, 30)), datetime.combine(day, time(16)), freq="min"))
+        index = pd.DatetimeIndex(index)
+        index = index[rng.random(len(index)) >= drop]
+        close = 100 + rng.standard_normal(len(index)).cumsum()
+        dfs[symbol] = pd.DataFrame({"open": close, "high": close + 0.05, "low": close - 0.05, "close": close, "volume": 100.0}, index=index)
+
+    return dfs
+
+
+def make_datapack(symbols: list[str], days: list[date] = DAYS, drop: float = 0.3, seed: int = 0) -> PriceDataPack:
+    return PriceDataPack.load_pandas(make_frames(symbols, days, drop, seed))
+
+
+def make_calendar(days: list[date] = DAYS) -> pd.DataFrame:
+    return pd.DataFrame({"date": [pd.Timestamp(x) for x in days], "open": [time(9, 30)] * len(days), "close": [time(16)] * len(days)})
+
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+class RotatingScorer(Scorer):
+    """Next active symbol at every call, starting offset symbols in"""
+    offset = 0
+
+    def __init__(self):
+        super().__init__()
+        self.calls = self.offset
+
+    def execute(self):
+        self.calls += 1
+        return self.market.active_symbols[self.calls % len(self.market.active_symbols)]
+
+
+class TrendScorer(Scorer):
+    """Symbol furthest above its 30 bar moving average, None until the average is ready"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.market.register_indicator("sma30", SMAIndicator, 30)
+
+    def execute(self):
+        self.calls += 1
+        trend = self.market.get_current_prices() - self.market.get_indicator("sma30")
+        if np.isnan(trend).all():
+            return None
+        return self.market.assets[int(np.nanargmax(trend))]
+
+
+class CrossScorer(Scorer):
+    """Scores every symbol of the market on its own"""
+
+    def __init__(self):
+        super().__init__()
+        self.market.register_indicator("sma30", SMAIndicator, 30)
+
+    def execute(self):
+        trend = self.market.get_current_prices() - self.market.get_indicator("sma30")
+        return {symbol: trend[i] for i, symbol in enumerate(self.market.assets) if not np.isnan(trend[i])}
+
+
+class LeakyScorer(CrossScorer):
+    """CrossScorer that also reads AAA, like a benchmark, from every symbol group"""
+
+    def execute(self):
+        self.market.get_current_price("AAA")
+        return super().execute()
+
+
+class BracketOptimizer(Optimizer):
+    """Opens a long bracket of value on the scored symbol at every call, plus a short one of half the value when
+    hedge is set. With reopen the positions already open on that symbol are closed first"""
+    schedule = 45
+    value = 2000
+    hedge = False
+    reopen = False
+
+    def execute(self, data):
+        if data is None:
+            return
+        if self.reopen:
+            for position in list(self.portfolio.open_positions):
+                if position.symbol == data and position.active:
+                    position.close_position()
+        self.portfolio.open_position_by_value(data, self.value, take_profit=("percent", 1.004), stop_loss=("percent", 0.996))
+        if self.hedge:
+            self.portfolio.open_position_by_value(data, -self.value / 2, take_profit=("percent", 1.003), stop_loss=("percent", 0.997))
+
+
+class HedgedOptimizer(BracketOptimizer):
+    hedge = True
+    reopen = True
+
+
+class OpenCloseOptimizer(HedgedOptimizer):
+    schedule = [time(9, 30), time(15, 45)]
+
+
+class TrailingOptimizer(Optimizer):
+    """Wide brackets with the stop trailed to 1% under the price at every call"""
+    schedule = 10
+
+    def execute(self, data):
+        for position in self.portfolio.open_positions:
+            if position.active and position.current_price * 0.99 > position.stop_loss:
+                position.stop_loss = position.current_price * 0.99
+        if not self.portfolio.get_positions(data):
+            self.portfolio.open_position_by_value(data, 2000, take_profit=("percent", 1.05), stop_loss=("percent", 0.98))
+
+
+class IntradayOptimizer(Optimizer):
+    """Holds one position at a time, flat by the close"""
+    schedule = 20
+
+    def execute(self, data):
+        if self.portfolio.market.time_now.time() >= time(15, 30):
+            for position in list(self.portfolio.open_positions):
+                if position.active:
+                    position.close_position("manual_close")
+        elif data is not None and not self.portfolio.open_positions:
+            self.portfolio.open_position_by_value(data, 2000, take_profit=("percent", 1.004), stop_loss=("percent", 0.996))
+
+
+class CrossOptimizer(Optimizer):
+    """Holds one position per scored symbol on the side of its trend"""
+    schedule = 15
+
+    def execute(self, data):
+        for symbol, trend in data.items():
+            size = 1 if trend > 0 else -1
+            positions = self.portfolio.get_positions(symbol)
+            if positions and positions[0].size * size < 0:
+                positions[0].close_position("manual_close")
+            elif not positions:
+                self.portfolio.open_position_by_value(symbol, 1000 * size)
+
+
+def run_market(datapack: PriceDataPack, scorer=RotatingScorer, optimizer=BracketOptimizer, n_portfolios: int = 1,
+               days: list[date] = DAYS, simulate: bool = True, ledger=None, **market_kwargs) -> tuple[Market, list[Portfolio]]:
+    """Market over SYMBOLS and days with n_portfolios portfolios of 100_000 trading scorer and optimizer, or one
+    portfolio per entry when lists are given. The simulation is run unless simulate is False"""
+    scorers = scorer if isinstance(scorer, list) else [scorer] * n_portfolios
+    optimizers = optimizer if isinstance(optimizer, list) else [optimizer] * len(scorers)
+    market = Market(asset_context=SYMBOLS, **market_kwargs)
+    market.load_calendar_data("dataframe", data=make_calendar(days))
+    market.load_price_data(datapack)
+    portfolios = [market.register_portfolio(100_000, scorer=s, optimizer=o, ledger=ledger) for s, o in zip(scorers, optimizers)]
+    if simulate:
+        market.run_simulation()
+    return market, portfolios
+
+
+def trade_tuples(portfolio: Portfolio) -> list[tuple]:
+    return [(x.symbol, x.open_time, x.close_time, x.open_price, x.close_price, x.close_type, x.size) for x in portfolio.closed_positions]
@@ -0,0 +1,104 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime, time, timedelta
+from pybt import Market
+from pybt.commons import Money
+from pybt.datapack import PriceDataPack, CalendarData
+from tests.helpers import make_frames, make_calendar, DAYS
+
+SYMBOLS = ["AAA", "BBB"]
+
+
+def make_market(datapack, frequency):
+    market = Market(asset_context=SYMBOLS, frequency=frequency)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(datapack)
+    return market
+
+
+def test_resampled_bars_match_pandas():
+    frames = make_frames(SYMBOLS, drop=0.3)
+    barset = PriceDataPack.load_pandas(frames).get_bars(CalendarData.load_from_pandas(make_calendar()), "1hour")
+
+    assert barset.periods.tolist() == [7] * len(DAYS)
+    for s, symbol in enumerate(SYMBOLS):
+        df = frames[symbol]
+        for d, day in enumerate(DAYS):
+            session = df.loc[datetime.combine(day, time(9, 30)): datetime.combine(day, time(15, 59))]
+            expected = session.resample("60min", origin=datetime.combine(day, time(9, 30))).agg(
+                {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+            for field in ["open", "high", "low", "close", "volume"]:
+                np.testing.assert_allclose(barset[field][d, s], expected[field].to_numpy())
+
+
+def test_daily_simulation_steps_once_per_day():
+    frames = make_frames(SYMBOLS)
+    market = make_market(PriceDataPack.load_pandas(frames), "daily")
+
+    times = []
+    while True:
+        times.append(market.time_now)
+        assert market.get_current_price("AAA") == Money(round(float(frames["AAA"].loc[:datetime.combine(market.date, time(15, 59))]["close"].iloc[-1]), 3))
+        if not market.next_tick():
+            break
+    assert times == [datetime.combine(day, time(16)) for day in DAYS]
+
+
+def test_hourly_bars_are_stamped_at_their_end():
+    frames = make_frames(SYMBOLS)
+    market = make_market(PriceDataPack.load_pandas(frames), "1hour")
+
+    times = []
+    while True:
+        times.append(market.time_now)
+        # Every minute bar behind the price started before the tick's time
+        known = frames["AAA"].loc[:market.time_now - timedelta(minutes=1)]
+        assert market.get_current_price("AAA") == Money(round(float(known["close"].iloc[-1]), 3))
+        if not market.next_tick():
+            break
+    hours = [time(10, 30), time(11, 30), time(12, 30), time(13, 30), time(14, 30), time(15, 30), time(16)]
+    assert times == [datetime.combine(day, x) for day in DAYS for x in hours]
+
+
+def test_hourly_stop_loss_uses_bar_low():
+    frames = make_frames(SYMBOLS)
+    datapack = PriceDataPack.load_pandas(frames)
+    market = make_market(datapack, "1hour")
+    portfolio = market.register_portfolio(100_000)
+
+    day = market.bars.day(market.date, SYMBOLS)
+    open_price = market.get_current_price("AAA")
+    # Stop just above the next bar's low so only an intrabar check can see it
+    level = Money(round(float(day["low"][0, 1]), 2) + 0.01)
+    assert level < Money(round(float(day["close"][0, 1]), 3))
+    portfolio.open_position_by_value("AAA", 1000, stop_loss=level)
+
+    market.next_tick()
+    portfolio.update()
+    position = portfolio.closed_positions[0]
+    assert position.close_type == "stop_loss"
+    assert position.close_price == min(level, Money(round(float(day["open"][0, 1]), 3)))
+    assert open_price != position.close_price
+
+
+def test_bars_cached_on_disk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    PriceDataPack.load_pandas(make_frames(SYMBOLS)).create_cache("bars_test", source_type="numpy-memmap")
+
+    first = make_market(PriceDataPack.load_cache("bars_test"), "daily")
+    path = os.path.join("data_cache", "bars_test.daily.bars.npz")
+    assert os.path.exists(path)
+
+    datapack = PriceDataPack.load_cache("bars_test")
+    datapack._read_day = None   # A fresh datapack must not resample again
+    second = make_market(datapack, "daily")
+    np.testing.assert_array_equal(first.bars["close"], second.bars["close"])
@@ -0,0 +1,90 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import date, datetime, time
+from pybt.datapack import CalendarData, Calendar
+from pybt.datapack import calendar_data
+from tests.helpers import make_calendar, DAYS
+
+
+def test_array_backed_calendar():
+    df = make_calendar()
+    df["session_open"] = ["0400"] * len(df)
+    calendar = CalendarData.load_from_pandas(df)
+
+    assert len(calendar) == len(DAYS)
+    assert calendar.dates.dtype == np.dtype("datetime64[D]")
+    assert [x.date for x in calendar] == DAYS
+    assert calendar[1].open == time(9, 30) and calendar[-1].close == time(16)
+    assert calendar[0].session_open == "0400"
+    assert calendar[0] == Calendar(DAYS[0], time(9, 30), time(16))
+
+    assert calendar.index(DAYS[2]) == 2
+    assert calendar.index(date(2021, 1, 9)) is None
+    assert calendar.indices([DAYS[1], date(2021, 1, 9)]).tolist() == [1, -1]
+    assert [x.date for x in calendar.between(date(2021, 1, 5), datetime(2021, 1, 10))] == DAYS[1:]
+    assert len(calendar.between(date(2022, 1, 1))) == 0
+
+    clone = pickle.loads(pickle.dumps(calendar))
+    assert clone[2] == calendar[2]
+
+    legacy = CalendarData([Calendar(x, time(9, 30), time(13)) for x in reversed(DAYS)])
+    assert [x.date for x in legacy] == DAYS and legacy[0].close == time(13)
+
+    with pytest.raises(TypeError):
+        CalendarData.load_from_pandas(pd.DataFrame({"date": ["2021-01-04"], "open": [time(9, 30)], "close": [time(16)]}))
+
+
+def test_calendar_file_roundtrip(tmp_path):
+    calendar = CalendarData.load_from_pandas(make_calendar())
+    path = str(tmp_path / "calendar.npz")
+    calendar.save(path)
+
+    loaded = CalendarData.load(path)
+    assert list(loaded) == list(calendar)
+    np.testing.assert_array_equal(loaded.opens, calendar.opens)
+
+
+class FakeAlpaca:
+    calls = []
+
+    def __init__(self, *args):
+        pass
+
+    def get_calendar(self, start, end):
+        FakeAlpaca.calls.append((start, end))
+        days = pd.bdate_range(start, end)
+        return [type("Entity", (), {"date": x, "open": time(9, 30), "close": time(16)}) for x in days]
+
+
+def test_alpaca_calendar_is_cached(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(calendar_data.tradeapi, "REST", FakeAlpaca)
+    FakeAlpaca.calls = []
+
+    first = CalendarData.load_from_alpaca("key", "secret", start_date=datetime(2021, 1, 1), end_date=datetime(2021, 3, 31))
+    second = CalendarData.load_from_alpaca("key", "secret", start_date=datetime(2021, 2, 1), end_date=datetime(2021, 2, 28))
+    assert len(FakeAlpaca.calls) == 1
+    assert [x.date for x in second] == [x.date for x in first.between(date(2021, 2, 1), date(2021, 2, 28))]
+
+    CalendarData.load_from_alpaca("key", "secret", start_date=datetime(2021, 3, 1), end_date=datetime(2021, 4, 30))
+    assert len(FakeAlpaca.calls) == 2
+    merged = CalendarData.load_from_alpaca("key", "secret", start_date=datetime(2021, 1, 1), end_date=datetime(2021, 4, 30))
+    assert len(FakeAlpaca.calls) == 2
+    assert len(merged) == len(pd.bdate_range("2021-01-01", "2021-04-30"))
+
+    # Another endpoint or timezone is not answered from the cache, and replaces it
+    CalendarData.load_from_alpaca("key", "secret", base_url="https://api.alpaca.markets", start_date=datetime(2021, 2, 1), end_date=datetime(2021, 2, 28))
+    CalendarData.load_from_alpaca("key", "secret", start_date=datetime(2021, 2, 1), end_date=datetime(2021, 2, 28), tz="UTC")
+    assert len(FakeAlpaca.calls) == 4
+    CalendarData.load_from_alpaca("key", "secret", start_date=datetime(2021, 2, 1), end_date=datetime(2021, 2, 28), tz="UTC")
+    assert len(FakeAlpaca.calls) == 4
@@ -0,0 +1,64 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt import Market
+from pybt.datapack import CalendarData
+from tests.helpers import make_datapack, make_calendar, run_market, trade_tuples, SYMBOLS, DAYS, TrendScorer
+import pytest
+
+
+def make_market(datapack, stepping, days=DAYS):
+    market, _ = run_market(datapack, scorer=TrendScorer, days=days, simulate=False, stepping=stepping, record_equity="day")
+    return market
+
+
+def outcome(market):
+    portfolio = market.traders[0]
+    return portfolio.cash, trade_tuples(portfolio), portfolio.scorer.calls, portfolio.equity_curve
+
+
+def assert_same(a, b):
+    assert a[0] == b[0]
+    assert a[1] == b[1]
+    assert a[2] == b[2]
+    assert a[3].equals(b[3])
+
+
+@pytest.mark.parametrize("stepping", ["tick", "event"])
+def test_resume_from_checkpoint(stepping, tmp_path):
+    datapack = make_datapack(SYMBOLS, drop=0.2)
+    reference = make_market(datapack, stepping)
+    reference.enable_checkpoints(str(tmp_path), every=1, keep=None)
+    reference.run_simulation()
+
+    checkpoints = Market.list_checkpoints(str(tmp_path))
+    assert len(checkpoints) == len(DAYS)
+    resumed = Market.resume(checkpoints[0], datapack)
+    assert resumed.day_counter == 0 and resumed.datapack is datapack
+    resumed.run_simulation()
+    assert_same(outcome(resumed), outcome(reference))
+
+
+def test_extend_finished_run(tmp_path):
+    datapack = make_datapack(SYMBOLS, drop=0.2)
+    reference = make_market(datapack, "tick")
+    reference.run_simulation()
+
+    first = make_market(datapack, "tick", DAYS[:2])
+    first.enable_checkpoints(str(tmp_path / "checkpoints"), every=5)
+    first.run_simulation()
+    checkpoints = Market.list_checkpoints(str(tmp_path / "checkpoints"))
+    assert len(checkpoints) == 1     # Only the end of the run
+
+    extended = Market.resume(str(tmp_path / "checkpoints"), datapack, CalendarData.load_from_pandas(make_calendar()))
+    assert extended.day_counter == 1 and len(extended.calendar) == len(DAYS)
+    extended.run_simulation()
+    assert_same(outcome(extended), outcome(reference))
+
+    with pytest.raises(ValueError):
+        Market.resume(checkpoints[0], datapack, CalendarData.load_from_pandas(make_calendar(DAYS[2:])))
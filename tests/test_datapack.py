@@ -0,0 +1,150 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt import Market
+from pybt.datapack import PriceDataPack
+from pybt.datapack.synthetic import market_calendar, write_synthetic_cache
+from tests.helpers import make_frames, make_calendar, DAYS
+from datetime import date, time
+import numpy as np
+import pandas as pd
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+def assert_same_prices(expected: PriceDataPack, actual: PriceDataPack):
+    for symbol in SYMBOLS:
+        for day in DAYS:
+            a = expected.get_prices(symbol, day)
+            b = actual.get_prices(symbol, day)
+            assert np.array_equal(a.index.values.astype("datetime64[ns]"), b.index.values.astype("datetime64[ns]"))
+            assert np.array_equal(a["close"].to_numpy(), b["close"].to_numpy())
+
+
+def test_memmap_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frames = make_frames(SYMBOLS, drop=0.4)
+    frames["CCC"] = frames["CCC"].loc[str(DAYS[1])]     # Symbol missing on some days
+    datapack = PriceDataPack.load_pandas(frames)
+    datapack.create_cache("mm_test", source_type="numpy-memmap")
+
+    cached = PriceDataPack.load_cache("mm_test")
+    assert cached.meta.data_type == "numpy-memmap"
+    assert sorted(cached.symbols) == SYMBOLS
+    assert_same_prices(PriceDataPack.load_pandas(frames), cached)
+
+    # Day slice of all symbols is a view on the memory map
+    offsets, columns = cached["AAA"].source.day_slice(DAYS[1])
+    assert isinstance(columns["close"].base, np.memmap) or isinstance(columns["close"], np.memmap)
+    assert offsets[-1] == sum(len(frames[s].loc[str(DAYS[1])]) for s in SYMBOLS)
+
+    markets = []
+    for pack in [PriceDataPack.load_pandas(frames), cached]:
+        market = Market(asset_context=SYMBOLS)
+        market.load_calendar_data("dataframe", data=make_calendar())
+        market.load_price_data(pack)
+        markets.append(market)
+    for _ in range(3 * 390):
+        assert np.array_equal(markets[0].get_current_prices(), markets[1].get_current_prices(), equal_nan=True)
+        for market in markets:
+            market.next_tick()
+
+
+def test_convert_hdf5_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frames = make_frames(SYMBOLS)
+    PriceDataPack.load_pandas(frames).create_cache("hdf_test")
+    converted = PriceDataPack.convert_cache("hdf_test", "hdf_converted")
+
+    assert converted.meta.data_type == "numpy-memmap"
+    source = PriceDataPack.load_cache("hdf_test")
+    assert_same_prices(source, converted)
+    source.close()
+
+
+def test_prefetch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frames = make_frames(SYMBOLS)
+    PriceDataPack.load_pandas(frames).create_cache("prefetch_test")
+
+    markets = []
+    for prefetch in [False, True]:
+        datapack = PriceDataPack.load_cache("prefetch_test")
+        market = Market(asset_context=SYMBOLS)
+        market.load_calendar_data("dataframe", data=make_calendar())
+        if prefetch:
+            datapack.enable_prefetch(market.calendar, depth=2)
+        market.load_price_data(datapack)
+        markets.append(market)
+
+    for _ in range(3 * 390):
+        assert np.array_equal(markets[0].get_current_prices(), markets[1].get_current_prices(), equal_nan=True)
+        for market in markets:
+            market.next_tick()
+
+    stats = markets[1].datapack.prefetch_stats
+    assert stats.requests == len(DAYS)
+    assert stats.missed == 1    # Only the first day is loaded on request
+    assert stats.ready + stats.waited == len(DAYS) - 1
+    for market in markets:
+        market.datapack.close()
+
+
+def test_get_day(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frames = make_frames(SYMBOLS, drop=0.5)
+    frames["CCC"] = frames["CCC"].loc[str(DAYS[1])]
+    source = PriceDataPack.load_pandas(frames)
+    source.create_cache("day_test", source_type="pandas-hdf5-day")
+    source.create_cache("mm_day_test", source_type="numpy-memmap")
+
+    hdf_day = PriceDataPack.load_cache("day_test")
+    memmap = PriceDataPack.load_cache("mm_day_test")
+    assert hdf_day.supports_bulk_day and memmap.supports_bulk_day
+    assert not source.supports_bulk_day
+    assert_same_prices(source, hdf_day)
+
+    selects = []
+    original_select = pd.HDFStore.select
+    monkeypatch.setattr(pd.HDFStore, "select", lambda self, *args, **kwargs: selects.append(args) or original_select(self, *args, **kwargs))
+
+    for day in DAYS:
+        expected = source.get_day(day, ["BBB", "CCC", "AAA"])
+        for pack in [hdf_day, memmap]:
+            bars = pack.get_day(day, ["BBB", "CCC", "AAA"])
+            assert bars.symbols == ["BBB", "CCC", "AAA"]
+            assert np.array_equal(bars.offsets, expected.offsets)
+            assert np.array_equal(bars.time, expected.time)
+            assert np.array_equal(bars["close"], expected["close"])
+        assert np.array_equal(expected.frame("AAA")["close"].to_numpy(), frames["AAA"].loc[str(day)]["close"].to_numpy())
+
+    assert len(selects) == len(DAYS)    # One HDF5 read per day for all symbols
+    hdf_day.close()
+
+
+def test_synthetic_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calendar = market_calendar(date(2020, 11, 23), 8)
+    assert date(2020, 11, 26) not in calendar.dates.astype(date)                     # Thanksgiving
+    assert calendar[calendar.index(date(2020, 11, 27))].close == time(13)           # Half day after it
+
+    datapack = write_synthetic_cache("synthetic", calendar, 40, seed=1, listing_rate=0.5)
+    again = write_synthetic_cache("synthetic_again", calendar, 40, seed=1, listing_rate=0.5)
+    first, last = datapack.get_day(calendar[0].date), again.get_day(calendar[0].date)
+    assert np.array_equal(first["close"], last["close"]) and np.array_equal(first.offsets, last.offsets)
+
+    market = Market(asset_context=datapack.symbols)
+    market.load_calendar_data("file", path="data_cache/synthetic.calendar.npz")
+    market.load_price_data(PriceDataPack.load_cache("synthetic"))
+    listed = []
+    while True:
+        listed.append(int(market._price_valid.sum()))
+        if not market.next_tick():
+            break
+    assert len(listed) == 7 * 390 + 210
+    assert 0 < min(listed) < len(datapack.symbols)
@@ -0,0 +1,52 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from datetime import datetime, time, timedelta
+from pybt.schedule import Schedule
+from tests.helpers import make_datapack, run_market, trade_tuples, SYMBOLS, HedgedOptimizer, OpenCloseOptimizer, TrailingOptimizer
+import pytest
+
+
+def run(datapack, stepping, optimizer, frequency="1minute"):
+    market, (portfolio,) = run_market(datapack, optimizer=optimizer, stepping=stepping, frequency=frequency, test_mode=True)
+    return market, portfolio
+
+
+@pytest.mark.parametrize("optimizer", [HedgedOptimizer, OpenCloseOptimizer, TrailingOptimizer])
+@pytest.mark.parametrize("frequency", ["1minute", "1hour"])
+def test_event_stepping_matches_tick_stepping(optimizer, frequency):
+    datapack = make_datapack(SYMBOLS, drop=0.2)
+    tick_market, by_tick = run(datapack, "tick", optimizer, frequency)
+    event_market, by_event = run(datapack, "event", optimizer, frequency)
+
+    assert by_event.cash == by_tick.cash
+    assert by_event.nett_gain == by_tick.nett_gain
+    assert by_event.scorer.calls == by_tick.scorer.calls
+    assert sorted(trade_tuples(by_event), key=str) == sorted(trade_tuples(by_tick), key=str)
+    assert any(x.close_type in ["take_profit", "stop_loss"] for x in by_event.closed_positions)
+    assert event_market.total_tick <= tick_market.total_tick
+    if frequency == "1minute":
+        assert event_market.total_tick < tick_market.total_tick / 2
+
+
+def test_trailed_stops_close_above_the_initial_stop():
+    datapack = make_datapack(SYMBOLS, drop=0.2)
+    for stepping in ["tick", "event"]:
+        _, portfolio = run(datapack, stepping, TrailingOptimizer)
+        trailed = [x for x in portfolio.closed_positions if x.close_type == "stop_loss" and x.close_price > x.open_price * 0.985]
+        assert len(trailed) > 10
+
+
+def test_schedule_mask():
+    day_open = datetime(2021, 1, 4, 9, 30)
+    mask = Schedule.from_spec([time(9, 30), time(10, 0), time(17, 0)]).mask(day_open, 390, timedelta(minutes=1))
+    assert mask.nonzero()[0].tolist() == [0, 30]
+    assert Schedule.from_spec(100).mask(day_open, 390, timedelta(minutes=1)).nonzero()[0].tolist() == [0, 100, 200, 300]
+    assert Schedule.from_spec(time(15, 0)).mask(day_open, 7, timedelta(hours=1)).nonzero()[0].tolist() == [5]
+    with pytest.raises(TypeError):
+        Schedule.from_spec("hourly")
@@ -0,0 +1,120 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+import numpy as np
+import pandas as pd
+from pybt.commons import Money
+from pybt.indicators import SMAIndicator, EMAIndicator, BollingerBands, RSIIndicator, RollingMax, RollingMin, VWAPIndicator
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+def make_prices(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 + rng.standard_normal((n, len(SYMBOLS))).cumsum(axis=0)
+
+
+def run(indicator, prices):
+    return np.array([indicator.update(row) for row in prices])
+
+
+def wilder_rsi(series, duration):
+    delta = series.diff()
+    gain, loss = delta.clip(lower=0).to_numpy(), (-delta).clip(lower=0).to_numpy()
+    out = np.full(len(series), np.nan)
+    avg_gain, avg_loss = gain[1:duration + 1].mean(), loss[1:duration + 1].mean()
+    out[duration] = 100 * avg_gain / (avg_gain + avg_loss)
+    for i in range(duration + 1, len(series)):
+        avg_gain = (avg_gain * (duration - 1) + gain[i]) / duration
+        avg_loss = (avg_loss * (duration - 1) + loss[i]) / duration
+        out[i] = 100 * avg_gain / (avg_gain + avg_loss)
+    return out
+
+
+def test_batch_indicators_match_reference():
+    prices = make_prices()
+    df = pd.DataFrame(prices)
+
+    np.testing.assert_allclose(run(SMAIndicator(SYMBOLS, 20), prices), df.rolling(20).mean(), rtol=1e-10)
+    np.testing.assert_allclose(run(RollingMax(SYMBOLS, 20), prices), df.rolling(20).max())
+    np.testing.assert_allclose(run(RollingMin(SYMBOLS, 37), prices), df.rolling(37).min())
+
+    # EMA seeded with the SMA of the first 20 prices
+    ema = np.full(prices.shape, np.nan)
+    ema[19] = prices[:20].mean(axis=0)
+    for i in range(20, len(prices)):
+        ema[i] = ema[i - 1] + 2 / 21 * (prices[i] - ema[i - 1])
+    np.testing.assert_allclose(run(EMAIndicator(SYMBOLS, 20), prices), ema, rtol=1e-10)
+
+    bands = BollingerBands(SYMBOLS, 20, nbdev=2)
+    outputs = [bands.update(row) for row in prices]
+    std = df.rolling(20).std(ddof=0)
+    np.testing.assert_allclose(np.array([x[0] for x in outputs]), df.rolling(20).mean() + 2 * std, rtol=1e-8)
+    np.testing.assert_allclose(np.array([x[2] for x in outputs]), df.rolling(20).mean() - 2 * std, rtol=1e-8)
+
+    rsi = run(RSIIndicator(SYMBOLS, 14), prices)
+    for i in range(len(SYMBOLS)):
+        np.testing.assert_allclose(rsi[:, i], wilder_rsi(df[i], 14), rtol=1e-10)
+
+
+def test_single_symbol_mode():
+    prices = make_prices()[:, 0]
+    sma = SMAIndicator("AAA", 5)
+    outputs = [sma.update(Money(round(x, 2))) for x in prices[:10]]
+
+    assert outputs[:4] == [None] * 4
+    assert outputs[4] == Money(float(np.mean([round(x, 2) for x in prices[:5]])))
+    assert sma.data[-1] == outputs[-1]
+    assert len(sma.data) == 30
+    assert isinstance(RSIIndicator("AAA", 3).update(1.0), type(None))
+
+
+def test_missing_prices_and_vwap():
+    prices = make_prices(50)
+    prices[10:13, 1] = np.nan
+    sma = run(SMAIndicator(SYMBOLS, 5), prices)
+    assert np.isnan(sma[10:17, 1]).all() and np.isfinite(sma[17, 1])
+    np.testing.assert_allclose(sma[17:, 1], pd.Series(prices[:, 1]).rolling(5).mean()[17:])
+
+    vwap = VWAPIndicator(SYMBOLS)
+    volume = np.arange(1, 51)[:, None] * np.ones(len(SYMBOLS))
+    out = np.array([vwap.update(p, v) for p, v in zip(prices, volume)])
+    np.testing.assert_allclose(out[-1, 0], (prices[:, 0] * volume[:, 0]).sum() / volume[:, 0].sum())
+    vwap.reset()
+    assert np.allclose(vwap.update(prices[0], volume[0]), prices[0])
+
+
+def test_market_indicator_bank_matches_per_symbol_updates():
+    from pybt import Market
+    from tests.helpers import make_datapack, make_calendar
+    import pytest
+
+    market = Market(asset_context=SYMBOLS)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS, drop=0.5))
+    market.register_indicator("sma30", SMAIndicator, 30)
+    market.register_indicator("bands", BollingerBands, 20)
+    market.register_indicator("sma30", SMAIndicator, 30)    # Same arguments, reuses the registered one
+    with pytest.raises(ValueError):
+        market.register_indicator("sma30", SMAIndicator, 10)
+
+    reference = {symbol: SMAIndicator(symbol, 30) for symbol in SYMBOLS}
+    checked = 0
+    while True:
+        row = market.get_indicator("sma30")
+        for i, symbol in enumerate(SYMBOLS):
+            expected = reference[symbol].update(market.get_current_price(symbol))
+            if expected is None:
+                assert np.isnan(row[i])
+            else:
+                assert Money(float(row[i])) == expected
+                checked += 1
+        assert len(market.get_indicator("bands", "AAA")) == 3
+        if not market.next_tick():
+            break
+    assert checked > 3 * 3 * 300
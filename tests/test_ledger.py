@@ -0,0 +1,87 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt.commons import Money
+from pybt.ledger import TradeLedger, Trade
+from tests.helpers import make_datapack, run_market, SYMBOLS, BracketOptimizer
+import numpy as np
+
+
+class OverlappingOptimizer(BracketOptimizer):
+    schedule = 20
+    hedge = True
+
+
+def run(ledger=None):
+    _, (portfolio,) = run_market(make_datapack(SYMBOLS, drop=0.2), optimizer=OverlappingOptimizer, ledger=ledger)
+    return portfolio
+
+
+def test_ledger_reconciles_with_cash():
+    portfolio = run()
+    trades = list(portfolio.closed_positions)
+    assert len(trades) == len(portfolio.ledger) > 0
+    assert all(isinstance(x, Trade) for x in trades)
+    assert {"take_profit", "stop_loss"} <= {x.close_type for x in trades}
+
+    total = Money(0)
+    for trade in trades:
+        total += trade.gain - trade.total_commission
+    assert total == portfolio.nett_gain
+
+    frame = portfolio.ledger.to_frame()
+    assert len(frame) == len(trades)
+    assert frame["symbol"].tolist() == [x.symbol for x in trades]
+    assert frame["close_time"].iloc[-1] == trades[-1].close_time
+
+
+def test_ledger_spill(tmp_path):
+    in_memory = run()
+    spilled = run(TradeLedger(SYMBOLS, spill_path=str(tmp_path / "trades"), chunk_size=7))
+    assert len(spilled.ledger.chunks) == len(spilled.ledger) // 7
+    assert list(spilled.closed_positions) == list(in_memory.closed_positions)
+    assert spilled.ledger[8] == in_memory.ledger[8] and spilled.ledger[-1] == in_memory.ledger[-1]
+
+    spilled.ledger.spill()
+    assert spilled.ledger[-1] == in_memory.ledger[-1]
+
+    spilled.ledger.save(str(tmp_path / "trades.npz"))
+    loaded = TradeLedger.load(str(tmp_path / "trades.npz"))
+    assert list(loaded) == list(in_memory.ledger)
+    for name, column in in_memory.ledger.arrays().items():
+        assert np.array_equal(loaded.arrays()[name], column)
+
+
+def test_extend_remaps_codes(tmp_path):
+    trades = run().ledger
+    other = TradeLedger(list(reversed(SYMBOLS)), capacity=1, spill_path=str(tmp_path), chunk_size=5)
+    other.close_types = ["stop_loss", "take_profit"]
+    other.extend(trades)
+    other.extend(trades)
+    assert len(other) == 2 * len(trades) and len(other.chunks) > 0
+    assert [str(x) for x in other] == [str(x) for x in trades] * 2
+
+    other.clear()
+    assert len(other) == 0 and list(other) == []
+
+
+def test_ledgers_share_spill_path(tmp_path):
+    trades = run().ledger
+    doubled = TradeLedger(SYMBOLS)
+    doubled.extend(trades)
+    doubled.size[:len(doubled)] *= 2
+
+    first = TradeLedger(SYMBOLS, spill_path=str(tmp_path), chunk_size=5)
+    second = TradeLedger(SYMBOLS, spill_path=str(tmp_path), chunk_size=5)
+    first.extend(trades)
+    second.extend(trades)
+    second.clear()      # Spills after a clear do not reuse the names of the cleared chunks either
+    second.extend(doubled)
+    assert len(first.chunks) > 0 and not set(first.chunks) & set(second.chunks)
+    assert [str(x) for x in first] == [str(x) for x in trades]
+    assert [str(x) for x in second] == [str(x) for x in doubled]
@@ -0,0 +1,79 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt.commons import Money
+from pybt import Market
+from pybt.datapack import PriceDataPack
+from tests.helpers import make_datapack, make_calendar, make_frames
+from scipy.interpolate import interp1d
+import numpy as np
+
+
+def make_market(symbols, **kwargs):
+    datapack = make_datapack(symbols, **kwargs)
+    market = Market(asset_context=symbols)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(datapack)
+    return market, datapack
+
+
+def interp_price(df, market):
+    # Reference implementation the price block replaced
+    asset_price = df.loc[market.today_open: market.today_close]
+    x_val = [int(x) for x in (asset_price.index - market.today_open).total_seconds() // 60]
+    interp_func = interp1d(x_val, list(asset_price["close"]), fill_value="extrapolate")
+    return Money(round(float(interp_func(market.tick_counter)), 3))
+
+
+def test_price_block_matches_interp():
+    symbols = ["AAA", "BBB", "CCC"]
+    market, datapack = make_market(symbols, drop=0.5)
+
+    for _ in range(3 * 390):
+        for symbol in symbols:
+            df = datapack.get_prices(symbol, market.date)
+            assert market.get_current_price(symbol) == interp_price(df, market)
+        market.next_tick()
+
+
+def test_current_prices_row():
+    symbols = ["AAA", "BBB"]
+    market, _ = make_market(symbols)
+    market.next_tick()
+
+    row = market.get_current_prices()
+    assert row.shape == (2,)
+    for symbol, price in zip(symbols, row):
+        assert market.get_current_price(symbol) == float(price)
+
+
+def test_missing_symbol_data():
+    market, _ = make_market(["AAA", "BBB"], drop=0.999)
+
+    assert market.get_current_price("AAA") is None
+    assert market.get_current_price("ZZZ") is None
+    assert np.isnan(market.get_current_prices()).all()
+
+
+def test_price_block_rounds_ties_like_money():
+    from pybt.market import _to_cents
+    ties = np.array([446.8245, 1.0045, 2.6745, 10.1145, 0.0045, 123.4565, 8.2345, 0.1235, 1.0005, 2.0015, -446.8245])
+    assert _to_cents(ties).tolist() == [Money(round(float(x), 3)).cents for x in ties]
+
+    # Closes on a half mill at every minute, so the price block holds them without interpolating
+    frames = make_frames(["AAA"], drop=0)
+    rng = np.random.default_rng(0)
+    close = np.round(rng.uniform(1, 500, len(frames["AAA"])), 3) + 0.0005
+    frames["AAA"] = frames["AAA"].assign(open=close, high=close, low=close, close=close)
+    market = Market(asset_context=["AAA"])
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(PriceDataPack.load_pandas(frames))
+    day = frames["AAA"].loc[market.today_open: market.today_close, "close"]
+    for tick in range(0, market.n_ticks, 7):
+        market.tick_counter = tick
+        assert market.get_current_price("AAA") == Money(round(float(day.iloc[tick]), 3))
@@ -0,0 +1,49 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt.scorer import metrics
+from tests.helpers import make_datapack, run_market, SYMBOLS
+import numpy as np
+import pandas as pd
+
+
+def test_curve_metrics_match_reference():
+    rng = np.random.default_rng(0)
+    curves = 1000 * np.exp(np.cumsum(rng.standard_normal((50, 300)) * 0.01, axis=1))
+    curves[3] = 1000        # Flat curve
+
+    sharpe = metrics.sharpe_ratio(curves, 252)
+    sortino = metrics.sortino_ratio(curves, 252)
+    drawdown = metrics.max_drawdown(curves)
+    for i in [0, 7, 49]:
+        series = pd.Series(curves[i])
+        r = series.pct_change().dropna()
+        assert np.isclose(sharpe[i], r.mean() / r.std() * np.sqrt(252))
+        assert np.isclose(sortino[i], r.mean() / np.sqrt((r.clip(upper=0) ** 2).mean()) * np.sqrt(252))
+        assert np.isclose(drawdown[i], (1 - series / series.cummax()).max())
+        assert metrics.sharpe_ratio(curves[i], 252) == sharpe[i]
+    assert np.isnan(sharpe[3]) and np.isnan(sortino[3]) and drawdown[3] == 0
+    assert np.argsort(-sharpe)[0] == np.nanargmax(sharpe)
+
+
+def test_trade_metrics_by_run():
+    gains = np.array([5.0, -2.0, 1.0, -1.0, -3.0])
+    runs = np.array([0, 0, 0, 2, 2])
+    assert np.allclose(metrics.win_rate(gains, runs, 3), [2 / 3, np.nan, 0], equal_nan=True)
+    assert metrics.win_rate(gains) == 0.4
+    equity = np.array([[100.0, 100.0], [50.0, 50.0], [200.0, 200.0]])
+    assert np.allclose(metrics.turnover(np.full(5, 10.0), equity, runs), [0.3, 0, 0.1])
+
+
+def test_portfolio_metrics():
+    _, (portfolio,) = run_market(make_datapack(SYMBOLS, drop=0.2), record_equity=10)
+    trades = portfolio.ledger.arrays()
+    assert metrics.trade_gains(trades).sum() == portfolio.nett_gain.cents
+    results = metrics.portfolio_metrics(portfolio, periods_per_year=252 * 39)
+    assert set(results) == {"total_return", "sharpe_ratio", "sortino_ratio", "max_drawdown", "win_rate", "turnover"}
+    assert 0 < results["max_drawdown"] < 1 and 0 <= results["win_rate"] <= 1 and results["turnover"] > 0
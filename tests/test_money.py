@@ -6,7 +6,9 @@ if __name__ == "__main__":
     parentdir = os.path.dirname(currentdir)
     sys.path.append(parentdir)
 
-from pybt.commons import Money
+from pybt.commons import Money, MoneyArray, MoneyAccumulator
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
 import pytest
 
 
@@ -71,3 +73,106 @@ def test_incr_decr():
     assert m2 == 3
     assert m3 == 1
     assert m4 == 1
+
+
+def decimal_cents(value):
+    # Reference conversion Money used before the Decimal free fast path
+    return int(Decimal(str(value)).quantize(Decimal('1.11'), rounding=ROUND_HALF_UP) * 100)
+
+
+def test_float_conversion_matches_decimal():
+    rng = np.random.default_rng(10)
+    values = [round(x, int(d)) for x, d in zip(rng.uniform(-1e6, 1e6, 20000), rng.integers(0, 8, 20000))]
+    values += list(rng.uniform(-1, 1, 5000)) + list(rng.uniform(-1e12, 1e12, 1000))
+    values += [1.005, 2.675, 0.125, -0.125, 1.015, 1e-05, -1e-07, 0.0, -0.0, 171.545, 5e15 + 0.5, 1e20, 123.456e3]
+    for value in values:
+        assert Money(value).cents == decimal_cents(value)
+        assert Money(str(value)).cents == decimal_cents(value)
+
+
+def test_shared_instances():
+    zero = Money(0)
+    assert zero is Money(0)
+
+    total = Money(0)
+    total += Money(5)
+    total -= 1
+    assert total == 4
+    assert Money(0) == 0 and zero.cents == 0
+
+
+def test_accumulator():
+    values = [Money(1.25), Money(3), Money(-0.5)]
+    acc = MoneyAccumulator()
+    for value in values:
+        acc += value
+    acc.add(Money(1))
+    acc -= 1.5
+    assert acc.value == sum(values, Money(0)) + 1 - Money(1.5)
+    acc.reset()
+    assert acc.value == 0
+
+
+def test_pickle():
+    import pickle
+    assert pickle.loads(pickle.dumps(Money(12.34))) == Money(12.34)
+
+
+def random_values(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = [round(x, int(d)) for x, d in zip(rng.uniform(-1000, 1000, n), rng.integers(1, 6, n))]
+    # Decimal ties that are not exactly representable as floats
+    values += [1.005, 2.675, 0.125, -0.125, 1.015, -2.675, 1e-05, 0.0, 171.545, 123456.785]
+    return np.array(values)
+
+
+def test_money_array_init():
+    values = random_values()
+    ma = MoneyArray(values)
+    assert ma.cents.tolist() == [Money(float(x)).cents for x in values]
+
+    ints = np.arange(-50, 50)
+    assert MoneyArray(ints).cents.tolist() == [Money(int(x)).cents for x in ints]
+    assert MoneyArray([Money(1.5), Money(2)]).cents.tolist() == [150, 200]
+
+    cents = random_values(seed=1) * 100
+    assert MoneyArray.from_cents(cents).cents.tolist() == [Money.from_cents(float(x)).cents for x in cents]
+
+
+def test_money_array_arithmetic():
+    a_values = random_values(seed=2)
+    b_values = random_values(seed=3)
+    a = MoneyArray(a_values)
+    b = MoneyArray(b_values)
+    a_money = a.to_list()
+    b_money = b.to_list()
+
+    assert (a + b).cents.tolist() == [(x + y).cents for x, y in zip(a_money, b_money)]
+    assert (a - b).cents.tolist() == [(x - y).cents for x, y in zip(a_money, b_money)]
+    assert (a + 3).cents.tolist() == [(x + 3).cents for x in a_money]
+    assert (a + Money(2.5)).cents.tolist() == [(x + Money(2.5)).cents for x in a_money]
+    assert (a * 2.3333333).cents.tolist() == [(x * 2.3333333).cents for x in a_money]
+    assert (a * 3).cents.tolist() == [(x * 3).cents for x in a_money]
+    assert (a / 3).cents.tolist() == [(x / 3).cents for x in a_money]
+    assert (a / 0.7).cents.tolist() == [(x / 0.7).cents for x in a_money]
+    assert a.abs().cents.tolist() == [x.abs().cents for x in a_money]
+    assert a.sum() == sum(a_money, Money(0))
+    with pytest.raises(TypeError):
+        a * b
+    with pytest.raises(TypeError):
+        a + 1.5
+
+
+def test_money_array_compare():
+    a = MoneyArray(random_values(seed=4))
+    b = MoneyArray(random_values(seed=5))
+    a_money = a.to_list()
+    b_money = b.to_list()
+
+    assert (a < b).tolist() == [x < y for x, y in zip(a_money, b_money)]
+    assert (a >= b).tolist() == [x >= y for x, y in zip(a_money, b_money)]
+    assert (a == a).all()
+    assert (a > 1.5).tolist() == [x > 1.5 for x in a_money]
+    assert (a <= Money(10)).tolist() == [x <= Money(10) for x in a_money]
+    assert a[3] == a_money[3]
+    assert isinstance(a[:3], MoneyArray) and len(a[:3]) == 3
@@ -0,0 +1,67 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+import pickle
+from pybt import Scorer, Optimizer, ParameterSweep
+from pybt.datapack import CalendarData
+from pybt.optimizer import parameter_grid
+from tests.helpers import make_datapack, make_calendar
+import pytest
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+class AllScorer(Scorer):
+    def execute(self):
+        return {symbol: 1 for symbol in self.market.active_symbols}
+
+
+class FixedValueOptimizer(Optimizer):
+    value = 1000
+
+    def execute(self, data):
+        for symbol in data:
+            if self.portfolio.get_positions(symbol) is None:
+                self.portfolio.open_position_by_value(symbol, self.value, stop_loss=self.stop_loss)
+
+
+def factory(market, value, stop_loss):
+    optimizer = type("SweepOptimizer", (FixedValueOptimizer,), {"value": value, "stop_loss": stop_loss})
+    market.register_portfolio(10_000, scorer=AllScorer, optimizer=optimizer)
+
+
+def test_parameter_grid():
+    grid = parameter_grid({"a": [1, 2], "b": ["x", "y", "z"]})
+    assert len(grid) == 6
+    assert grid[0] == {"a": 1, "b": "x"}
+    assert grid[-1] == {"a": 2, "b": "z"}
+
+
+def test_datapack_pickle_roundtrip():
+    datapack = make_datapack(SYMBOLS)
+    clone = pickle.loads(pickle.dumps(datapack))
+    assert clone.symbols == datapack.symbols
+    day = make_calendar()["date"][0].date()
+    assert clone.get_day(day, SYMBOLS).offsets.tolist() == datapack.get_day(day, SYMBOLS).offsets.tolist()
+
+
+@pytest.mark.parametrize("start_method", [None, "spawn"])
+def test_sweep_pool_matches_sequential(start_method):
+    datapack = make_datapack(SYMBOLS)
+    calendar = CalendarData.load_from_pandas(make_calendar())
+    grid = {"value": [500, 1000], "stop_loss": [None, 95]}
+
+    sequential = ParameterSweep(factory, grid, datapack, calendar, max_workers=0).run_all()
+    pooled = ParameterSweep(factory, grid, datapack, calendar, max_workers=2, start_method=start_method).run_all()
+
+    assert len(sequential) == len(pooled) == 4
+    for a, b in zip(sequential, pooled):
+        assert a.error is None and b.error is None, a.error or b.error
+        assert a.params == b.params
+        assert a.portfolios == b.portfolios
+    assert any(result.portfolios[0]["closed_positions"] or result.portfolios[0]["open_positions"] for result in pooled)
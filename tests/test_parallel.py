@@ -0,0 +1,93 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from datetime import date, timedelta
+from pybt.datapack import CalendarData
+from pybt.parallel import DateShardedBacktest, SymbolPartitionedBacktest
+from tests.helpers import make_datapack, make_calendar, SYMBOLS, TrendScorer, IntradayOptimizer, CrossScorer, CrossOptimizer, LeakyScorer
+import numpy as np
+import pytest
+
+DAYS = [date(2021, 1, 4) + timedelta(days=i) for i in range(8) if i % 7 < 5]
+
+
+def register(market):
+    market.register_portfolio(100_000, scorer=TrendScorer, optimizer=IntradayOptimizer, name="intraday")
+
+
+def make_backtest(warmup_days, max_workers=0, start_method=None):
+    datapack = make_datapack(SYMBOLS, DAYS, drop=0.2)
+    calendar = CalendarData.load_from_pandas(make_calendar(DAYS))
+    return DateShardedBacktest(register, datapack, calendar, n_shards=3, warmup_days=warmup_days, max_workers=max_workers,
+                               start_method=start_method)
+
+
+@pytest.mark.parametrize("max_workers, start_method", [(0, None), (2, None), (2, "spawn")])
+def test_sharded_run_matches_serial(max_workers, start_method):
+    backtest = make_backtest(warmup_days=1, max_workers=max_workers, start_method=start_method)
+    assert [x[1:] for x in backtest.shard_bounds()] == [(0, 2), (2, 4), (4, 6)]
+    assert [x[0] for x in backtest.shard_bounds()] == [0, 1, 3]
+
+    result = backtest.run(compare_serial=True)
+    assert len(result.shards) == 3 and result.names == ["intraday"]
+    assert len(result.ledgers[0]) > 0
+    assert result.difference["intraday"] == {"nett_gain_difference": 0.0, "relative_difference": 0.0, "trades_only_sharded": 0,
+                                             "trades_only_serial": 0, "max_margin_difference": 0.0}
+
+    curve = result.equity_curves[0]
+    assert len(curve) == len(DAYS) and curve.index.is_monotonic_increasing
+    assert (curve["margin"] == curve["cash"] + curve["equity"]).all()
+    assert result.summary().loc["intraday", "nett_gain"] == result.nett_gains[0] / 100
+
+
+def test_warmup_is_discarded():
+    cold = make_backtest(warmup_days=0).run(compare_serial=True)
+    warm = make_backtest(warmup_days=1).run()
+    # Trades of the warm-up day belong to the shard before, never to both
+    assert len(warm.ledgers[0]) == len(set(map(str, warm.ledgers[0])))
+    for shard in warm.shards:
+        opened = shard.ledgers[0].arrays()["open_time"].astype("datetime64[D]")
+        assert (opened >= np.datetime64(shard.start)).all()
+    # Without warm-up the moving average is not ready at the open of a shard, so the serial run trades more
+    assert cold.difference["intraday"]["trades_only_serial"] > 0 and cold.difference["intraday"]["trades_only_sharded"] == 0
+
+
+def register_cross(market, scorer=CrossScorer):
+    market.register_portfolio(90_000, scorer=scorer, optimizer=CrossOptimizer, name="cross")
+    market.register_portfolio(30_000, scorer=scorer, optimizer=CrossOptimizer)
+
+
+@pytest.mark.parametrize("max_workers", [0, 3])
+def test_partitioned_run_matches_serial(max_workers):
+    datapack = make_datapack(SYMBOLS, DAYS, drop=0.2)
+    calendar = CalendarData.load_from_pandas(make_calendar(DAYS))
+    backtest = SymbolPartitionedBacktest(register_cross, datapack, calendar, partitions=3, max_workers=max_workers)
+    assert backtest.partitions == [["AAA"], ["BBB"], ["CCC"]]
+
+    result = backtest.run(compare_serial=True)
+    assert result.names == ["cross", "portfolio1"] and result.start_values == [9_000_000, 3_000_000]
+    assert [x.start_values for x in result.partitions] == [[3_000_000, 1_000_000]] * 3
+    assert len(result.ledgers[0]) > 0 and set(result.ledgers[0].to_frame()["symbol"]) == set(SYMBOLS)
+    for report in result.difference.values():
+        assert report == {"nett_gain_difference": 0.0, "relative_difference": 0.0, "trades_only_sharded": 0,
+                          "trades_only_serial": 0, "max_margin_difference": 0.0}
+    curve = result.equity_curves[1]
+    assert len(curve) == len(DAYS) and (curve["margin"] == curve["cash"] + curve["equity"]).all()
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_partition_fails_on_foreign_symbol(max_workers):
+    datapack = make_datapack(SYMBOLS, DAYS, drop=0.2)
+    calendar = CalendarData.load_from_pandas(make_calendar(DAYS))
+    backtest = SymbolPartitionedBacktest(register_cross, datapack, calendar, partitions=[["AAA"], ["BBB", "CCC"]],
+                                         capital=[0.5, 0.5], max_workers=max_workers, params={"scorer": LeakyScorer})
+    with pytest.raises(RuntimeError, match="SymbolOutsideGroupError: AAA"):
+        backtest.run()
+
+    with pytest.raises(ValueError):
+        SymbolPartitionedBacktest(register_cross, datapack, calendar, partitions=[["AAA", "BBB"], ["BBB", "CCC"]])
@@ -0,0 +1,35 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from tests.helpers import make_datapack, run_market, trade_tuples, SYMBOLS, RotatingScorer, HedgedOptimizer
+import pytest
+
+PARAMS = [(0, 2000), (1, 1500), (2, 3000), (1, 500)]
+
+
+def run(datapack, batch_portfolios, stepping="tick"):
+    return run_market(datapack, scorer=[type("Scorer", (RotatingScorer,), {"offset": offset}) for offset, _ in PARAMS],
+                      optimizer=[type("Optimizer", (HedgedOptimizer,), {"schedule": 30, "value": value}) for _, value in PARAMS],
+                      stepping=stepping, batch_portfolios=batch_portfolios)
+
+
+@pytest.mark.parametrize("stepping", ["tick", "event"])
+def test_batched_portfolios_match_separate_runs(stepping):
+    datapack = make_datapack(SYMBOLS, drop=0.2)
+    _, separate = run(datapack, False, stepping)
+    market, batched = run(datapack, True, stepping)
+
+    assert len(market.portfolio_group) == len(PARAMS)
+    assert all(x.book is market.portfolio_group.book for x in batched)
+    assert len({x.group for x in separate}) == len(PARAMS)
+    for a, b in zip(separate, batched):
+        assert b.cash == a.cash
+        assert b.nett_gain == a.nett_gain
+        assert b.margin == b.cash + b.equity
+        assert sorted(trade_tuples(b), key=str) == sorted(trade_tuples(a), key=str)
+    assert len({x.cash.cents for x in batched}) > 1
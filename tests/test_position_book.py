@@ -0,0 +1,138 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt.commons import Money
+from pybt import Market
+from pybt.portfolio import first_crossings, EXIT_NONE, EXIT_TAKE_PROFIT, EXIT_STOP_LOSS
+import numpy as np
+from tests.helpers import make_datapack, make_calendar
+
+SYMBOLS = ["AAA", "BBB", "CCC", "DDD"]
+
+
+def make_portfolio(datapack):
+    market = Market(asset_context=SYMBOLS)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(datapack)
+    portfolio = market.register_portfolio(100_000)
+    for i, symbol in enumerate(SYMBOLS):
+        portfolio.open_position_by_value(symbol, 5000, take_profit=("percent", 1.02), stop_loss=("percent", 0.98))
+        portfolio.open_position_by_value(symbol, -5000, take_profit=("percent", 1.01 + i / 100), stop_loss=("percent", 0.97))
+        portfolio.open_position_by_size(symbol, 3)
+    return market, portfolio
+
+
+def scalar_update(portfolio):
+    # Per-object update loop the PositionBook replaced
+    total_value = Money(0)
+    for position in list(portfolio.open_positions):
+        position.update()
+        if position.active:
+            total_value += position.current_value
+        else:
+            portfolio.process_close(position)
+    portfolio.equity = total_value    # margin and nett_gain are derived from cash and equity
+
+
+def test_book_matches_scalar_update():
+    datapack = make_datapack(SYMBOLS, drop=0.2)
+    market_a, vector = make_portfolio(datapack)
+    market_b, scalar = make_portfolio(datapack)
+
+    for _ in range(3 * 390):
+        vector.update()
+        scalar_update(scalar)
+
+        assert vector.cash == scalar.cash
+        assert vector.equity == scalar.equity
+        assert vector.nett_gain == scalar.nett_gain
+        assert len(vector.open_positions) == len(scalar.open_positions)
+        # Three positions per symbol open on the same tick, size tells them apart
+        key = lambda x: (x.symbol, x.open_time, x.size)
+        for a, b in zip(sorted(vector.open_positions, key=key), sorted(scalar.open_positions, key=key)):
+            assert key(a) == key(b)
+            assert a.current_price == b.current_price == a.portfolio.market.get_current_price(a.symbol)
+            assert a.current_value == b.current_value
+            assert a.active == b.active and a.close_type == b.close_type
+        market_a.next_tick()
+        market_b.next_tick()
+
+    assert len(vector.closed_positions) == len(scalar.closed_positions)
+    assert sorted(x.close_type for x in vector.closed_positions) == sorted(x.close_type for x in scalar.closed_positions)
+
+
+def test_manual_close_and_views():
+    datapack = make_datapack(SYMBOLS)
+    market, portfolio = make_portfolio(datapack)
+    market.next_tick()
+    portfolio.update()
+
+    position = portfolio.open_positions[0]
+    assert position.current_price == market.get_current_price(position.symbol)
+    assert position.gain == position.current_value - position.open_value
+
+    position.close_position()
+    portfolio.update()
+    assert position not in portfolio.open_positions
+    assert position.close_type == "manual_close"
+    assert position.active is False
+    assert len(portfolio.book) == len(portfolio.open_positions)
+
+
+def test_moved_levels_apply_from_next_tick():
+    datapack = make_datapack(SYMBOLS, drop=0)
+    market, portfolio = make_portfolio(datapack)
+    for _ in range(5):
+        market.next_tick()
+        portfolio.update()
+
+    longs = [x for x in portfolio.open_positions if x.position_type == "long" and x.stop_loss is not None]
+    stopped, widened = longs[0], longs[1]
+    level = stopped.current_price + Money(1)
+    stopped.stop_loss = level       # Above the market, stops out on the next tick
+    assert stopped.stop_loss == level
+    widened.take_profit = None
+    widened.stop_loss = 1       # Converted to Money like the levels given when opening
+    assert widened.take_profit is None and widened.stop_loss == Money(1)
+
+    market.next_tick()
+    portfolio.update()
+    assert stopped not in portfolio.open_positions and stopped.close_type == "stop_loss"
+    assert stopped.stop_loss == level       # Kept by the position once it leaves the book
+
+    # Without levels the position stays open until the end of the simulation
+    while market.next_tick():
+        portfolio.update()
+    assert widened.active and widened in portfolio.open_positions
+
+
+def test_first_crossings_match_tick_by_tick():
+    rng = np.random.default_rng(1)
+    rows, ticks = 200, 390
+    prices = (10_000 + rng.standard_normal((rows, ticks)).cumsum(axis=1) * 20).astype(np.int64)
+    is_long = rng.random(rows) < 0.5
+    spread = rng.integers(50, 400, rows)
+    take_profit = np.where(is_long, prices[:, 0] + spread, prices[:, 0] - spread)
+    stop_loss = np.where(is_long, prices[:, 0] - spread, prices[:, 0] + spread)
+    has_tp = rng.random(rows) < 0.8
+    has_sl = rng.random(rows) < 0.8
+
+    column, exit_type = first_crossings(prices, prices, is_long, take_profit, stop_loss, has_tp, has_sl)
+
+    for r in range(rows):
+        expected = (-1, EXIT_NONE)
+        for t in range(ticks):
+            p = prices[r, t]
+            if has_tp[r] and (p >= take_profit[r] if is_long[r] else p <= take_profit[r]):
+                expected = (t, EXIT_TAKE_PROFIT)
+                break
+            if has_sl[r] and (p <= stop_loss[r] if is_long[r] else p >= stop_loss[r]):
+                expected = (t, EXIT_STOP_LOSS)
+                break
+        assert (column[r], exit_type[r]) == expected
+    assert (column >= 0).sum() > rows / 2
@@ -0,0 +1,58 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt import Market, Scorer, Optimizer
+from tests.helpers import make_datapack, make_calendar, DAYS
+import json
+
+SYMBOLS = ["AAA", "BBB"]
+
+
+class FirstScorer(Scorer):
+    def execute(self):
+        return self.market.active_symbols[0]
+
+
+class BuyOptimizer(Optimizer):
+    schedule = 60
+
+    def execute(self, data):
+        self.portfolio.open_position_by_value(data, 1000)
+
+
+def test_profiler_records_phases(tmp_path):
+    market = Market(asset_context=SYMBOLS, profile=True)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS))
+    market.register_portfolio(100_000, scorer=FirstScorer, optimizer=BuyOptimizer, name="buyer")
+    market.run_simulation()
+
+    totals = market.profiler.totals()
+    assert totals["simulation"]["calls"] == 1
+    assert totals["load_day"]["calls"] == len(DAYS) - 1
+    assert totals["positions"]["calls"] == market.total_tick
+    assert totals["scorer"]["calls"] == totals["optimizer"]["calls"] == len(DAYS) * 7
+    assert sum(x["seconds"] for phase, x in totals.items() if phase != "simulation") <= totals["simulation"]["seconds"]
+
+    frame = market.profiler.to_frame()
+    assert set(frame["date"]) == set(DAYS)
+    assert set(frame.loc[frame["phase"] == "scorer", "strategy"]) == {"buyer"}
+
+    market.profiler.save(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f)["totals"]["scorer"]["calls"] == len(DAYS) * 7
+
+
+def test_profiler_off_by_default():
+    market = Market(asset_context=SYMBOLS)
+    assert market.profiler is None
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS))
+    profiler = market.enable_profiling()
+    assert profiler is market.enable_profiling()
+    assert profiler.day == DAYS[0]
@@ -0,0 +1,56 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt import Market
+from tests.helpers import make_datapack, make_calendar, run_market, SYMBOLS, DAYS
+import numpy as np
+import pytest
+
+
+def run(stepping, record_equity, batch_portfolios=False):
+    return run_market(make_datapack(SYMBOLS, drop=0.2), n_portfolios=2, stepping=stepping, record_equity=record_equity,
+                      batch_portfolios=batch_portfolios)
+
+
+def test_record_every_tick():
+    market, (portfolio, _) = run("tick", 1)
+    curve = portfolio.equity_curve
+    assert len(curve) == market.total_tick == 390 * len(DAYS)
+    assert (curve["margin"] == curve["cash"] + curve["equity"]).all()
+    assert curve["equity"].max() > 0
+    assert np.shares_memory(curve["cash"].to_numpy(), portfolio.group.recorder.cash)
+
+
+@pytest.mark.parametrize("every", [30, "day"])
+def test_record_event_stepping_matches_tick_stepping(every):
+    _, by_tick = run("tick", every)
+    event_market, by_event = run("event", every, batch_portfolios=True)
+    assert len(by_event[0].equity_curve) == (len(DAYS) if every == "day" else 13 * len(DAYS))
+    for a, b in zip(by_tick, by_event):
+        assert a.equity_curve.equals(b.equity_curve)
+    assert event_market.portfolio_group.recorder.cash.shape == (2, len(by_event[0].equity_curve))
+
+
+def test_not_recorded_by_default():
+    market = Market(asset_context=SYMBOLS)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS))
+    with pytest.raises(RuntimeError):
+        market.register_portfolio(1000).equity_curve
+
+
+def test_member_updates_record_one_sample():
+    market = Market(asset_context=SYMBOLS, record_equity=1, batch_portfolios=True)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS))
+    portfolios = [market.register_portfolio(100_000) for _ in range(3)]
+    for portfolio in portfolios:
+        portfolio.update()
+    recorder = market.portfolio_group.recorder
+    assert len(recorder) == 1 and recorder.cash.shape == (3, 1)
+    assert recorder.times[0] == np.datetime64(market.time_now)
@@ -0,0 +1,91 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    import inspect
+    currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    parentdir = os.path.dirname(currentdir)
+    sys.path.append(parentdir)
+
+from pybt import Market, Scorer, Optimizer, Portfolio, Position
+from tests.helpers import make_datapack, make_calendar
+import inspect
+import pytest
+
+SYMBOLS = ["AAA", "BBB"]
+
+
+class FirstSymbolScorer(Scorer):
+    def __init__(self):
+        super().__init__()
+        self.symbols = self.market.active_symbols[:1]
+
+    def execute(self):
+        return {symbol: 1 for symbol in self.symbols}
+
+
+class BuyOnceOptimizer(Optimizer):
+    def __init__(self):
+        super().__init__()
+        self.starting_cash = self.portfolio.cash
+
+    def execute(self, data):
+        for symbol in data:
+            if self.portfolio.get_positions(symbol) is None:
+                self.portfolio.open_position_by_value(symbol, 1000)
+
+
+def make_market():
+    market = Market(asset_context=SYMBOLS)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS))
+    return market
+
+
+def test_context_injection(monkeypatch):
+    def no_stack(*args, **kwargs):
+        raise AssertionError("inspect.stack should not be used")
+    monkeypatch.setattr(inspect, "stack", no_stack)
+
+    market = make_market()
+    portfolio = market.register_portfolio(10_000, scorer=FirstSymbolScorer, optimizer=BuyOnceOptimizer)
+
+    assert portfolio.market is market
+    assert portfolio.scorer.market is market
+    assert portfolio.optimizer.portfolio is portfolio
+    assert portfolio.optimizer.starting_cash == 10_000
+
+    for _ in range(5):
+        portfolio.update()
+        market.next_tick()
+
+    assert len(portfolio.open_positions) == 1
+    assert portfolio.open_positions[0].symbol == "AAA"
+
+
+def test_portfolio_requires_market():
+    with pytest.warns(DeprecationWarning), pytest.raises(TypeError):
+        Portfolio(1000)
+
+
+class LegacyMarket(Market):
+    def register_legacy(self, start_value):
+        return Portfolio(start_value)
+
+
+class LegacyPortfolio(Portfolio):
+    def open_legacy(self, symbol, value):
+        self.process_open(Position.open_by_value(symbol, value))
+
+
+def test_context_found_in_stack_is_deprecated():
+    market = LegacyMarket(asset_context=SYMBOLS)
+    market.load_calendar_data("dataframe", data=make_calendar())
+    market.load_price_data(make_datapack(SYMBOLS))
+    with pytest.warns(DeprecationWarning, match="Market.register_portfolio"):
+        portfolio = market.register_legacy(10_000)
+    assert portfolio.market is market
+
+    portfolio = LegacyPortfolio(10_000, market=market)
+    with pytest.warns(DeprecationWarning, match="open_position_by_value"):
+        portfolio.open_legacy("AAA", 1000)
+    assert portfolio.open_positions[0].portfolio is portfolio